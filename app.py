@@ -3,47 +3,256 @@ ACEest Fitness & Gym Management System - Flask Web Application
 Version: 2.0 (Refactored from Tkinter to Flask)
 """
 
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, send_file, make_response, g
+from flask import before_render_template, template_rendered
+from flask.json.provider import DefaultJSONProvider
 from datetime import datetime, date, timedelta
+import click
+import hashlib
+import hmac
+import io
 import os
 import json
+import math
+import time
 from functools import wraps
+from batch_metrics import recompute_all
+from calculations import (MET_VALUES, calculate_bmi, calculate_bmr, calculate_calories, exercise_totals,
+                          progress_totals, summarize_workouts)
+from exercise_catalog import catalog
+from weight_history import WeightHistory, entry_calories
+from workout_entry import WorkoutEntry
+from workout_planner import plan_for_member
+from diet_planner import diet_plan_for_member
+from reports import ReportService, ReportQueueFull, ReportsUnavailable, week_bounds
+from charts import ChartCache, ChartsUnavailable, DEFAULT_SIZE, FORMATS, clamp_size
+from nightly_reports import DEFAULT_CHUNK_SIZE, NIGHTLY_REPORT_DIR, default_week_day, run_nightly_job
+from member_store import LockStripes, Member, ShardedStore
+from jobs import PRIORITY_LOW, JobQueue, JobQueueFull
+from exports import workouts_csv
+from workout_log import WORKOUT_DB_PATH, WorkoutLog, WorkoutLogError
+from session_store import create_session_interface
+from request_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, RequestMetrics
+from profiling import ProfileBuffer, ProfilingMiddleware, PROFILE_SECRET, profiling_enabled, sign_debug_token
+from slow_requests import SlowRequestLog
+from memory_report import (MAX_TRACEBACK_FRAMES, MEMORY_SAMPLE_SIZE, MEMORY_TOP_MEMBERS, TracemallocSnapshots,
+                           deep_sizeof, estimate_store, member_report, process_memory)
+from exercise_symbols import symbols
+from synthetic_data import (SYNTHETIC_DATA_PATH, SYNTHETIC_MEMBERS, SYNTHETIC_SEED, SyntheticGym,
+                            load_member_lines, load_ndjson, member_line, populate, write_ndjson)
+from shadow_traffic import SHADOW_BASE_URL, ShadowMiddleware, ShadowTee
+from sharding import SHARD_PEERS, SHARD_SECRET, SHARD_SELF, HashRing, ShardRouter, nginx_config, send_members
+from workout_entry import iso_day
+from tracing import Tracer, TracingMiddleware, current_trace, end_span, span, start_span
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
+# Operator endpoints under /admin need this in X-Admin-Token; unset disables them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+# The session cookie holds only an opaque id; session data stays server-side
+app.session_interface = create_session_interface()
 
-# MET Values for calorie calculation
-MET_VALUES = {
-    "Warm-up": 3,
-    "Workout": 6,
-    "Cool-down": 2.5
-}
+# In-memory storage (replace with database in production), sharded by regn_id.
+# Hold member_lock(regn_id) for changes that must be atomic for a member.
+member_locks = LockStripes()
+users_data = ShardedStore(member_locks)
+workouts_data = ShardedStore(member_locks)
+weight_history = ShardedStore(member_locks)
+# Bumped whenever a member's workouts or weight change; keys report caches
+data_versions = ShardedStore(member_locks)
+# Background job records, keyed by job id
+jobs_data = ShardedStore(member_locks)
 
-# In-memory storage (replace with database in production)
-users_data = {}
-workouts_data = {}
+report_service = ReportService()
+chart_cache = ChartCache()
+job_queue = JobQueue(store=jobs_data)
+job_queue.register('workout-export', workouts_csv)
+# Durable log of workout sessions, when WORKOUT_DB_PATH is set
+workout_log = WorkoutLog(WORKOUT_DB_PATH) if WORKOUT_DB_PATH else None
+# Per-route request counts and latency histograms, exposed on /metrics
+request_metrics = RequestMetrics()
+# Recent request traces, served at /debug/traces
+tracer = Tracer()
+app.wsgi_app = TracingMiddleware(app.wsgi_app, tracer)
+# Requests slower than SLOW_REQUEST_MS are logged with their context
+slow_request_log = SlowRequestLog()
+# Allocation snapshots for /admin/memory/snapshot
+memory_snapshots = TracemallocSnapshots()
+# Profiles of sampled requests; the middleware is only installed when enabled
+profiles = ProfileBuffer()
+profiling_middleware = None
+if profiling_enabled():
+    profiling_middleware = ProfilingMiddleware(app.wsgi_app, profiles)
+    app.wsgi_app = profiling_middleware
+# Scale testing: start from synthetic members rather than empty stores
+if SYNTHETIC_DATA_PATH:
+    load_ndjson(SYNTHETIC_DATA_PATH, users_data, workouts_data, weight_history, data_versions)
+elif SYNTHETIC_MEMBERS:
+    populate(SyntheticGym(seed=SYNTHETIC_SEED), SYNTHETIC_MEMBERS,
+             users_data, workouts_data, weight_history, data_versions)
+# Sessions acknowledged before a restart come back from the workout log
+if workout_log is not None:
+    workout_log.load(workouts_data)
+# Copies of selected requests go to the shadow deployment, off the request path
+shadow_tee = None
+if SHADOW_BASE_URL:
+    shadow_tee = ShadowTee(SHADOW_BASE_URL)
+    app.wsgi_app = ShadowMiddleware(app.wsgi_app, shadow_tee)
+# Members are spread over the replicas in SHARD_PEERS. The router is the
+# outermost middleware so another replica's requests are forwarded untouched.
+shard_router = None
+if SHARD_PEERS:
+    shard_router = ShardRouter(app.wsgi_app, HashRing(SHARD_PEERS), SHARD_SELF, SHARD_SECRET)
+    app.wsgi_app = shard_router
 
 # Helper functions
-def calculate_bmi(weight_kg, height_cm):
-    """Calculate Body Mass Index"""
-    return weight_kg / ((height_cm / 100) ** 2)
-
-def calculate_bmr(weight_kg, height_cm, age, gender):
-    """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
-    if gender.upper() == 'M':
-        return 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
-    else:
-        return 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
-
-def calculate_calories(category, duration_min, weight_kg):
-    """Calculate calories burned during exercise"""
-    met = MET_VALUES.get(category, 5)
-    return (met * 3.5 * weight_kg / 200) * duration_min
-
 def get_user_id():
     """Get current user ID from session"""
     return session.get('user_id', 'guest')
 
+def member_lock(user_id):
+    """Lock guarding one member's entries in every store"""
+    return member_locks.lock_for(user_id)
+
+def bump_data_version(user_id):
+    """Mark a member's derived data (reports, charts) as stale"""
+    with member_lock(user_id):
+        data_versions[user_id] = data_versions.get(user_id, 0) + 1
+
+def recompute_metrics(payload):
+    """Job: refresh every member's stored BMI/BMR after a formula change"""
+    updated = recompute_all(users_data, weight_history)
+    for regn_id in users_data.keys():
+        bump_data_version(regn_id)
+    return {'members': updated}
+
+def nightly_report(payload):
+    """Job: write every member's weekly summary; a retry resumes from the checkpoint"""
+    week_day = date.fromisoformat(payload['week'])
+    output = os.path.join(NIGHTLY_REPORT_DIR, week_bounds(week_day)[0].isoformat())
+    summary = run_nightly_job(users_data, workouts_data, weight_history, output, week_day,
+                              workers=payload.get('workers'),
+                              chunk_size=payload.get('chunk_size') or DEFAULT_CHUNK_SIZE)
+    return dict(summary['totals'], output=output, week_start=summary['week_start'])
+
+# Both work on this process's stores, so they never go to a process pool
+job_queue.register('recompute-metrics', recompute_metrics, max_attempts=1, in_process=True)
+job_queue.register('nightly-report', nightly_report, in_process=True)
+
+# The current member's records are read from storage at most once per
+# request and kept on flask.g
+def current_member():
+    """The logged-in member as a Member, or None if not registered"""
+    if 'member' not in g:
+        with span('store.member'):
+            data = users_data.get(get_user_id())
+            g.member = None if data is None else Member.from_dict(data)
+    return g.member
+
+def current_history():
+    """The logged-in member's WeightHistory, or None"""
+    if 'weight_history' not in g:
+        with span('store.history'):
+            g.weight_history = weight_history.get(get_user_id())
+    return g.weight_history
+
+def current_workouts():
+    """The logged-in member's sessions by category"""
+    if 'workouts' not in g:
+        with span('store.workouts'):
+            g.workouts = workouts_data.get(get_user_id(), {'Warm-up': [], 'Workout': [], 'Cool-down': []})
+    return g.workouts
+
+def session_calories(category, entry):
+    """Calories for one of the current member's sessions, using the weight in
+    effect on its date"""
+    member = current_member()
+    return entry_calories(current_history(), category, entry,
+                          member.weight if member is not None else 70)
+
+def recent_workout_calories(days=7):
+    """The current member's average daily workout calories over the last `days` days"""
+    cutoff = (date.today() - timedelta(days=days - 1)).toordinal()
+    total = 0
+    for category, sessions in current_workouts().items():
+        # Sessions are stored oldest first
+        for entry in reversed(sessions):
+            if entry.day < cutoff:
+                break
+            total += session_calories(category, entry)
+    return total / days
+
+# Unmatched URLs share one label so 404 probes cannot blow up cardinality.
+# The timing is kept in the WSGI environ rather than on g, which may outlive
+# a single request.
+@app.before_request
+def start_request_metrics():
+    endpoint = request.endpoint or 'unmatched'
+    request.environ['aceest.metrics'] = [endpoint, request_metrics.begin(endpoint), 500, None]
+
+@app.after_request
+def note_response_status(response):
+    timing = request.environ.get('aceest.metrics')
+    if timing is not None:
+        timing[2] = response.status_code
+        timing[3] = response.content_length
+    return response
+
+# Traces are named after the route rather than the concrete URL
+@app.before_request
+def name_trace():
+    trace = current_trace()
+    if trace is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        trace.root.name = f'{request.method} {route}'
+        trace.root.set('http.route', route)
+
+@before_render_template.connect_via(app)
+def start_template_span(sender, template, context, **extra):
+    g.template_span = start_span('template.render', template=template.name or '')
+
+@template_rendered.connect_via(app)
+def end_template_span(sender, template, context, **extra):
+    end_span(g.pop('template_span'))
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider with jsonify() timed as a span"""
+
+    def response(self, *args, **kwargs):
+        with span('json.serialize'):
+            return super().response(*args, **kwargs)
+
+app.json = TracedJSONProvider(app)
+
+@app.teardown_request
+def record_request_metrics(error=None):
+    timing = request.environ.pop('aceest.metrics', None)
+    if timing is not None:
+        endpoint, started, status, size = timing
+        request_metrics.finish(endpoint, request.method, status, started)
+        duration_ms = (time.perf_counter() - started) * 1000
+        if slow_request_log.is_slow(duration_ms):
+            log_slow_request(endpoint, status, size, duration_ms)
+
+def log_slow_request(endpoint, status, size, duration_ms):
+    """Write the slow-request line for the request being torn down"""
+    user_id = session.get('user_id')
+    workouts = g.workouts if 'workouts' in g else workouts_data.get(user_id) if user_id else None
+    trace = current_trace()
+    slow_request_log.record({
+        'route': request.url_rule.rule if request.url_rule is not None else None,
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': status,
+        'duration_ms': round(duration_ms, 3),
+        'member': user_id,
+        'history': {c: len(s) for c, s in workouts.items()} if workouts is not None else None,
+        'response_bytes': size,
+        'stages_ms': trace.stage_totals() if trace is not None else None,
+        'trace_id': f'{trace.trace_id:032x}' if trace is not None else None,
+    })
+
 def login_required(f):
     """Decorator to require login"""
     @wraps(f)
@@ -53,6 +262,17 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def admin_required(f):
+    """Decorator for operator endpoints; they 404 unless ADMIN_TOKEN is set"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'success': False, 'message': 'Not found'}), 404
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return jsonify({'success': False, 'message': 'Admin token required'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 # Routes
 @app.route('/')
 def index():
@@ -73,16 +293,12 @@ def register():
             height_cm = float(data['height'])
             weight_kg = float(data['weight'])
             
-            # Check if user already exists
-            if regn_id in users_data:
-                return jsonify({'success': False, 'message': 'User already registered'}), 400
-            
             # Calculate BMI and BMR
-            bmi = calculate_bmi(weight_kg, height_cm)
-            bmr = calculate_bmr(weight_kg, height_cm, age, gender)
+            with span('calculate.bmi_bmr'):
+                bmi = calculate_bmi(weight_kg, height_cm)
+                bmr = calculate_bmr(weight_kg, height_cm, age, gender)
             
-            # Store user data
-            users_data[regn_id] = {
+            user = {
                 'name': name,
                 'regn_id': regn_id,
                 'age': age,
@@ -94,12 +310,21 @@ def register():
                 'registered_date': datetime.now().isoformat()
             }
             
-            # Initialize workout data for user
-            workouts_data[regn_id] = {
-                'Warm-up': [],
-                'Workout': [],
-                'Cool-down': []
-            }
+            # Store user data; the check and insert are atomic per member
+            with span('store.register'), member_lock(regn_id):
+                if not users_data.insert_if_absent(regn_id, user):
+                    return jsonify({'success': False, 'message': 'User already registered'}), 400
+                weight_history[regn_id] = WeightHistory(date.today().isoformat(), weight_kg)
+                bump_data_version(regn_id)
+                
+                # Initialize workout data for user, keeping any sessions
+                # restored from the workout log
+                if regn_id not in workouts_data:
+                    workouts_data[regn_id] = {
+                        'Warm-up': [],
+                        'Workout': [],
+                        'Cool-down': []
+                    }
             
             # Set session
             session['user_id'] = regn_id
@@ -126,9 +351,11 @@ def login():
         data = request.get_json()
         regn_id = data.get('regn_id')
         
-        if regn_id in users_data:
+        with span('store.member'):
+            user = users_data.get(regn_id)
+        if user is not None:
             session['user_id'] = regn_id
-            session['user_name'] = users_data[regn_id]['name']
+            session['user_name'] = user['name']
             return jsonify({'success': True, 'message': 'Login successful!'})
         else:
             return jsonify({'success': False, 'message': 'User not found. Please register.'}), 404
@@ -145,9 +372,7 @@ def logout():
 @login_required
 def dashboard():
     """Main dashboard"""
-    user_id = get_user_id()
-    user = users_data.get(user_id, {})
-    return render_template('dashboard.html', user=user)
+    return render_template('dashboard.html', user=current_member())
 
 @app.route('/api/workout/add', methods=['POST'])
 @login_required
@@ -163,25 +388,50 @@ def add_workout():
         
         if duration <= 0:
             return jsonify({'success': False, 'message': 'Duration must be positive'}), 400
+        if not isinstance(category, str) or category not in MET_VALUES:
+            return jsonify({'success': False, 'message': f'Unknown category: {category!r}'}), 400
+        if not isinstance(exercise, str) or not exercise.strip():
+            return jsonify({'success': False, 'message': 'Exercise must be a non-empty name'}), 400
         
-        # Get user weight for calorie calculation
-        weight = users_data.get(user_id, {}).get('weight', 70)
-        calories = calculate_calories(category, duration, weight)
+        # Calories are derived from the weight history when read, not stored
+        workout_entry = WorkoutEntry.at(exercise, duration, datetime.now())
         
-        workout_entry = {
-            'exercise': exercise,
-            'duration': duration,
-            'calories': round(calories, 1),
-            'timestamp': datetime.now().isoformat(),
-            'date': date.today().isoformat()
-        }
+        with span('store.append'), member_lock(user_id):
+            member_workouts = workouts_data.get(user_id)
+            if member_workouts is None:
+                # Handed off to another replica since this session logged in
+                return jsonify({'success': False, 'message': 'User not found. Please register.'}), 404
+            sessions = member_workouts[category]
+            # The member lock fixes the session's place in the log and in
+            # memory; the wait for the disk happens after releasing it, so
+            # members sharing the lock stripe share the commit too
+            written = None
+            if workout_log is not None:
+                try:
+                    written = workout_log.submit(user_id, category, workout_entry)
+                except WorkoutLogError as e:
+                    return jsonify({'success': False, 'message': str(e)}), 503
+            sessions.append(workout_entry)
+            bump_data_version(user_id)
         
-        workouts_data[user_id][category].append(workout_entry)
+        # Acknowledge only once the session is durable. Reads may see it a
+        # moment earlier; if the write fails it is taken back out.
+        if written is not None:
+            try:
+                with span('workout_log.append'):
+                    written.result()
+            except WorkoutLogError as e:
+                with member_lock(user_id):
+                    sessions.remove(workout_entry)
+                    bump_data_version(user_id)
+                return jsonify({'success': False, 'message': str(e)}), 503
         
+        with span('calculate.calories'):
+            calories = session_calories(category, workout_entry)
         return jsonify({
             'success': True,
             'message': f'{exercise} added successfully!',
-            'calories': round(calories, 1)
+            'calories': calories
         })
         
     except KeyError as e:
@@ -193,32 +443,14 @@ def add_workout():
 @login_required
 def workout_summary():
     """Get workout summary"""
-    user_id = get_user_id()
-    workouts = workouts_data.get(user_id, {'Warm-up': [], 'Workout': [], 'Cool-down': []})
-    
-    summary = {
-        'categories': {},
-        'total_time': 0,
-        'total_calories': 0,
-        'session_count': 0
-    }
-    
-    for category, sessions in workouts.items():
-        category_time = sum(s['duration'] for s in sessions)
-        category_calories = sum(s['calories'] for s in sessions)
-        
-        summary['categories'][category] = {
-            'count': len(sessions),
-            'total_time': category_time,
-            'total_calories': round(category_calories, 1),
-            'sessions': sessions
-        }
-        
-        summary['total_time'] += category_time
-        summary['total_calories'] += category_calories
-        summary['session_count'] += len(sessions)
-    
-    summary['total_calories'] = round(summary['total_calories'], 1)
+    workouts = current_workouts()
+    # Load the member and weight history first so the span times only the loop
+    current_member()
+    current_history()
+    with span('aggregate.summary'):
+        summary = summarize_workouts(workouts, session_calories, include_sessions=True)
+    with span('aggregate.exercises'):
+        summary['exercises'] = exercise_totals(workouts)
     
     return jsonify(summary)
 
@@ -226,45 +458,230 @@ def workout_summary():
 @login_required
 def workout_progress():
     """Get workout progress data for charts"""
+    workouts = current_workouts()
+    current_member()
+    current_history()
+    with span('aggregate.progress'):
+        progress_data = progress_totals(workouts, session_calories)
+    
+    return jsonify(progress_data)
+
+@app.route('/api/exercises/suggest')
+def suggest_exercises():
+    """Autocomplete exercise names from the catalog"""
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    return jsonify({
+        'query': query,
+        'suggestions': [exercise.to_dict() for exercise in catalog.suggest(query, limit)]
+    })
+
+@app.route('/api/workout/chart.<fmt>')
+@login_required
+def workout_chart(fmt):
+    """Server-rendered progress charts (bar and pie) as PNG or SVG"""
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'message': f'Unsupported format: {fmt}'}), 404
+    
     user_id = get_user_id()
-    workouts = workouts_data.get(user_id, {'Warm-up': [], 'Workout': [], 'Cool-down': []})
+    size = clamp_size(request.args.get('width', DEFAULT_SIZE[0], type=int),
+                      request.args.get('height', DEFAULT_SIZE[1], type=int))
+    version = data_versions.get(user_id, 0)
     
-    progress_data = {
-        'categories': [],
-        'durations': [],
-        'calories': []
-    }
+    def load_totals():
+        workouts = current_workouts()
+        return {category: sum(s.duration for s in sessions)
+                for category, sessions in workouts.items()}
     
-    for category, sessions in workouts.items():
-        total_duration = sum(s['duration'] for s in sessions)
-        total_calories = sum(s['calories'] for s in sessions)
-        
-        if total_duration > 0:  # Only include categories with data
-            progress_data['categories'].append(category)
-            progress_data['durations'].append(total_duration)
-            progress_data['calories'].append(round(total_calories, 1))
+    try:
+        chart = chart_cache.get(user_id, version, fmt, size, load_totals)
+    except ChartsUnavailable as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
     
-    return jsonify(progress_data)
+    response = make_response(chart)
+    response.mimetype = FORMATS[fmt]
+    response.set_etag(hashlib.sha1(repr((user_id, version, fmt, size)).encode()).hexdigest())
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/api/user/profile')
 @login_required
 def user_profile():
     """Get user profile"""
+    member = current_member()
+    return jsonify(member.to_dict() if member is not None else {})
+
+@app.route('/api/user/weight', methods=['GET', 'POST'])
+@login_required
+def user_weight():
+    """Get the weight history or record a new weight"""
+    user_id = get_user_id()
+    member = current_member()
+    history = current_history()
+    if member is None or history is None:
+        return jsonify({'success': False, 'message': 'User not found. Please register.'}), 404
+    
+    if request.method == 'POST':
+        data = request.get_json()
+        
+        try:
+            weight_kg = float(data['weight'])
+            effective_date = date.fromisoformat(data.get('date', date.today().isoformat()))
+            
+            if not math.isfinite(weight_kg) or weight_kg <= 0:
+                return jsonify({'success': False, 'message': 'Weight must be a positive number'}), 400
+            if effective_date > date.today():
+                return jsonify({'success': False, 'message': 'Date cannot be in the future'}), 400
+            
+            with member_lock(user_id):
+                history.record(effective_date.isoformat(), weight_kg)
+                bump_data_version(user_id)
+                
+                # The profile always reflects the latest weight
+                member.weight = history.current_weight
+                member.bmi = round(calculate_bmi(member.weight, member.height), 2)
+                member.bmr = round(calculate_bmr(member.weight, member.height,
+                                                 member.age, member.gender), 0)
+                users_data[user_id] = member.to_dict()
+            
+        except KeyError as e:
+            return jsonify({'success': False, 'message': f'Missing field: {str(e)}'}), 400
+        except (TypeError, ValueError) as e:
+            return jsonify({'success': False, 'message': f'Invalid data: {str(e)}'}), 400
+    
+    return jsonify({
+        'success': True,
+        'weight': member.weight,
+        'bmi': member.bmi,
+        'bmr': member.bmr,
+        'history': history.timeline()
+    })
+
+def report_job_response(job):
+    """Status payload for a weekly report job"""
+    result = dict(job.to_dict(), success=True,
+                  status_url=url_for('weekly_report_status', job_id=job.id))
+    if result['status'] == 'done':
+        result['download_url'] = url_for('weekly_report_pdf', job_id=job.id)
+    return result
+
+def owned_report_job(job_id):
+    """Report job by id if it belongs to the current member"""
+    job = report_service.get(job_id)
+    if job is None or job.member_id != get_user_id():
+        return None
+    return job
+
+@app.route('/api/reports/weekly', methods=['POST'])
+@login_required
+def request_weekly_report():
+    """Queue a weekly PDF report for the current member"""
     user_id = get_user_id()
-    user = users_data.get(user_id, {})
-    return jsonify(user)
+    member = current_member()
+    if member is None:
+        return jsonify({'success': False, 'message': 'User not found. Please register.'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        week_start, week_end = week_bounds(date.fromisoformat(data.get('week', date.today().isoformat())))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid data: {str(e)}'}), 400
+    
+    def build_report_data():
+        first, last = week_start.toordinal(), week_end.toordinal()
+        week = sorted(((entry, category) for category, entries in current_workouts().items()
+                       for entry in entries if first <= entry.day <= last),
+                      key=lambda pair: pair[0].ts)
+        sessions = [dict(entry.to_dict(), category=category,
+                         calories=session_calories(category, entry))
+                    for entry, category in week]
+        return {'user': member.to_dict(), 'week_start': week_start.isoformat(),
+                'week_end': week_end.isoformat(), 'sessions': sessions}
+    
+    try:
+        job = report_service.request(user_id, week_start.isoformat(),
+                                     data_versions.get(user_id, 0), build_report_data)
+    except ReportsUnavailable as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    except ReportQueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+    
+    return jsonify(report_job_response(job)), 200 if job.status == 'done' else 202
+
+@app.route('/api/reports/weekly/<job_id>')
+@login_required
+def weekly_report_status(job_id):
+    """Poll a weekly report job"""
+    job = owned_report_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Report not found'}), 404
+    return jsonify(report_job_response(job))
+
+@app.route('/api/reports/weekly/<job_id>/pdf')
+@login_required
+def weekly_report_pdf(job_id):
+    """Download a finished weekly report"""
+    job = owned_report_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Report not found'}), 404
+    if job.status != 'done':
+        return jsonify(dict(report_job_response(job), success=False,
+                            message='Report is not ready')), 409
+    
+    return send_file(io.BytesIO(job.future.result()), mimetype='application/pdf',
+                     as_attachment=True, download_name=f'weekly_report_{job.key[1]}.pdf')
+
+@app.route('/api/workout/export', methods=['POST'])
+@login_required
+def export_workouts():
+    """Queue a CSV export of the current member's sessions"""
+    user_id = get_user_id()
+    sessions = [dict(entry.to_dict(), category=category, calories=session_calories(category, entry))
+                for category, entries in current_workouts().items()
+                for entry in entries]
+    try:
+        job = job_queue.submit('workout-export', {'regn_id': user_id, 'sessions': sessions},
+                               member_id=user_id)
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(dict(job_queue.get(job.id), success=True,
+                        status_url=url_for('job_status', job_id=job.id))), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Status, and once done the result, of one of the member's background jobs"""
+    record = job_queue.get(job_id)
+    if record is None or record['member'] != get_user_id():
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(dict(record, success=True))
 
 @app.route('/workout-plan')
 @login_required
 def workout_plan():
     """Workout plan page"""
-    return render_template('workout_plan.html')
+    plan = plan_for_member(current_member() or {}, current_workouts())
+    return render_template('workout_plan.html', plan=plan)
+
+@app.route('/api/workout-plan')
+@login_required
+def workout_plan_api():
+    """Get the member's personalized weekly workout plan"""
+    return jsonify(plan_for_member(current_member() or {}, current_workouts()))
 
 @app.route('/diet-guide')
 @login_required
 def diet_guide():
     """Diet guide page"""
-    return render_template('diet_guide.html')
+    guide = diet_plan_for_member(current_member() or {}, recent_workout_calories())
+    return render_template('diet_guide.html', guide=guide)
+
+@app.route('/api/diet-plan')
+@login_required
+def diet_plan_api():
+    """Get the member's daily calorie targets and meal plan"""
+    return jsonify(diet_plan_for_member(current_member() or {}, recent_workout_calories()))
 
 @app.route('/health')
 def health_check():
@@ -277,14 +694,344 @@ def health_check():
 
 @app.route('/metrics')
 def metrics():
-    """Metrics endpoint for monitoring"""
+    """Metrics endpoint for monitoring
+
+    JSON by default; Prometheus text exposition when the client prefers
+    text/plain (as Prometheus scrapers do) or asks for ?format=prometheus.
+    """
+    total_users = len(users_data)
+    total_workouts = sum(len(w['Warm-up']) + len(w['Workout']) + len(w['Cool-down'])
+                         for w in workouts_data.values())
+    accept = request.accept_mimetypes
+    prometheus = (request.args.get('format') == 'prometheus' or
+                  max(accept['text/plain'], accept[METRICS_CONTENT_TYPE]) > accept['application/json'])
+    if prometheus:
+        body = request_metrics.render([
+            ('aceest_members', 'Registered members in this worker', total_users),
+            ('aceest_workout_sessions', 'Logged workout sessions in this worker', total_workouts),
+        ])
+        return app.response_class(body, content_type=METRICS_CONTENT_TYPE)
     return jsonify({
-        'total_users': len(users_data),
-        'total_workouts': sum(len(w['Warm-up']) + len(w['Workout']) + len(w['Cool-down']) 
-                             for w in workouts_data.values()),
+        'total_users': total_users,
+        'total_workouts': total_workouts,
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/admin/profiles')
+@admin_required
+def list_profiles():
+    """Recently profiled requests, newest first"""
+    # Not app.wsgi_app: shadowing and sharding wrap the profiler when enabled
+    profiler = profiling_middleware
+    return jsonify({
+        'enabled': profiler is not None,
+        'mode': profiler.mode if profiler else None,
+        'sample_rate': profiler.sample_rate if profiler else 0,
+        'profiles': [p.to_dict() for p in profiles.recent()]
+    })
+
+@app.route('/admin/profiles/<int:profile_id>')
+@admin_required
+def download_profile(profile_id):
+    """Download a profile as pstats data or collapsed stacks (?format=)"""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        return jsonify({'success': False, 'message': 'Profile not found'}), 404
+    fmt = request.args.get('format', profile.formats[0])
+    if fmt not in profile.formats:
+        return jsonify({'success': False,
+                        'message': f'A {profile.mode} profile is available as: {", ".join(profile.formats)}'}), 400
+
+    if fmt == 'pstats':
+        return send_file(io.BytesIO(profile.pstats_bytes()), mimetype='application/octet-stream',
+                         as_attachment=True, download_name=f'profile-{profile.id}.prof')
+    return send_file(io.BytesIO(profile.collapsed().encode()), mimetype='text/plain',
+                     as_attachment=True, download_name=f'profile-{profile.id}.folded')
+
+@app.route('/debug/traces')
+@admin_required
+def list_traces():
+    """Recent request traces, newest first (?limit=, ?min_ms=, ?spans=0)"""
+    try:
+        limit = int(request.args.get('limit', 50))
+        min_ms = float(request.args.get('min_ms', 0))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit and min_ms must be numbers'}), 400
+    with_spans = request.args.get('spans', '1') != '0'
+    return jsonify({
+        'sample_rate': tracer.sample_rate,
+        'exported': tracer.exported,
+        'export_dropped': tracer.dropped,
+        'traces': [t.to_dict(with_spans) for t in tracer.recent(limit, min_ms)]
+    })
+
+@app.route('/debug/traces/<trace_id>')
+@admin_required
+def show_trace(trace_id):
+    """One trace with all its spans"""
+    trace = tracer.get(trace_id)
+    if trace is None:
+        return jsonify({'success': False, 'message': 'Trace not found'}), 404
+    return jsonify(trace.to_dict())
+
+@app.route('/admin/shadow')
+@admin_required
+def shadow_report():
+    """Shadow mirroring counts, primary vs shadow latency and recent mismatches (?limit=)"""
+    if shadow_tee is None:
+        return jsonify({'success': False, 'message': 'Shadow traffic is not enabled'}), 404
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+    return jsonify(dict(shadow_tee.stats(), success=True, diffs=shadow_tee.recent_diffs(limit)))
+
+@app.route('/admin/metrics/recompute', methods=['POST'])
+@admin_required
+def recompute_metrics_job():
+    """Queue a recompute of every member's stored BMI/BMR"""
+    try:
+        job = job_queue.submit('recompute-metrics', priority=PRIORITY_LOW)
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(dict(job_queue.get(job.id), success=True,
+                        status_url=url_for('admin_job_status', job_id=job.id))), 202
+
+@app.route('/admin/nightly-report', methods=['POST'])
+@admin_required
+def nightly_report_job():
+    """Queue the gym-wide weekly summaries, by default for the week containing yesterday"""
+    if not NIGHTLY_REPORT_DIR:
+        return jsonify({'success': False, 'message': 'Set NIGHTLY_REPORT_DIR to enable nightly reports'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        week_day = date.fromisoformat(data['week']) if data.get('week') else default_week_day(date.today())
+        workers = data.get('workers')
+        chunk_size = data.get('chunk_size')
+        for value in (workers, chunk_size):
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError('workers and chunk_size must be positive integers')
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid data: {str(e)}'}), 400
+    try:
+        job = job_queue.submit('nightly-report', {'week': week_day.isoformat(), 'workers': workers,
+                                                  'chunk_size': chunk_size}, priority=PRIORITY_LOW)
+    except JobQueueFull as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+    return jsonify(dict(job_queue.get(job.id), success=True,
+                        status_url=url_for('admin_job_status', job_id=job.id))), 202
+
+@app.route('/admin/jobs/<job_id>')
+@admin_required
+def admin_job_status(job_id):
+    """Status, and once done the result, of any background job"""
+    record = job_queue.get(job_id)
+    if record is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(dict(record, success=True))
+
+@app.route('/admin/sessions/<regn_id>', methods=['DELETE'])
+@admin_required
+def revoke_member_sessions(regn_id):
+    """Log a member out everywhere; other workers' cached copies expire within SESSION_CACHE_TTL"""
+    return jsonify({'success': True, 'revoked': app.session_interface.revoke_member(regn_id)})
+
+@app.route('/admin/memory')
+@admin_required
+def memory_usage():
+    """Sampled memory report: stores, heaviest members and caches (?top=, ?sample=)"""
+    try:
+        top = int(request.args.get('top', MEMORY_TOP_MEMBERS))
+        sample = int(request.args.get('sample', MEMORY_SAMPLE_SIZE))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'top and sample must be integers'}), 400
+    if top < 0 or sample < 1:
+        return jsonify({'success': False, 'message': 'top must be at least 0 and sample at least 1'}), 400
+    started = time.perf_counter()
+    # Measured first so the objects every member shares are not charged to members
+    shared = set()
+    symbol_bytes = deep_sizeof(symbols, shared)
+    report = {
+        'process': process_memory(),
+        'members': member_report(users_data, workouts_data, weight_history, top=top,
+                                 sample_size=sample, shared=frozenset(shared)),
+        'stores': {
+            'users': estimate_store(users_data, sample, set(shared)),
+            'workouts': estimate_store(workouts_data, sample, set(shared)),
+            'weight_history': estimate_store(weight_history, sample, set(shared)),
+            'data_versions': estimate_store(data_versions, sample, set(shared)),
+            'jobs': estimate_store(jobs_data, sample, set(shared)),
+        },
+        'shared': {
+            'exercise_symbols': {'names': len(symbols), 'bytes': symbol_bytes},
+            'iso_day_cache': iso_day.cache_info()._asdict(),
+        },
+        'caches': {
+            'sessions': app.session_interface.stats(),
+            'charts': chart_cache.stats(),
+            'reports': report_service.stats(),
+            'traces': {'entries': len(tracer.recent())},
+            'profiles': {'entries': len(profiles.recent())},
+        },
+        'tracemalloc': {'tracing': memory_snapshots.tracing, 'snapshots': memory_snapshots.taken},
+    }
+    report['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return jsonify(report)
+
+@app.route('/admin/memory/snapshot', methods=['POST', 'DELETE'])
+@admin_required
+def memory_snapshot():
+    """Take a tracemalloc snapshot and diff it against the previous one (POST),
+    or stop tracing (DELETE)"""
+    if request.method == 'DELETE':
+        memory_snapshots.stop()
+        return jsonify({'success': True, 'tracing': memory_snapshots.tracing})
+    try:
+        top = int(request.args.get('top', 20))
+        frames = int(request.args.get('frames', 1))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'top and frames must be integers'}), 400
+    if top < 0 or not 1 <= frames <= MAX_TRACEBACK_FRAMES:
+        return jsonify({'success': False,
+                        'message': f'top must be at least 0 and frames between 1 and {MAX_TRACEBACK_FRAMES}'}), 400
+    return jsonify(dict(memory_snapshots.snapshot(top=top, frames=frames), success=True))
+
+def hand_off_members(ring):
+    """Send members the ring now places elsewhere to their owners and drop them here"""
+    outgoing = {}
+    for regn_id in users_data.keys():
+        owner = ring.owner(regn_id)
+        if owner != shard_router.self_node:
+            outgoing.setdefault(owner, []).append(regn_id)
+    stores = (users_data, workouts_data, weight_history, data_versions)
+    moved, failed = {}, {}
+    for owner, member_ids in outgoing.items():
+        # Each member leaves the stores in the same locked step that copies
+        # it, so no write can land here after the copy; a write arriving later
+        # finds no member, and retried it is routed to the new owner
+        taken = {}
+        for regn_id in member_ids:
+            with member_lock(regn_id):
+                records = [store.pop(regn_id, None) for store in stores]
+            if records[0] is not None:
+                taken[regn_id] = records
+        if not taken:
+            continue
+        lines = [member_line(profile, history, workouts or {})
+                 for profile, workouts, history, _ in taken.values()]
+        try:
+            moved[owner] = send_members(owner, lines, ADMIN_TOKEN)
+        except OSError as e:
+            failed[owner] = str(e)
+            for regn_id, records in taken.items():
+                with member_lock(regn_id):
+                    if regn_id not in users_data:
+                        for store, record in zip(stores, records):
+                            if record is not None:
+                                store[regn_id] = record
+            continue
+        # The new owner has logged their sessions; without this a restart
+        # would load them back here for members this replica no longer owns
+        if workout_log is not None:
+            try:
+                workout_log.submit_removal(list(taken)).result()
+            except WorkoutLogError as e:
+                failed[owner] = f'Handed off, but still in the local workout log: {e}'
+    return moved, failed
+
+@app.route('/admin/shards', methods=['GET', 'POST'])
+@admin_required
+def shards():
+    """This replica's place on the member ring; POST {"peers": [...]} to change it"""
+    if shard_router is None:
+        return jsonify({'success': False, 'message': 'Sharding is not enabled'}), 404
+    handoff = None
+    if request.method == 'POST':
+        peers = (request.get_json(silent=True) or {}).get('peers')
+        if not isinstance(peers, list) or not peers or not all(isinstance(p, str) and ':' in p
+                                                               for p in peers):
+            return jsonify({'success': False, 'message': 'peers must be a list of host:port'}), 400
+        # Route by the new ring first so nothing new lands on members being moved
+        shard_router.ring = HashRing(peers)
+        moved, failed = hand_off_members(shard_router.ring)
+        handoff = {'moved': moved, 'failed': failed}
+    ring = shard_router.ring
+    held = users_data.keys()
+    misplaced = sum(ring.owner(regn_id) != shard_router.self_node for regn_id in held)
+    return jsonify({
+        'success': True,
+        'self': shard_router.self_node,
+        'peers': list(ring.nodes),
+        'members': len(held),
+        'misplaced': misplaced,
+        'forwarded': shard_router.forwarded,
+        'handoff': handoff,
+    })
+
+@app.route('/admin/shards/import', methods=['POST'])
+@admin_required
+def import_members():
+    """Store members handed off by another replica, one NDJSON member per line
+
+    Their sessions are in the workout log before the sender is told it can
+    let them go.
+    """
+    users, workouts, histories = {}, {}, {}
+    try:
+        totals = load_member_lines(request.get_data(as_text=True).splitlines(),
+                                   users, workouts, histories)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid member record: {e}'}), 400
+    if workout_log is not None:
+        try:
+            workout_log.submit_members(workouts).result()
+        except WorkoutLogError as e:
+            return jsonify({'success': False, 'message': str(e)}), 503
+    for regn_id, profile in users.items():
+        with member_lock(regn_id):
+            users_data[regn_id] = profile
+            workouts_data[regn_id] = workouts[regn_id]
+            weight_history[regn_id] = histories[regn_id]
+            bump_data_version(regn_id)
+    return jsonify(dict(totals, success=True))
+
+@app.cli.command('profile-token')
+@click.option('--ttl', type=int, default=600, show_default=True, help='Seconds the token stays valid')
+def profile_token_command(ttl):
+    """Print an X-Debug-Profile header value that forces profiling of a request"""
+    if not PROFILE_SECRET:
+        raise click.UsageError('Set PROFILE_SECRET to sign debug tokens')
+    click.echo(sign_debug_token(PROFILE_SECRET, time.time() + ttl))
+
+@app.cli.command('seed-data')
+@click.option('--members', type=int, required=True, help='Number of members to generate')
+@click.option('--output', required=True, type=click.Path(file_okay=False),
+              help='Directory for the NDJSON files; load them with SYNTHETIC_DATA_PATH')
+@click.option('--seed', type=int, default=0, show_default=True)
+@click.option('--years', type=int, default=3, show_default=True, help='Years of sessions')
+@click.option('--mean-visits', type=float, default=40, show_default=True,
+              help='Mean visits of an active member')
+@click.option('--files', type=int, default=1, show_default=True)
+@click.option('--workers', type=int, default=1, show_default=True, help='Processes writing files')
+def seed_data_command(members, output, seed, years, mean_visits, files, workers):
+    """Write seeded synthetic members and sessions as NDJSON"""
+    gym = SyntheticGym(seed=seed, years=years, mean_visits=mean_visits)
+    started = time.perf_counter()
+    totals = write_ndjson(gym, members, output, files=files, workers=workers)
+    elapsed = time.perf_counter() - started
+    click.echo(f"{totals['members']} members, {totals['sessions']} sessions "
+               f"in {len(totals['files'])} file(s), {elapsed:.1f}s")
+
+@app.cli.command('shard-nginx')
+@click.option('--peers', default=None, help='Comma-separated host:port replicas (default: SHARD_PEERS)')
+@click.option('--listen', type=int, default=80, show_default=True)
+def shard_nginx_command(peers, listen):
+    """Print an nginx.conf sending each member to the replica that owns them"""
+    nodes = [p.strip() for p in peers.split(',') if p.strip()] if peers else SHARD_PEERS
+    if not nodes:
+        raise click.UsageError('Pass --peers or set SHARD_PEERS')
+    click.echo(nginx_config(nodes, listen), nl=False)
+
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
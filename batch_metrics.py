@@ -0,0 +1,128 @@
+"""
+ACEest Fitness - Batch health-metrics engine
+
+Column-oriented versions of the BMI/BMR helpers in calculations.py, used by
+the recompute-metrics job that refreshes every member's stored figures after
+a formula change. NumPy is used when it is installed; otherwise the
+functions fall back to the stdlib ``array`` module and the scalar helpers, so
+results are always bit-identical to calculate_bmi and calculate_bmr. Session
+calories are not stored, so they have no batch path; each member's
+WeightHistory derives them when read.
+"""
+
+from array import array
+from operator import itemgetter
+
+from calculations import calculate_bmi, calculate_bmr
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+# Rows processed per step. Working in cache-sized blocks with in-place ufuncs
+# avoids allocating and streaming full-length temporaries for every operator.
+BLOCK_SIZE = 16384
+
+
+def encode_genders(genders):
+    """Encode genders as 1 for male and 0 otherwise, matching calculate_bmr"""
+    flags = [1 if gender.upper() == 'M' else 0 for gender in genders]
+    if np is not None:
+        return np.array(flags, dtype=np.bool_)
+    return array('b', flags)
+
+
+def calculate_bmi_batch(weights_kg, heights_cm):
+    """Calculate Body Mass Index for a column of members"""
+    if np is None:
+        return array('d', map(calculate_bmi, weights_kg, heights_cm))
+    weights = np.asarray(weights_kg, dtype=np.float64)
+    heights = np.asarray(heights_cm, dtype=np.float64)
+    out = np.empty(len(weights))
+    for start in range(0, len(out), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        o = out[block]
+        np.divide(heights[block], 100, out=o)
+        np.square(o, out=o)
+        np.divide(weights[block], o, out=o)
+    return out
+
+
+def calculate_bmr_batch(weights_kg, heights_cm, ages, male_flags):
+    """Calculate Basal Metabolic Rate for a column of members
+
+    male_flags is the output of encode_genders().
+    """
+    if np is None:
+        genders = ['M' if flag else 'F' for flag in male_flags]
+        return array('d', map(calculate_bmr, weights_kg, heights_cm, ages, genders))
+    weights = np.asarray(weights_kg, dtype=np.float64)
+    heights = np.asarray(heights_cm, dtype=np.float64)
+    ages = np.asarray(ages)
+    male = np.asarray(male_flags, dtype=np.bool_).view(np.int8)
+    # Same evaluation order as calculate_bmr; x - 161 == x + (-161) exactly.
+    offsets = np.array([-161.0, 5.0])
+    out = np.empty(len(weights))
+    tmp = np.empty(min(BLOCK_SIZE, len(out)))
+    for start in range(0, len(out), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        o = out[block]
+        t = tmp[:len(o)]
+        np.multiply(weights[block], 10, out=o)
+        np.multiply(heights[block], 6.25, out=t)
+        o += t
+        np.multiply(ages[block], 5, out=t)
+        o -= t
+        offsets.take(male[block], out=t)
+        o += t
+    return out
+
+
+def round_column(values, ndigits):
+    """[round(v, ndigits) for v in values] as Python floats
+
+    With NumPy, values are scaled, rounded half-to-even and scaled back,
+    which equals round() except where scaling lands within rounding error
+    of a half; those few are redone with round().
+    """
+    if np is None:
+        return [round(float(v), ndigits) for v in values]
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.rint(scaled)
+    out /= scale
+    if ndigits:
+        near_half = (np.abs(scaled - np.floor(scaled) - 0.5)
+                     < 1e-9 * np.maximum(np.abs(scaled), 1))
+        for i in np.flatnonzero(near_half).tolist():
+            out[i] = round(float(values[i]), ndigits)
+    return out.tolist()
+
+
+def recompute_all(users_data, weight_history=None):
+    """Recompute stored BMI/BMR for every member
+
+    Run by the recompute-metrics job after formula or MET-table changes.
+    Session calories are derived lazily from each member's WeightHistory, so
+    their memoized rates are dropped rather than rewritten. The caller bumps
+    data versions. Returns the number of members updated.
+    """
+    users = list(users_data.values())
+    # map(itemgetter) gathers a column without a bytecode loop per member
+    weights = list(map(itemgetter('weight'), users))
+    heights = list(map(itemgetter('height'), users))
+    ages = list(map(itemgetter('age'), users))
+    genders = list(map(itemgetter('gender'), users))
+
+    bmis = round_column(calculate_bmi_batch(weights, heights), 2)
+    bmrs = round_column(calculate_bmr_batch(weights, heights, ages, encode_genders(genders)), 0)
+    for user, bmi, bmr in zip(users, bmis, bmrs):
+        user['bmi'] = bmi
+        user['bmr'] = bmr
+
+    for history in (weight_history or {}).values():
+        history.clear_cache()
+
+    return len(users)
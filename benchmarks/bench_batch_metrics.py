@@ -0,0 +1,105 @@
+"""
+Benchmark: scalar vs batch BMI/BMR recomputation
+
+Times recompute_all end to end, including building the columns from the
+member dicts and writing the rounded results back, against the scalar loop
+it replaces. The kernel-only lines time calculate_bmi_batch and
+calculate_bmr_batch on columns that are already encoded, which is the part
+NumPy speeds up; their scalar baselines run on plain lists, as the scalar
+helpers do in the app.
+
+End to end falls well short of the 50x target: members are dicts, and
+reading four fields out of each and writing two back is per-member Python
+work that costs more than the scalar arithmetic. Only a column store for
+profiles would remove it. The report prints the gap.
+
+Usage:
+    python -m benchmarks.bench_batch_metrics [--rows 1000000]
+"""
+
+import argparse
+import random
+import time
+
+from calculations import calculate_bmi, calculate_bmr
+import batch_metrics
+
+# Whole-base recompute speedup the batch engine was asked for
+TARGET_SPEEDUP = 50
+
+
+def build_users(rows, seed=42):
+    """Generate synthetic member profiles keyed by regn_id"""
+    rng = random.Random(seed)
+    return {
+        f'M{n:07d}': {'weight': round(rng.uniform(40, 140), 1),
+                      'height': round(rng.uniform(140, 210), 1),
+                      'age': rng.randint(16, 80), 'gender': rng.choice('MF')}
+        for n in range(rows)
+    }
+
+
+def scalar_recompute(users):
+    """The per-member loop recompute_all replaces"""
+    for user in users.values():
+        user['bmi'] = round(calculate_bmi(user['weight'], user['height']), 2)
+        user['bmr'] = round(calculate_bmr(user['weight'], user['height'],
+                                          user['age'], user['gender']), 0)
+
+
+def best_of(fn, repeat):
+    """Return the best wall-clock time of fn over repeat runs"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    users = build_users(args.rows)
+    backend = 'numpy' if batch_metrics.np is not None else 'array (fallback)'
+    print(f"rows={args.rows:,} backend={backend}")
+
+    scalar_time = best_of(lambda: scalar_recompute(users), args.repeat)
+    batch_time = best_of(lambda: batch_metrics.recompute_all(users), args.repeat)
+    speedup = scalar_time / batch_time
+    print(f"recompute: scalar {scalar_time * 1000:9.1f}ms  "
+          f"recompute_all {batch_time * 1000:9.1f}ms  speedup {speedup:6.2f}x")
+    verdict = 'met' if speedup >= TARGET_SPEEDUP else f'missed by {TARGET_SPEEDUP / speedup:.1f}x'
+    print(f"end-to-end target {TARGET_SPEEDUP}x: {verdict}")
+
+    profiles = list(users.values())
+    w = [u['weight'] for u in profiles]
+    h = [u['height'] for u in profiles]
+    a = [u['age'] for u in profiles]
+    g = [u['gender'] for u in profiles]
+    encode_time = best_of(lambda: batch_metrics.encode_genders(g), args.repeat)
+    male = batch_metrics.encode_genders(g)
+    # The batch side gets encoded columns; the scalar side keeps the lists,
+    # since arithmetic on NumPy scalars is slower than on Python floats
+    cw, ch, ca = w, h, a
+    if batch_metrics.np is not None:
+        cw, ch, ca = (batch_metrics.np.asarray(x) for x in (w, h, a))
+    cases = [
+        ('bmi', lambda: [calculate_bmi(*r) for r in zip(w, h)],
+         lambda: batch_metrics.calculate_bmi_batch(cw, ch)),
+        ('bmr', lambda: [calculate_bmr(*r) for r in zip(w, h, a, g)],
+         lambda: batch_metrics.calculate_bmr_batch(cw, ch, ca, male)),
+    ]
+    print(f"kernels only (gender encoding {encode_time * 1000:.1f}ms not included):")
+    for name, scalar, batch in cases:
+        scalar_time = best_of(scalar, args.repeat)
+        batch_time = best_of(batch, args.repeat)
+        print(f"{name:>9}: scalar {scalar_time * 1000:9.1f}ms  "
+              f"batch {batch_time * 1000:8.2f}ms  speedup {scalar_time / batch_time:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Benchmark: server-side chart rendering, figure reuse and cache hits
+
+Usage:
+    python -m benchmarks.bench_charts [--renders 50]
+"""
+
+import argparse
+import time
+
+from charts import ChartCache, ChartRenderer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--renders', type=int, default=50)
+    args = parser.parse_args()
+    totals = [{'Warm-up': 10 + i, 'Workout': 30 + 2 * i, 'Cool-down': i % 7}
+              for i in range(args.renders)]
+
+    for fmt in ('png', 'svg'):
+        start = time.perf_counter()
+        for t in totals:
+            ChartRenderer().render(t, fmt)
+        fresh = (time.perf_counter() - start) / args.renders
+
+        renderer = ChartRenderer()
+        start = time.perf_counter()
+        for t in totals:
+            renderer.render(t, fmt)
+        reused = (time.perf_counter() - start) / args.renders
+
+        cache = ChartCache()
+        cache.get('member', 1, fmt, (800, 500), lambda: totals[0])
+        start = time.perf_counter()
+        for _ in range(args.renders):
+            cache.get('member', 1, fmt, (800, 500), lambda: totals[0])
+        hit = (time.perf_counter() - start) / args.renders
+
+        print(f"{fmt}: new figure {fresh * 1000:6.1f}ms  reused figure {reused * 1000:6.1f}ms  "
+              f"cache hit {hit * 1e6:6.1f}us")
+
+
+if __name__ == '__main__':
+    main()
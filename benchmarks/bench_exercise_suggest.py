@@ -0,0 +1,66 @@
+"""
+Benchmark: exercise autocomplete latency over a large catalog
+
+Usage:
+    python -m benchmarks.bench_exercise_suggest [--entries 10000] [--queries 20000]
+"""
+
+import argparse
+import random
+import string
+import time
+
+import app as app_module
+from exercise_catalog import ExerciseCatalog
+
+
+def build_catalog(entries, seed=42):
+    """Generate a catalog of plausible multi-word exercise names"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+             for _ in range(2000)]
+    rows = set()
+    while len(rows) < entries:
+        rows.add(' '.join(rng.choice(words).title() for _ in range(rng.randint(1, 3))))
+    return ExerciseCatalog((name, 'Workout', round(rng.uniform(2, 12), 1)) for name in rows), words
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return pick(0.50), pick(0.99), samples[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=10_000)
+    parser.add_argument('--queries', type=int, default=20_000)
+    args = parser.parse_args()
+
+    catalog, words = build_catalog(args.entries)
+    rng = random.Random(7)
+    queries = [rng.choice(words)[:rng.randint(1, 4)] for _ in range(args.queries)]
+
+    index_times = []
+    for query in queries:
+        start = time.perf_counter()
+        catalog.suggest(query)
+        index_times.append(time.perf_counter() - start)
+
+    app_module.catalog = catalog
+    client = app_module.app.test_client()
+    endpoint_times = []
+    for query in queries:
+        start = time.perf_counter()
+        response = client.get('/api/exercises/suggest', query_string={'q': query})
+        response.get_data()
+        endpoint_times.append(time.perf_counter() - start)
+
+    print(f"catalog={len(catalog):,} entries, {args.queries:,} queries")
+    for name, samples in (('index', index_times), ('endpoint', endpoint_times)):
+        p50, p99, worst = percentiles(samples)
+        print(f"{name:>9}: p50 {p50 * 1e6:7.1f}us  p99 {p99 * 1e6:7.1f}us  max {worst * 1e6:8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
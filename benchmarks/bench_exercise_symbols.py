@@ -0,0 +1,107 @@
+"""
+Benchmark: exercise names as fresh strings vs interned strings vs symbol IDs
+
+A synthetic gym of members logs sessions whose exercise names follow a
+skewed popularity curve over the catalog plus some custom exercises, typed
+with members' own casing and spacing. Memory is what the exercise field
+costs across all sessions; group-by is per-exercise session count and
+minutes over every session, merging spelling variants.
+
+Usage:
+    python -m benchmarks.bench_exercise_symbols [--sessions 200000] [--custom 300]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from exercise_catalog import catalog, normalize_name
+from exercise_symbols import ExerciseSymbols
+
+
+def typed_names(sessions, custom, seed):
+    """Exercise names as they arrive in request bodies, one per session"""
+    rng = random.Random(seed)
+    base = [e.name for e in catalog.exercises] + [f'Custom drill {n}' for n in range(custom)]
+    weights = [1 / (rank + 1) for rank in range(len(base))]
+    variants = (str, str.lower, str.upper, lambda n: f' {n}', lambda n: n.replace(' ', '  '))
+    picks = rng.choices(base, weights, k=sessions)
+    # Decode each from JSON so every session holds its own string, like add_workout did
+    return [json.loads(json.dumps(rng.choice(variants)(name))) for name in picks]
+
+
+def allocated(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = build()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def group_by_name(names, durations):
+    counts, minutes = {}, {}
+    for name, duration in zip(names, durations):
+        key = normalize_name(name)
+        counts[key] = counts.get(key, 0) + 1
+        minutes[key] = minutes.get(key, 0) + duration
+    return counts, minutes
+
+
+def group_by_id(ids, durations):
+    counts, minutes = {}, {}
+    for symbol, duration in zip(ids, durations):
+        counts[symbol] = counts.get(symbol, 0) + 1
+        minutes[symbol] = minutes.get(symbol, 0) + duration
+    return counts, minutes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200000)
+    parser.add_argument('--custom', type=int, default=300, help='custom exercise names')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=40)
+    args = parser.parse_args()
+
+    names = typed_names(args.sessions, args.custom, args.seed)
+    durations = [10 + n % 50 for n in range(args.sessions)]
+    table = ExerciseSymbols(catalog)
+
+    fresh = allocated(lambda: [json.loads(json.dumps(n)) for n in names])
+    interned = allocated(lambda: [sys.intern(json.loads(json.dumps(n))) for n in names])
+    encoded = allocated(lambda: [table.encode(json.loads(json.dumps(n))) for n in names])
+    ids = [table.encode(n) for n in names]
+    pointers = sys.getsizeof(ids)
+
+    print(f"{args.sessions} sessions, {len(table)} distinct exercises "
+          f"({len(set(names))} spellings)")
+    print(f"memory   fresh strings : {fresh / args.sessions:6.1f} B/session")
+    print(f"memory   interned      : {interned / args.sessions:6.1f} B/session")
+    print(f"memory   symbol IDs    : {encoded / args.sessions:6.1f} B/session "
+          f"(list slots alone {pointers / args.sessions:.1f})")
+
+    by_name = best_of(args.repeat, lambda: group_by_name(names, durations))
+    by_id = best_of(args.repeat, lambda: group_by_id(ids, durations))
+    assert len(group_by_name(names, durations)[0]) == len(group_by_id(ids, durations)[0])
+    print(f"group-by normalized str: {by_name * 1e3:7.1f} ms")
+    print(f"group-by symbol ID     : {by_id * 1e3:7.1f} ms  ({by_name / by_id:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: background job dispatch overhead and throughput
+
+Measures the submit call, the delay from submit until a worker starts the
+job, and no-op job throughput for each executor and worker count.
+
+Usage:
+    python -m benchmarks.bench_jobs [--jobs 20000] [--workers 1 2 4]
+"""
+
+import argparse
+import time
+
+from jobs import JobQueue
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return pick(0.50), pick(0.99)
+
+
+def noop(payload):
+    return payload
+
+
+def stamp(payload):
+    return time.perf_counter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=20_000)
+    parser.add_argument('--process-jobs', type=int, default=2_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    for executor, count in (('thread', args.jobs), ('process', args.process_jobs)):
+        for workers in args.workers:
+            queue = JobQueue(workers=workers, executor=executor, queue_limit=count + 1,
+                             history=count + 1)
+            queue.register('noop', noop)
+            queue.register('stamp', stamp)
+            queue.submit('noop')
+            queue.join()
+
+            # Dispatch delay, one job at a time so queueing does not dominate
+            submit_times, delays = [], []
+            for _ in range(min(count, 1000)):
+                start = time.perf_counter()
+                job = queue.submit('stamp')
+                submit_times.append(time.perf_counter() - start)
+                queue.join()
+                delays.append(queue.get(job.id)['result'] - start)
+
+            start = time.perf_counter()
+            for _ in range(count):
+                queue.submit('noop')
+            queue.join()
+            elapsed = time.perf_counter() - start
+            queue.shutdown()
+
+            submit_p50, submit_p99 = percentiles(submit_times)
+            delay_p50, delay_p99 = percentiles(delays)
+            print(f"{executor:>7} workers={workers}: submit p50 {submit_p50 * 1e6:6.1f}us "
+                  f"p99 {submit_p99 * 1e6:6.1f}us | start delay p50 {delay_p50 * 1e6:7.1f}us "
+                  f"p99 {delay_p99 * 1e6:7.1f}us | {count / elapsed:8.0f} jobs/s")
+
+
+if __name__ == '__main__':
+    main()
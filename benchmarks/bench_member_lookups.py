@@ -0,0 +1,106 @@
+"""
+Benchmark: member-store lookups per request, by route
+
+Wraps the app's stores in counters and replays one request per route for a
+logged-in member with some history. Each lookup would be a round trip once
+storage is external.
+
+Usage:
+    python -m benchmarks.bench_member_lookups
+"""
+
+import argparse
+import json
+
+import app as app_module
+
+STORES = ('users_data', 'workouts_data', 'weight_history', 'data_versions')
+LOOKUPS = ('get', '__getitem__', '__contains__', 'insert_if_absent', '__setitem__')
+
+ROUTES = [
+    ('GET', '/dashboard', None),
+    ('POST', '/api/workout/add', {'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+    ('GET', '/api/workout/summary', None),
+    ('GET', '/api/workout/progress', None),
+    ('GET', '/api/user/profile', None),
+    ('GET', '/api/user/weight', None),
+    ('POST', '/api/user/weight', {'weight': 71.5}),
+    ('GET', '/workout-plan', None),
+    ('GET', '/api/workout-plan', None),
+    ('GET', '/diet-guide', None),
+    ('GET', '/api/diet-plan', None),
+]
+
+
+class CountingStore:
+    """Proxy that counts single-key operations on a store"""
+
+    def __init__(self, store, counts):
+        self._store = store
+        self._counts = counts
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+    def _count(self, name, *args):
+        self._counts[0] += 1
+        return getattr(self._store, name)(*args)
+
+    def get(self, *args):
+        return self._count('get', *args)
+
+    def __getitem__(self, key):
+        return self._count('__getitem__', key)
+
+    def __setitem__(self, key, value):
+        return self._count('__setitem__', key, value)
+
+    def __contains__(self, key):
+        return self._count('__contains__', key)
+
+    def insert_if_absent(self, key, value):
+        return self._count('insert_if_absent', key, value)
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    app = app_module.app
+    app.config['TESTING'] = True
+    client = app.test_client()
+    client.post('/register', data=json.dumps({'name': 'Bench Member', 'regn_id': 'BENCH01',
+                                              'age': 30, 'gender': 'F', 'height': 168,
+                                              'weight': 64}),
+                content_type='application/json')
+    for exercise in ('Running', 'Squats', 'Stretching'):
+        client.post('/api/workout/add', data=json.dumps(
+            {'category': 'Workout', 'exercise': exercise, 'duration': 20}),
+            content_type='application/json')
+
+    counts = {name: [0] for name in STORES}
+    for name in STORES:
+        setattr(app_module, name, CountingStore(getattr(app_module, name), counts[name]))
+
+    print(f"{'route':<28}" + ''.join(f"{name:>16}" for name in STORES) + f"{'total':>8}")
+    for method, path, body in ROUTES:
+        for counter in counts.values():
+            counter[0] = 0
+        if body is None:
+            response = client.open(path, method=method)
+        else:
+            response = client.open(path, method=method, data=json.dumps(body),
+                                   content_type='application/json')
+        assert response.status_code == 200, (path, response.status_code)
+        print(f"{method + ' ' + path:<28}" + ''.join(f"{counts[name][0]:>16}" for name in STORES)
+              + f"{sum(counter[0] for counter in counts.values()):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: threaded register/add-workout stress on the member store
+
+Each operation registers a random member if absent, then appends a session
+and bumps the member's version under their lock, holding it for --hold-us
+to stand in for storage latency inside the critical section. One stripe is
+equivalent to a single global lock. Afterwards every member must have been
+registered exactly once and no session or version bump may be lost.
+
+Usage:
+    python -m benchmarks.bench_member_store [--ops 20000] [--threads 1 2 4 8 16]
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from member_store import SHARD_COUNT, LockStripes, ShardedStore
+
+
+def run(stripe_count, threads, ops, members, hold):
+    stripes = LockStripes(stripe_count)
+    users, workouts, versions = ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes)
+    registrations = [0] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        rng = random.Random(index)
+        per_thread = ops // threads
+        barrier.wait()
+        for n in range(per_thread):
+            regn_id = f'M{rng.randrange(members):05d}'
+            with stripes.lock_for(regn_id):
+                if users.insert_if_absent(regn_id, {'regn_id': regn_id}):
+                    workouts[regn_id] = []
+                    registrations[index] += 1
+                workouts[regn_id].append((index, n))
+                versions[regn_id] = versions.get(regn_id, 0) + 1
+                if hold:
+                    time.sleep(hold)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    done = ops // threads * threads
+    assert sum(registrations) == len(users), 'duplicate registration'
+    assert sum(len(sessions) for sessions in workouts.values()) == done, 'lost session'
+    assert sum(versions.values()) == done, 'lost version bump'
+    return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ops', type=int, default=20_000)
+    parser.add_argument('--members', type=int, default=5_000)
+    parser.add_argument('--hold-us', type=float, default=50.0)
+    parser.add_argument('--stripes', type=int, default=SHARD_COUNT)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    hold = args.hold_us / 1e6
+    print(f"{args.ops} ops over {args.members} members, {args.hold_us:.0f}us held per op")
+    print(f"{'threads':>7}  {'global lock':>12}  {f'{args.stripes} stripes':>12}")
+    for threads in args.threads:
+        single = run(1, threads, args.ops, args.members, hold)
+        striped = run(args.stripes, threads, args.ops, args.members, hold)
+        print(f"{threads:>7}  {single:>8.0f} op/s  {striped:>8.0f} op/s")
+    print("all runs consistent: no duplicate registrations, lost sessions or lost bumps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: sampled memory report vs walking every object
+
+Builds a gym of members with a skewed number of sessions each, then times
+the sampled member report against an exact deep walk of all three stores
+and compares their totals.
+
+Usage:
+    python -m benchmarks.bench_memory_report [--members 20000] [--sample 100]
+"""
+
+import argparse
+import random
+import time
+
+from member_store import LockStripes, ShardedStore
+from memory_report import deep_sizeof, member_report
+from weight_history import WeightHistory
+from workout_entry import WorkoutEntry
+
+EXERCISES = ['Squats', 'Running', 'Bench Press', 'Cycling', 'Yoga', 'Deadlift']
+
+
+def build(members, seed):
+    rng = random.Random(seed)
+    stripes = LockStripes()
+    users, workouts, histories = ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes)
+    for n in range(members):
+        member_id = f'M{n:06d}'
+        users[member_id] = {'name': f'Member {n}', 'regn_id': member_id, 'age': 30, 'gender': 'F',
+                            'height': 165.0, 'weight': 60.0 + n % 30, 'bmi': 22.0, 'bmr': 1400.0,
+                            'registered_date': f'2024-01-01T00:00:{n % 60:02d}'}
+        histories[member_id] = WeightHistory('2024-01-01', 60.0 + n % 30)
+        sessions = int(rng.paretovariate(1.2) * 20)
+        workouts[member_id] = {'Warm-up': [], 'Cool-down': [], 'Workout': [
+            WorkoutEntry(rng.choice(EXERCISES), 30, 1719298800 + k * 3600) for k in range(sessions)]}
+    return users, workouts, histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--members', type=int, default=20000)
+    parser.add_argument('--sample', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=45)
+    args = parser.parse_args()
+
+    users, workouts, histories = build(args.members, args.seed)
+
+    start = time.perf_counter()
+    report = member_report(users, workouts, histories, sample_size=args.sample,
+                           rng=random.Random(args.seed))
+    sampled = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exact = sum(deep_sizeof(store.get(member_id))
+                for store in (users, workouts, histories) for member_id in users.keys())
+    walked = time.perf_counter() - start
+
+    error = (report['estimated_bytes'] - exact) / exact
+    print(f"{args.members} members, {report['sessions']} sessions")
+    print(f"sampled report ({args.sample} members): {sampled * 1e3:8.1f} ms  "
+          f"estimate {report['estimated_bytes'] / 2 ** 20:7.1f} MiB")
+    print(f"full deep walk                : {walked * 1e3:8.1f} ms  "
+          f"exact    {exact / 2 ** 20:7.1f} MiB  (estimate off by {error:+.1%})")
+    print(f"heaviest member: {report['heaviest'][0]}")
+
+
+if __name__ == '__main__':
+    main()
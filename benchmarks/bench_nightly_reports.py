@@ -0,0 +1,68 @@
+"""
+Benchmark: nightly gym-wide weekly summaries by worker count
+
+Usage:
+    python -m benchmarks.bench_nightly_reports [--members 50000] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from calculations import MET_VALUES
+from nightly_reports import run_nightly_job
+from weight_history import WeightHistory
+from workout_entry import WorkoutEntry
+
+EXERCISES = ['Running', 'Squats', 'Push-ups', 'Cycling', 'Stretching', 'Jumping Jacks']
+
+
+def build_stores(members, sessions, seed=0):
+    """Synthetic member, workout and weight-history stores"""
+    rng = random.Random(seed)
+    start = date(2024, 6, 3)
+    users, workouts, histories = {}, {}, {}
+    for i in range(members):
+        regn_id = f'M{i:06d}'
+        users[regn_id] = {'regn_id': regn_id, 'name': f'Member {i}', 'weight': 70.0}
+        histories[regn_id] = WeightHistory(start.isoformat(), round(rng.uniform(50, 110), 1))
+        entries = {category: [] for category in MET_VALUES}
+        for day in sorted(rng.randint(0, 27) for _ in range(sessions)):
+            when = datetime(start.year, start.month, start.day, 7) + timedelta(days=day)
+            entries[rng.choice(list(MET_VALUES))].append(
+                WorkoutEntry.at(rng.choice(EXERCISES), rng.randint(5, 60), when))
+        workouts[regn_id] = entries
+    return users, workouts, histories
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--sessions', type=int, default=40, help='sessions per member over 4 weeks')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    stores = build_stores(args.members, args.sessions)
+    print(f"{args.members} members, {args.sessions} sessions each, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        output = tempfile.mkdtemp(prefix='nightly-')
+        try:
+            start = time.perf_counter()
+            run_nightly_job(*stores, output, date(2024, 6, 27), workers=workers,
+                            chunk_size=args.chunk_size)
+            elapsed = time.perf_counter() - start
+        finally:
+            shutil.rmtree(output)
+        baseline = baseline or elapsed
+        print(f"workers={workers}: {elapsed:6.2f}s  {args.members / elapsed:9.0f} members/s  "
+              f"speedup {baseline / elapsed:4.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: cost of request profiling on /api/workout/summary
+
+Compares the app without the middleware (profiling disabled), with it
+installed but not sampling, and with every request profiled by cProfile or
+the sampling profiler.
+
+Usage:
+    python -m benchmarks.bench_profiling [--requests 500] [--sessions 300]
+"""
+
+import argparse
+import time
+
+import app as app_module
+from profiling import ProfileBuffer, ProfilingMiddleware
+from workout_entry import WorkoutEntry
+
+
+def seed(sessions):
+    app_module.users_data['BENCH'] = {'name': 'Bench', 'age': 30, 'gender': 'F', 'height': 165,
+                                      'weight': 60, 'bmi': 22.0, 'bmr': 1400.0,
+                                      'registered_date': '2024-01-01T00:00:00'}
+    start = 1719298800
+    app_module.workouts_data['BENCH'] = {
+        category: [WorkoutEntry('Squats', 20, start + n * 3600) for n in range(sessions)]
+        for category in ('Warm-up', 'Workout', 'Cool-down')}
+
+
+def run(requests):
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 'BENCH'
+        client.get('/api/workout/summary')
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/api/workout/summary')
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--sessions', type=int, default=300, help='sessions per category')
+    args = parser.parse_args()
+
+    seed(args.sessions)
+    plain = app_module.app.wsgi_app
+    variants = [
+        ('disabled (no middleware)', plain),
+        ('installed, not sampling', ProfilingMiddleware(plain, ProfileBuffer(), sample_rate=0)),
+        ('every request, cprofile', ProfilingMiddleware(plain, ProfileBuffer(), sample_rate=1.0)),
+        ('every request, sample', ProfilingMiddleware(plain, ProfileBuffer(), sample_rate=1.0,
+                                                      mode='sample')),
+    ]
+    baseline = None
+    for label, wsgi_app in variants:
+        app_module.app.wsgi_app = wsgi_app
+        per_request = run(args.requests)
+        baseline = baseline or per_request
+        print(f"{label:<26}: {per_request * 1e3:7.3f} ms/request  ({per_request / baseline:.2f}x)")
+    app_module.app.wsgi_app = plain
+
+
+if __name__ == '__main__':
+    main()
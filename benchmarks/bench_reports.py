@@ -0,0 +1,72 @@
+"""
+Benchmark: weekly PDF reports generated per minute per core
+
+Usage:
+    python -m benchmarks.bench_reports [--reports 200] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from reports import ReportService
+
+
+def build_report_data(member, sessions_per_week, seed):
+    """Synthetic report payload for one member-week"""
+    rng = random.Random(seed)
+    monday = date(2024, 6, 24)
+    exercises = ['Running', 'Squats', 'Push-ups', 'Cycling', 'Yoga', 'Stretching']
+    return {
+        'user': {'name': f'Member {member}', 'regn_id': f'M{member:06d}', 'age': 30, 'gender': 'F',
+                 'height': 168.0, 'weight': 64.0, 'bmi': 22.68, 'bmr': 1368.0},
+        'week_start': monday.isoformat(),
+        'week_end': (monday + timedelta(days=6)).isoformat(),
+        'sessions': [{'category': rng.choice(['Warm-up', 'Workout', 'Cool-down']),
+                      'exercise': rng.choice(exercises),
+                      'duration': rng.randint(5, 60),
+                      'calories': round(rng.uniform(20, 500), 1),
+                      'date': (monday + timedelta(days=rng.randint(0, 6))).isoformat()}
+                     for _ in range(sessions_per_week)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reports', type=int, default=200)
+    parser.add_argument('--sessions', type=int, default=20, help='sessions per report')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    payloads = [build_report_data(i, args.sessions, i) for i in range(args.reports)]
+    print(f"{args.reports} reports, {args.sessions} sessions each, {os.cpu_count()} CPUs")
+    for workers in args.workers:
+        service = ReportService(max_workers=workers, queue_limit=args.reports,
+                                cache_size=args.reports)
+        # Warm the pool so process start-up is not counted
+        service.request('warmup', 'w', 0, lambda: payloads[0]).future.result()
+
+        start = time.perf_counter()
+        jobs = [service.request(i, 'w', 0, lambda p=payload: p)
+                for i, payload in enumerate(payloads)]
+        for job in jobs:
+            job.future.result()
+        elapsed = time.perf_counter() - start
+        service.shutdown()
+
+        per_minute = args.reports / elapsed * 60
+        cores = min(workers, os.cpu_count() or 1)
+        print(f"workers={workers}: {elapsed:6.2f}s  {per_minute:8.0f} reports/min  "
+              f"{per_minute / cores:8.0f} reports/min/core")
+
+        # Cached requests never reach the pool
+        start = time.perf_counter()
+        for i in range(args.reports):
+            service.request(i, 'w', 0, lambda: None)
+        print(f"           cache hit: {(time.perf_counter() - start) / args.reports * 1e6:.1f}us/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: per-request cost of recording route metrics
+
+Times RequestMetrics.begin() + finish() as the request hooks call them,
+across a spread of endpoints and statuses, single-threaded, from several
+threads at once, and with multiprocess snapshots being flushed. The target
+is under 5us per request.
+
+Usage:
+    python -m benchmarks.bench_request_metrics [--requests 200000] [--threads 1 8]
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+
+from request_metrics import RequestMetrics
+
+ENDPOINTS = ['index', 'dashboard', 'add_workout', 'workout_summary', 'workout_progress',
+             'workout_chart', 'metrics', 'health_check', 'unmatched']
+STATUSES = [200] * 18 + [302, 404]
+
+
+def run(metrics, threads, requests):
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        barrier.wait()
+        for n in range(requests // threads):
+            endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+            started = metrics.begin(endpoint)
+            metrics.finish(endpoint, 'GET', STATUSES[n % len(STATUSES)], started)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    return (time.perf_counter() - start) / requests
+
+
+def baseline(requests):
+    """The same loop without recording, to subtract"""
+    start = time.perf_counter()
+    for n in range(requests):
+        endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+        started = time.perf_counter()
+        STATUSES[n % len(STATUSES)], endpoint, started
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    loop = baseline(args.requests)
+    print(f"{args.requests} requests over {len(ENDPOINTS)} endpoints "
+          f"(loop overhead {loop * 1e6:.2f}us subtracted)")
+    with tempfile.TemporaryDirectory(prefix='metrics-') as directory:
+        for label, multiprocess_dir in (('per-process', None), ('multiprocess', directory)):
+            for threads in args.threads:
+                metrics = RequestMetrics(multiprocess_dir=multiprocess_dir)
+                per_request = run(metrics, threads, args.requests) - loop
+                verdict = 'ok' if per_request < 5e-6 else 'OVER 5us'
+                print(f"{label:<12} threads={threads:<3}: {per_request * 1e6:5.2f}us/request  {verdict}")
+            start = time.perf_counter()
+            text = metrics.render()
+            print(f"{label:<12} scrape: {(time.perf_counter() - start) * 1e3:.2f}ms, "
+                  f"{len(text.splitlines())} lines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: per-request session overhead, signed cookies vs server-side
+
+Times open_session plus save_session for a logged-in request that only
+reads the session (the common case: login_required and get_user_id), and a
+bare load() cache hit.
+
+Usage:
+    python -m benchmarks.bench_sessions [--requests 50000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from flask import Flask, session
+from flask.sessions import SecureCookieSessionInterface
+
+from session_store import MemorySessionBackend, SQLiteSessionBackend, ServerSideSessionInterface
+
+
+def session_cookie(app):
+    """Log in once through the interface and return the resulting cookie"""
+    with app.test_request_context('/'):
+        session['user_id'] = 'M000001'
+        session['user_name'] = 'Member One'
+        response = app.make_response('')
+        app.session_interface.save_session(app, session, response)
+    cookie = response.headers['Set-Cookie'].split(';', 1)[0]
+    return cookie.split('=', 1)[1]
+
+
+def time_requests(app, cookie, requests):
+    interface = app.session_interface
+    environ = {'HTTP_COOKIE': f'session={cookie}'}
+    with app.test_request_context('/', environ_base=environ) as ctx:
+        response = app.make_response('')
+        start = time.perf_counter()
+        for _ in range(requests):
+            opened = interface.open_session(app, ctx.request)
+            opened.get('user_id')
+            interface.save_session(app, opened, response)
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        interfaces = {
+            'signed cookie': SecureCookieSessionInterface(),
+            'server-side (memory)': ServerSideSessionInterface(MemorySessionBackend()),
+            'server-side (sqlite)': ServerSideSessionInterface(
+                SQLiteSessionBackend(os.path.join(directory, 'sessions.db'))),
+            'server-side (sqlite, no cache)': ServerSideSessionInterface(
+                SQLiteSessionBackend(os.path.join(directory, 'sessions.db')), cache_ttl=0),
+        }
+        for name, interface in interfaces.items():
+            app = Flask(__name__)
+            app.secret_key = 'bench'
+            app.session_interface = interface
+            cookie = session_cookie(app)
+            per_request = time_requests(app, cookie, args.requests)
+            print(f"{name:<32} {per_request * 1e6:7.2f}us/request")
+
+        interface = interfaces['server-side (memory)']
+        sid = next(iter(interface._cache))
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            interface.load(sid)
+        print(f"{'cache hit (load only)':<32} {(time.perf_counter() - start) / args.requests * 1e6:7.2f}us")
+
+
+if __name__ == '__main__':
+    main()
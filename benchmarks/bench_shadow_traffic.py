@@ -0,0 +1,110 @@
+"""
+Benchmark: what shadow mirroring adds to the primary request path
+
+Times /api/workout/summary without the middleware, mirrored to a local
+stand-in shadow that keeps up, and mirrored to one too slow to keep up
+(the queue stays full and copies are dropped). The stand-ins run in their
+own processes, as the shadow deployment would.
+
+Usage:
+    python -m benchmarks.bench_shadow_traffic [--requests 2000] [--sessions 100] [--rounds 3]
+
+The variants run interleaved for --rounds rounds and the best round of
+each is reported, so drift on a shared machine does not favour one.
+Request-thread CPU is the work mirroring adds to the request itself; wall
+time also includes competing with the mirror worker and the stand-in for
+the CPU, which on a machine with spare cores mostly goes away.
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+
+import app as app_module
+from benchmarks.bench_profiling import seed
+from shadow_traffic import ShadowMiddleware, ShadowTee
+
+
+STAND_IN = '''
+import logging, sys, time
+from werkzeug.serving import run_simple
+from werkzeug.wrappers import Response
+def shadow(environ, start_response):
+    time.sleep(float(sys.argv[2]))
+    return Response('{}', content_type='application/json')(environ, start_response)
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+run_simple('127.0.0.1', int(sys.argv[1]), shadow, threaded=True)
+'''
+
+
+def stand_in(delay):
+    """(process, port) of a shadow answering {} after delay seconds"""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen([sys.executable, '-c', STAND_IN, str(port), str(delay)])
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError('stand-in shadow did not start')
+
+
+def run(requests):
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 'BENCH'
+        client.get('/api/workout/summary').close()
+        start, cpu = time.perf_counter(), time.thread_time()
+        for _ in range(requests):
+            client.get('/api/workout/summary').close()
+        return (time.perf_counter() - start) / requests, (time.thread_time() - cpu) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=100, help='sessions per category')
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    seed(args.sessions)
+    app_module.tracer.sample_rate = 0
+    plain = app_module.app.wsgi_app
+    fast, slow = stand_in(0), stand_in(1.0)
+    try:
+        variants = [('no mirroring', plain, None, False)]
+        for label, (_, port), queue_size, drain in (('mirrored, shadow keeps up', fast, 100000, True),
+                                                 ('mirrored, queue full (dropping)', slow, 10, False)):
+            tee = ShadowTee(f'http://127.0.0.1:{port}', queue_size=queue_size)
+            variants.append((label, ShadowMiddleware(plain, tee), tee, drain))
+        best = {}
+        for _ in range(args.rounds):
+            for label, wsgi_app, tee, drain in variants:
+                app_module.app.wsgi_app = wsgi_app
+                wall, cpu = run(args.requests)
+                best[label] = min(best.get(label, (wall, cpu)), (wall, cpu))
+                if drain:
+                    # Let the backlog drain so it does not compete with the next variant
+                    tee.flush(timeout=120)
+        base_wall, base_cpu = best['no mirroring']
+        for label, _, tee, _ in variants:
+            wall, cpu = best[label]
+            extra = f'  mirrored {tee.mirrored} dropped {tee.dropped}' if tee else ''
+            print(f'{label:<34} {wall * 1e6:8.1f} us/request ({wall / base_wall - 1:+.1%})  '
+                  f'{cpu * 1e6:8.1f} us request-thread CPU ({cpu / base_cpu - 1:+.1%}){extra}')
+    finally:
+        app_module.app.wsgi_app = plain
+        for process, _ in (fast, slow):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
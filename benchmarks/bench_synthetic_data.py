@@ -0,0 +1,54 @@
+"""
+Benchmark: synthetic data generation throughput
+
+Generates members straight into sharded stores, writes the same members
+to NDJSON and loads the files back, reporting members and sessions per
+second for each.
+
+Usage:
+    python -m benchmarks.bench_synthetic_data [--members 20000] [--files 4] [--workers 1]
+"""
+
+import argparse
+import tempfile
+import time
+
+from member_store import LockStripes, ShardedStore
+from synthetic_data import SyntheticGym, load_ndjson, populate, write_ndjson
+
+
+def stores():
+    stripes = LockStripes()
+    return ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes)
+
+
+def report(label, totals, elapsed):
+    print(f"{label:<22} {elapsed:7.2f}s  {totals['members'] / elapsed:>9,.0f} members/s  "
+          f"{totals['sessions'] / elapsed:>11,.0f} sessions/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--members', type=int, default=20000)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=48)
+    args = parser.parse_args()
+
+    gym = SyntheticGym(seed=args.seed)
+    start = time.perf_counter()
+    totals = populate(gym, args.members, *stores())
+    report('generate into stores', totals, time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        totals = write_ndjson(gym, args.members, directory, files=args.files, workers=args.workers)
+        report(f'write NDJSON ({args.workers}w)', totals, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        totals = load_ndjson(directory, *stores())
+        report('load NDJSON', totals, time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmark: cost of tracing spans
+
+Times an empty span inside and outside a trace, then /api/workout/summary
+with tracing off and on.
+
+Usage:
+    python -m benchmarks.bench_tracing [--spans 100000] [--requests 500]
+"""
+
+import argparse
+import time
+
+import app as app_module
+from benchmarks.bench_profiling import seed
+from tracing import Tracer, span
+
+
+def span_cost(tracer, count):
+    trace = tracer.start_trace('bench')
+    start = time.perf_counter()
+    for _ in range(count):
+        with span('stage'):
+            pass
+    elapsed = time.perf_counter() - start
+    if trace is not None:
+        tracer.end_trace(trace)
+    return elapsed / count
+
+
+def request_cost(requests):
+    with app_module.app.test_client() as client:
+        with client.session_transaction() as sess:
+            sess['user_id'] = 'BENCH'
+        client.get('/api/workout/summary')
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get('/api/workout/summary')
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--spans', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--sessions', type=int, default=300, help='sessions per category')
+    args = parser.parse_args()
+
+    outside = span_cost(Tracer(sample_rate=0, export_path=None), args.spans)
+    inside = span_cost(Tracer(sample_rate=1.0, capacity=1, export_path=None), args.spans)
+    print(f"span outside a trace: {outside * 1e6:.2f}us")
+    print(f"span inside a trace : {inside * 1e6:.2f}us")
+
+    seed(args.sessions)
+    for rate in (0, 1.0):
+        app_module.tracer.sample_rate = rate
+        per_request = request_cost(args.requests)
+        print(f"summary, sample rate {rate:<3}: {per_request * 1e3:.3f} ms/request")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: durable workout inserts with and without group commit
+
+Concurrent threads stand in for gunicorn request threads, each appending
+sessions and waiting for them to be durable.
+
+Usage:
+    python -m benchmarks.bench_workout_log [--inserts 2000] [--threads 1 8 32]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from workout_entry import WorkoutEntry
+from workout_log import GROUP_COMMIT_DELAY_MS, GROUP_COMMIT_MAX_BATCH, WorkoutLog
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return pick(0.50), pick(0.99)
+
+
+def run(path, group_commit, threads, inserts, max_batch, max_delay):
+    log = WorkoutLog(path, group_commit=group_commit, max_batch=max_batch, max_delay=max_delay)
+    latencies = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        for n in range(inserts // threads):
+            entry = WorkoutEntry('Squats', 30, 1719298800 + n)
+            start = time.perf_counter()
+            log.append(f'M{index:05d}', 'Workout', entry)
+            latencies[index].append(time.perf_counter() - start)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    log.close()
+    samples = [latency for per_thread in latencies for latency in per_thread]
+    return len(samples) / elapsed, percentiles(samples), log.batches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--inserts', type=int, default=2000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--max-batch', type=int, default=GROUP_COMMIT_MAX_BATCH)
+    parser.add_argument('--delay-ms', type=float, default=GROUP_COMMIT_DELAY_MS)
+    parser.add_argument('--dir', default=None, help='directory for the database (default: temp)')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='workout-log-', dir=args.dir)
+    try:
+        print(f"{args.inserts} inserts, batch <= {args.max_batch}, window {args.delay_ms}ms, "
+              f"db in {directory}")
+        for threads in args.threads:
+            for group_commit in (False, True):
+                path = os.path.join(directory, f'{threads}-{int(group_commit)}.db')
+                rate, (p50, p99), batches = run(path, group_commit, threads, args.inserts,
+                                                args.max_batch, args.delay_ms / 1000)
+                mode = 'group commit' if group_commit else 'per insert'
+                print(f"threads={threads:<3} {mode:<12}: {rate:8.0f} inserts/s  "
+                      f"p50 {p50 * 1e3:6.2f}ms  p99 {p99 * 1e3:6.2f}ms  {batches} commits")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
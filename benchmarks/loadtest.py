@@ -0,0 +1,442 @@
+"""
+Load test: replay a compressed gym day against the app
+
+Members register, log in, add workouts in bursts around class times and
+poll their dashboards (the page, then its summary and progress requests).
+Arrivals are an open-loop Poisson process whose rate follows the arrival
+curve, so a slow server builds a queue instead of slowing the clients
+down, and latency is measured from when each request was due.
+
+With --curve classes, logins and workouts peak around --class-times while
+registrations and dashboard polls stay flat across opening hours; --mix
+sets each action's share of the arrivals.
+
+Worker models:
+    in-process (default)  the Flask test client served by one thread (sync)
+                          or --threads threads (gthread). Threads share the
+                          GIL, so this shows queueing, not CPU parallelism.
+    --url                 an already running server; the model is whatever
+                          it was started with.
+    --gunicorn            starts gunicorn on a free local port for each
+                          model (sync, gthread, and gevent when installed).
+                          Stores are per process, so keep --processes 1.
+
+Usage:
+    python -m benchmarks.loadtest [--duration 20] [--rate 100] [--members 200]
+        [--mix register=1,login=2,workout=5,dashboard=3] [--curve classes|flat]
+        [--class-times 7,12,18] [--models sync,gthread] [--threads 8]
+        [--url http://127.0.0.1:5000 | --gunicorn] [--output report.json]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from wsgi_proxy import KeepAliveClient
+
+DEFAULT_MIX = {'register': 1, 'login': 2, 'workout': 5, 'dashboard': 3}
+# Actions that follow the class-time curve; the rest arrive evenly
+CLASS_DRIVEN = {'login', 'workout'}
+EXERCISES = {
+    'Warm-up': ['Jumping Jacks', 'Treadmill', 'Arm Circles'],
+    'Workout': ['Squats', 'Bench Press', 'Deadlift', 'Running', 'Cycling', 'Rowing'],
+    'Cool-down': ['Stretching', 'Yoga', 'Walking'],
+}
+BURST_MAX = 4
+# Wall seconds between requests from one member in a burst or page load
+BURST_GAP = 0.2
+PAGE_GAP = 0.02
+
+
+class Call:
+    """One planned request; member is an index into the registered members"""
+
+    __slots__ = ('at', 'action', 'method', 'path', 'payload', 'member')
+
+    def __init__(self, at, action, method, path, payload=None, member=0):
+        self.at = at
+        self.action = action
+        self.method = method
+        self.path = path
+        self.payload = payload
+        self.member = member
+
+    @property
+    def label(self):
+        return f'{self.method} {self.path}'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        action, _, weight = part.partition('=')
+        if action not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f'unknown action {action!r}')
+        mix[action] = float(weight)
+    return mix
+
+
+def class_curve(class_hours, opens=6, closes=22, width=0.75, floor=0.2):
+    """Relative arrival rate over the day (0 to 1) peaking at class_hours"""
+    def shape(x):
+        hour = opens + x * (closes - opens)
+        return floor + sum(math.exp(-0.5 * ((hour - c) / width) ** 2) for c in class_hours)
+    return shape
+
+
+def flat_curve(x):
+    return 1.0
+
+
+def arrival_times(rate, duration, shape, rng, points=500):
+    """Poisson arrivals over [0, duration) averaging rate per second, with the
+    rate at time t proportional to shape(t / duration), by thinning"""
+    samples = [shape(i / points) for i in range(points + 1)]
+    mean, peak = sum(samples) / len(samples), max(samples)
+    t = 0.0
+    while True:
+        t += rng.expovariate(rate * peak / mean)
+        if t >= duration:
+            return
+        if rng.random() * peak < shape(t / duration):
+            yield t
+
+
+def plan(duration, rate, mix, curve, seed=0):
+    """The calls of a run, ordered by when they are due"""
+    rng = random.Random(seed)
+    total = sum(mix.values())
+    calls = []
+    for action, weight in sorted(mix.items()):
+        if weight <= 0:
+            continue
+        shape = curve if action in CLASS_DRIVEN else flat_curve
+        for at in arrival_times(rate * weight / total, duration, shape, rng):
+            member = rng.randrange(1 << 30)
+            if action == 'register':
+                calls.append(Call(at, action, 'POST', '/register'))
+            elif action == 'login':
+                calls.append(Call(at, action, 'POST', '/login', member=member))
+            elif action == 'workout':
+                for n in range(rng.randint(1, BURST_MAX)):
+                    category = rng.choice(list(EXERCISES))
+                    payload = {'category': category, 'exercise': rng.choice(EXERCISES[category]),
+                               'duration': rng.randint(5, 60)}
+                    calls.append(Call(at + n * BURST_GAP, action, 'POST', '/api/workout/add',
+                                      payload, member))
+            else:
+                calls.append(Call(at, action, 'GET', '/dashboard', member=member))
+                for path in ('/api/workout/summary', '/api/workout/progress'):
+                    calls.append(Call(at + PAGE_GAP, action, 'GET', path, member=member))
+    calls.sort(key=lambda call: call.at)
+    return calls
+
+
+def cookie_header(set_cookies, previous=None):
+    """A Cookie header from Set-Cookie values, keeping cookies not replaced"""
+    cookies = dict(part.split('=', 1) for part in previous.split('; ')) if previous else {}
+    for value in set_cookies:
+        name, _, rest = value.partition('=')
+        cookies[name.strip()] = rest.split(';', 1)[0]
+    return '; '.join(f'{name}={value}' for name, value in cookies.items())
+
+
+class AppTarget:
+    """The app in this process, through one Flask test client per thread"""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._local = threading.local()
+
+    def request(self, method, path, payload, cookie):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client(use_cookies=False)
+        headers = {'Cookie': cookie} if cookie else {}
+        response = client.open(path, method=method, json=payload, headers=headers)
+        response.close()
+        return response.status_code, response.headers.getlist('Set-Cookie')
+
+
+class HTTPTarget:
+    """A server over HTTP, with one keep-alive connection per thread"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self._client = KeepAliveClient(parts.hostname, parts.port or 80, timeout)
+
+    def request(self, method, path, payload, cookie):
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        if cookie:
+            headers['Cookie'] = cookie
+        status, response_headers, _ = self._client.request(method, path, body, headers)
+        return status, [value for key, value in response_headers if key.lower() == 'set-cookie']
+
+
+class Members:
+    """Registered members and their session cookies"""
+
+    def __init__(self, prefix='LT'):
+        self._ids = (f'{prefix}{n:07d}' for n in itertools.count())
+        self._lock = threading.Lock()
+        self.registered = []
+        self.cookies = {}
+
+    def new_id(self):
+        with self._lock:
+            return next(self._ids)
+
+    def add(self, member_id, cookie):
+        with self._lock:
+            self.cookies[member_id] = cookie
+            self.registered.append(member_id)
+
+    def pick(self, index):
+        registered = self.registered
+        return registered[index % len(registered)] if registered else None
+
+
+def execute(target, members, call):
+    """Send a call as a member; returns the status, or None if no member exists yet"""
+    if call.action == 'register':
+        member_id = members.new_id()
+        n = int(member_id[-7:])
+        payload = {'name': f'Member {member_id}', 'regn_id': member_id, 'age': 20 + n % 45,
+                   'gender': 'MF'[n % 2], 'height': 150 + n % 45, 'weight': 50 + n % 50}
+        status, set_cookies = target.request('POST', '/register', payload, None)
+        if status == 200:
+            members.add(member_id, cookie_header(set_cookies))
+        return status
+    member_id = members.pick(call.member)
+    if member_id is None:
+        return None
+    cookie = members.cookies[member_id]
+    payload = {'regn_id': member_id} if call.action == 'login' else call.payload
+    status, set_cookies = target.request(call.method, call.path, payload, cookie)
+    if set_cookies:
+        members.cookies[member_id] = cookie_header(set_cookies, cookie)
+    return status
+
+
+def register_members(target, members, count):
+    """Register members before the run, untimed"""
+    for _ in range(count):
+        execute(target, members, Call(0, 'register', 'POST', '/register'))
+
+
+def replay(target, members, calls, workers):
+    """Send calls when due from a pool of workers; returns per-call records
+
+    A record is (label, due, started, finished, status, error), times in
+    seconds from the start. Requests that had to wait for a free worker
+    count their wait as latency.
+    """
+    pending = queue.Queue()
+    records = []
+
+    def work():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            call, due = item
+            started = time.perf_counter()
+            status, error = None, None
+            try:
+                status = execute(target, members, call)
+            except Exception as e:  # counted as an error, not a crashed run
+                error = f'{type(e).__name__}: {e}'
+            if status is not None or error is not None:
+                records.append((call.label, due - origin, started - origin,
+                                time.perf_counter() - origin, status, error))
+
+    threads = [threading.Thread(target=work, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    origin = time.perf_counter()
+    for call in calls:
+        due = origin + call.at
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((call, due))
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+def is_error(status, error):
+    # No action in the plan expects a redirect; one means the session was lost
+    return error is not None or status >= 300
+
+
+def summarize(records, duration):
+    """Throughput, error rate and latency percentiles overall and per route"""
+    def stats(rows):
+        latencies = sorted((finished - due) * 1000 for _, due, _, finished, _, _ in rows)
+        service = [(finished - started) * 1000 for _, _, started, finished, _, _ in rows]
+        errors = sum(is_error(status, error) for *_, status, error in rows)
+        return {'requests': len(rows), 'errors': errors,
+                'error_rate': errors / len(rows) if rows else 0.0,
+                'p50_ms': percentile(latencies, 0.50), 'p90_ms': percentile(latencies, 0.90),
+                'p99_ms': percentile(latencies, 0.99), 'max_ms': latencies[-1] if latencies else None,
+                'mean_service_ms': sum(service) / len(service) if service else None}
+
+    elapsed = max((record[3] for record in records), default=duration)
+    routes = {}
+    for record in records:
+        routes.setdefault(record[0], []).append(record)
+    samples = {}
+    for label, _, _, _, status, error in records:
+        if error is not None:
+            samples.setdefault(label, error)
+    report = stats(records)
+    report.update({'elapsed_s': elapsed, 'offered_rps': len(records) / duration,
+                   'throughput_rps': len(records) / elapsed if elapsed else 0.0,
+                   'routes': {label: stats(rows) for label, rows in sorted(routes.items())},
+                   'error_samples': samples})
+    return report
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(model, processes, threads):
+    """A local gunicorn serving app:app with the given worker class"""
+    gunicorn = shutil.which('gunicorn')
+    if gunicorn is None:
+        sys.exit('gunicorn is not installed; run without --gunicorn to use in-process workers')
+    port = free_port()
+    command = [gunicorn, '--bind', f'127.0.0.1:{port}', '--workers', str(processes),
+               '--worker-class', model, '--log-level', 'warning', 'app:app']
+    if model == 'gthread':
+        command[-1:-1] = ['--threads', str(threads)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(command, cwd=root)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if HTTPTarget(url, timeout=1).request('GET', '/health', None, None)[0] == 200:
+                return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    sys.exit(f'gunicorn ({model}) did not become healthy on port {port}')
+
+
+def available_models(use_gunicorn):
+    models = ['sync', 'gthread']
+    if use_gunicorn:
+        try:
+            import gevent  # noqa: F401
+            models.append('gevent')
+        except ImportError:
+            pass
+    return models
+
+
+def print_report(model, report):
+    print(f"\n== {model}: {report['requests']} requests in {report['elapsed_s']:.1f}s, "
+          f"{report['throughput_rps']:.1f} req/s (offered {report['offered_rps']:.1f}), "
+          f"errors {report['error_rate']:.2%}")
+    print(f"{'route':<30} {'count':>7} {'err%':>6} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'svc ms':>7}")
+    for label, row in report['routes'].items():
+        print(f"{label:<30} {row['requests']:>7} {row['error_rate']:>6.1%} {row['p50_ms']:>8.1f} "
+              f"{row['p90_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} "
+              f"{row['mean_service_ms']:>7.2f}")
+    for label, error in report['error_samples'].items():
+        print(f'  {label}: {error}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20, help='wall seconds for the day')
+    parser.add_argument('--rate', type=float, default=100, help='mean arrivals per second')
+    parser.add_argument('--members', type=int, default=200, help='registered before the run')
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument('--curve', choices=('classes', 'flat'), default='classes')
+    parser.add_argument('--class-times', default='7,12,18', help='hours of the day')
+    parser.add_argument('--models', default=None, help='comma-separated; default all available')
+    parser.add_argument('--threads', type=int, default=8, help='gthread worker threads')
+    parser.add_argument('--processes', type=int, default=1, help='gunicorn worker processes')
+    parser.add_argument('--clients', type=int, default=64, help='client threads against a server')
+    parser.add_argument('--seed', type=int, default=47)
+    target_group = parser.add_mutually_exclusive_group()
+    target_group.add_argument('--url', default=None, help='an already running server')
+    target_group.add_argument('--gunicorn', action='store_true')
+    parser.add_argument('--output', default=None, help='write the reports as JSON')
+    args = parser.parse_args(argv)
+    if args.models and not (args.url or args.gunicorn):
+        unsupported = sorted(set(args.models.split(',')) - {'sync', 'gthread'})
+        if unsupported:
+            parser.error(f"in-process workers are sync or gthread; {', '.join(unsupported)} "
+                         'needs --gunicorn')
+
+    curve = (class_curve([float(h) for h in args.class_times.split(',')])
+             if args.curve == 'classes' else flat_curve)
+    calls = plan(args.duration, args.rate, args.mix, curve, args.seed)
+    models = ['server'] if args.url else (args.models.split(',') if args.models
+                                          else available_models(args.gunicorn))
+    print(f'{len(calls)} requests planned over {args.duration:g}s ({args.curve} curve)')
+
+    reports = {}
+    for n, model in enumerate(models):
+        server = None
+        # Each model gets its own members so runs do not see each other's data
+        members = Members(prefix=f'LT{n}')
+        if args.url or args.gunicorn:
+            if args.gunicorn:
+                server, url = start_gunicorn(model, args.processes, args.threads)
+            target, workers = HTTPTarget(url if args.gunicorn else args.url), args.clients
+        else:
+            import app as app_module
+            target = AppTarget(app_module.app)
+            workers = {'sync': 1, 'gthread': args.threads}[model]
+        try:
+            register_members(target, members, args.members)
+            records = replay(target, members, calls, workers)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        reports[model] = summarize(records, args.duration)
+        print_report(model, reports[model])
+
+    if len(reports) > 1:
+        print(f"\n{'model':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'err%':>6}")
+        for model, report in reports.items():
+            print(f"{model:<10} {report['throughput_rps']:>8.1f} {report['p50_ms']:>8.1f} "
+                  f"{report['p99_ms']:>8.1f} {report['error_rate']:>6.1%}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': {k: v for k, v in vars(args).items()}, 'reports': reports}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
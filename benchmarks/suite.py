@@ -0,0 +1,277 @@
+"""
+Micro-benchmark suite with stored baselines
+
+Times the calculation helpers, the summary/progress/exercise aggregations
+and the summary and progress routes, across member history sizes (10 to 1M
+sessions) and category mixes. Results are JSON; a baseline is kept in
+benchmarks/baselines/ and `compare` flags cases that got slower than the
+tolerance allows, exiting with status 1.
+
+Baselines are only comparable on the machine that recorded them; compare
+warns when the machine differs. Record a new one after intentional
+performance changes.
+
+Usage:
+    python -m benchmarks.suite run [--filter summary] [--max-sessions 100000] [--output out.json]
+    python -m benchmarks.suite save [--max-sessions ...]          # run and store as the baseline
+    python -m benchmarks.suite compare [--results out.json] [--tolerance 0.2] [--stat median_s]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import closing, contextmanager
+from datetime import datetime
+
+from calculations import (calculate_bmi, calculate_bmr, calculate_calories, exercise_totals,
+                          progress_totals, summarize_workouts)
+from weight_history import WeightHistory, entry_calories
+from workout_entry import WorkoutEntry
+
+SIZES = (10, 1000, 100000, 1000000)
+# Warm-up : Workout : Cool-down sessions
+MIXES = {'balanced': (1, 3, 1), 'workout-only': (0, 1, 0)}
+EXERCISES = {
+    'Warm-up': ['Jumping Jacks', 'Treadmill', 'Arm Circles'],
+    'Workout': ['Squats', 'Bench Press', 'Deadlift', 'Running', 'Cycling', 'Rowing'],
+    'Cool-down': ['Stretching', 'Yoga', 'Walking'],
+}
+# Route cases serialize every session to JSON; beyond this they measure json
+ROUTE_MAX_SESSIONS = 100000
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baselines', 'baseline.json')
+DEFAULT_TOLERANCE = 0.2
+
+
+def build_history(sessions, mix):
+    """A member's workouts by category and a weight history with monthly segments"""
+    weights = MIXES[mix]
+    start = 1577872800  # 2020-01-01 10:00
+    workouts = {category: [] for category in EXERCISES}
+    categories = [c for c, w in zip(EXERCISES, weights) for _ in range(w)]
+    for n in range(sessions):
+        category = categories[n % len(categories)]
+        names = EXERCISES[category]
+        workouts[category].append(WorkoutEntry(names[n % len(names)], 10 + n % 50, start + n * 3600))
+    history = WeightHistory('2020-01-01', 80.0)
+    for month in range(1, 48):
+        history.record(f'{2020 + month // 12}-{month % 12 + 1:02d}-01', 80.0 - month * 0.2)
+    return workouts, history
+
+
+def cases(max_sessions, sizes=SIZES, name_filter=None):
+    """Yield (case id, params, callable) in a stable order
+
+    Only cases whose id contains name_filter are yielded. Histories are
+    built lazily, one size at a time, and only for sizes with a matching
+    case; the app is only touched when a route case matches.
+    """
+    selected = lambda case_id: not name_filter or name_filter in case_id
+    calculations = [
+        ('calculate_bmi', lambda: calculate_bmi(70, 175)),
+        ('calculate_bmr', lambda: calculate_bmr(60, 165, 30, 'F')),
+        ('calculate_calories[catalog]', lambda: calculate_calories('Workout', 30, 70, 'Squats')),
+        ('calculate_calories[category]', lambda: calculate_calories('Workout', 30, 70)),
+    ]
+    for case_id, fn in calculations:
+        if selected(case_id):
+            yield case_id, {}, fn
+
+    for sessions in sizes:
+        if sessions > max_sessions:
+            continue
+        for mix in MIXES:
+            tag = f'{sessions}-{mix}'
+            aggregations = [name for name in ('summarize_workouts', 'progress_totals', 'exercise_totals')
+                            if selected(f'{name}[{tag}]')]
+            routes = [route for route in ('/api/workout/summary', '/api/workout/progress')
+                      if sessions <= ROUTE_MAX_SESSIONS and selected(f'GET {route}[{tag}]')]
+            if not aggregations and not routes:
+                continue
+            workouts, history = build_history(sessions, mix)
+            calories = lambda category, entry: entry_calories(history, category, entry, 80.0)
+            params = {'sessions': sessions, 'mix': mix}
+            fns = {
+                'summarize_workouts': lambda: summarize_workouts(workouts, calories, include_sessions=True),
+                'progress_totals': lambda: progress_totals(workouts, calories),
+                'exercise_totals': lambda: exercise_totals(workouts),
+            }
+            for name in aggregations:
+                yield f'{name}[{tag}]', params, fns[name]
+            if routes:
+                with route_client(workouts, history) as client:
+                    for route in routes:
+                        yield f'GET {route}[{tag}]', params, lambda route=route: client.get(route)
+            del workouts, history, fns
+
+
+@contextmanager
+def route_client(workouts, history):
+    """Test client logged in as a member holding the given history
+
+    The member and the instrumentation settings changed for timing are
+    put back on exit, so the suite can share a process with the app tests.
+    """
+    import app as app_module
+    member_id = 'BENCH'
+    stores = (app_module.users_data, app_module.workouts_data, app_module.weight_history)
+    saved_members = [store.get(member_id) for store in stores]
+    saved_settings = (app_module.tracer.sample_rate, app_module.slow_request_log.threshold_ms)
+    app_module.users_data[member_id] = {'name': 'Bench', 'regn_id': member_id, 'age': 30,
+                                        'gender': 'F', 'height': 165.0, 'weight': 80.0,
+                                        'bmi': 29.4, 'bmr': 1600.0,
+                                        'registered_date': '2020-01-01T00:00:00'}
+    app_module.workouts_data[member_id] = workouts
+    app_module.weight_history[member_id] = history
+    # Time the handlers, not the instrumentation around them
+    app_module.tracer.sample_rate = 0
+    app_module.slow_request_log.threshold_ms = 0
+    try:
+        client = app_module.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = member_id
+        yield client
+    finally:
+        app_module.tracer.sample_rate, app_module.slow_request_log.threshold_ms = saved_settings
+        for store, saved in zip(stores, saved_members):
+            if saved is None:
+                store.pop(member_id, None)
+            else:
+                store[member_id] = saved
+
+
+def measure(fn, min_time=0.2, min_rounds=3, max_rounds=1000, round_time=0.001):
+    """Per-call seconds over rounds of enough calls to last round_time each"""
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= round_time:
+            break
+        loops *= 10
+    samples = [elapsed / loops]
+    spent = elapsed
+    while len(samples) < max_rounds and (len(samples) < min_rounds or spent < min_time):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / loops)
+        spent += elapsed
+    return {'min_s': min(samples), 'median_s': statistics.median(samples),
+            'mean_s': statistics.fmean(samples), 'rounds': len(samples), 'loops': loops}
+
+
+def machine():
+    return {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+            'platform': platform.platform(), 'processor': platform.machine(),
+            'cpus': os.cpu_count()}
+
+
+def run(max_sessions=max(SIZES), name_filter=None, min_time=0.2, progress=print):
+    results = {}
+    # closing() so a failed measurement still restores what route_client changed
+    with closing(cases(max_sessions, name_filter=name_filter)) as selected:
+        for case_id, params, fn in selected:
+            stats = measure(fn, min_time=min_time)
+            results[case_id] = dict(stats, params=params)
+            if progress:
+                progress(f"{case_id:<52} {_human(stats['median_s']):>10}  ({stats['rounds']} rounds)")
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'machine': machine(),
+            'benchmarks': results}
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE, stat='median_s'):
+    """Rows of (case id, baseline, current, ratio, verdict) per current case
+
+    Cases missing from the baseline are reported as 'new'.
+    """
+    rows = []
+    for case_id, result in current['benchmarks'].items():
+        before = baseline['benchmarks'].get(case_id)
+        if before is None:
+            rows.append((case_id, None, result[stat], None, 'new'))
+            continue
+        ratio = result[stat] / before[stat]
+        if ratio > 1 + tolerance:
+            verdict = 'REGRESSION'
+        elif ratio < 1 / (1 + tolerance):
+            verdict = 'faster'
+        else:
+            verdict = 'ok'
+        rows.append((case_id, before[stat], result[stat], ratio, verdict))
+    return rows
+
+
+def _human(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f'{seconds / scale:.2f}{unit}'
+    return f'{seconds / 1e-9:.0f}ns'
+
+
+def _load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _write(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name in ('run', 'save', 'compare'):
+        command = commands.add_parser(name)
+        command.add_argument('--filter', default=None, help='only cases whose id contains this')
+        command.add_argument('--max-sessions', type=int, default=max(SIZES))
+        command.add_argument('--min-time', type=float, default=0.2, help='seconds per case')
+        command.add_argument('--baseline', default=DEFAULT_BASELINE)
+    commands.choices['run'].add_argument('--output', default=None)
+    commands.choices['compare'].add_argument('--results', default=None,
+                                             help='compare this results file instead of running')
+    commands.choices['compare'].add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    commands.choices['compare'].add_argument('--stat', choices=('median_s', 'min_s', 'mean_s'),
+                                             default='median_s')
+    args = parser.parse_args(argv)
+
+    if args.command == 'compare' and args.results:
+        results = _load(args.results)
+    else:
+        results = run(args.max_sessions, args.filter, args.min_time)
+
+    if args.command == 'run':
+        if args.output:
+            _write(args.output, results)
+        return 0
+    if args.command == 'save':
+        _write(args.baseline, results)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    baseline = _load(args.baseline)
+    if baseline['machine'] != results['machine']:
+        print(f"warning: baseline was recorded on {baseline['machine']}, not this machine")
+    rows = compare(baseline, results, args.tolerance, args.stat)
+    print(f"{'case':<52} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for case_id, before, after, ratio, verdict in rows:
+        print(f"{case_id:<52} {_human(before) if before else '-':>10} {_human(after):>10} "
+              f"{f'{ratio:.2f}x' if ratio else '-':>7}  {verdict}")
+    regressions = [row for row in rows if row[4] == 'REGRESSION']
+    print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%} ({args.stat})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+ACEest Fitness - Health and exercise calculations
+
+Pure helpers shared by the Flask app and the batch/derived-metric modules.
+"""
+
+from exercise_catalog import catalog
+from exercise_symbols import symbols
+from workout_entry import day_number
+
+# MET Values for calorie calculation
+MET_VALUES = {
+    "Warm-up": 3,
+    "Workout": 6,
+    "Cool-down": 2.5
+}
+
+def calculate_bmi(weight_kg, height_cm):
+    """Calculate Body Mass Index"""
+    height_m = height_cm / 100
+    # Multiply rather than ** 2: libm pow() is not always correctly rounded,
+    # and this keeps the result identical to batch_metrics.calculate_bmi_batch.
+    return weight_kg / (height_m * height_m)
+
+def calculate_bmr(weight_kg, height_cm, age, gender):
+    """Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation"""
+    if gender.upper() == 'M':
+        return 10 * weight_kg + 6.25 * height_cm - 5 * age + 5
+    else:
+        return 10 * weight_kg + 6.25 * height_cm - 5 * age - 161
+
+def get_met(category, exercise=None):
+    """MET value for an exercise, falling back to its category"""
+    met = catalog.met_for(exercise)
+    if met is None:
+        met = MET_VALUES.get(category, 5)
+    return met
+
+def calculate_calories(category, duration_min, weight_kg, exercise=None):
+    """Calculate calories burned during exercise
+
+    Uses the exercise's own MET value when it is in the catalog.
+    """
+    met = get_met(category, exercise)
+    return (met * 3.5 * weight_kg / 200) * duration_min
+
+def summarize_workouts(workouts, calories_for, first=None, last=None, include_sessions=False):
+    """Per-category and overall time, calories and session counts
+
+    workouts maps categories to WorkoutEntry lists, and calories_for(category,
+    entry) gives a session's calories. If first or last (ISO dates,
+    inclusive) are given, only sessions in that range are counted. With
+    include_sessions, each category also lists its sessions serialized with
+    their calories, as /api/workout/summary returns them.
+    """
+    summary = {
+        'categories': {},
+        'total_time': 0,
+        'total_calories': 0,
+        'session_count': 0
+    }
+    
+    low = day_number(first) if first is not None else None
+    high = day_number(last) if last is not None else None
+    for category, sessions in workouts.items():
+        if low is not None or high is not None:
+            sessions = [s for s in sessions
+                        if (low is None or s.day >= low) and (high is None or s.day <= high)]
+        calories = [calories_for(category, s) for s in sessions]
+        category_time = sum(s.duration for s in sessions)
+        category_calories = sum(calories)
+        
+        summary['categories'][category] = {
+            'count': len(sessions),
+            'total_time': category_time,
+            'total_calories': round(category_calories, 1)
+        }
+        if include_sessions:
+            summary['categories'][category]['sessions'] = [
+                dict(s.to_dict(), calories=c) for s, c in zip(sessions, calories)]
+        
+        summary['total_time'] += category_time
+        summary['total_calories'] += category_calories
+        summary['session_count'] += len(sessions)
+    
+    summary['total_calories'] = round(summary['total_calories'], 1)
+    return summary
+
+
+
+def progress_totals(workouts, calories_for):
+    """Minutes and calories per category for the progress charts
+
+    Categories without any time are left out.
+    """
+    progress = {
+        'categories': [],
+        'durations': [],
+        'calories': []
+    }
+    for category, sessions in workouts.items():
+        total_duration = sum(s.duration for s in sessions)
+        total_calories = sum(calories_for(category, s) for s in sessions)
+        
+        if total_duration > 0:
+            progress['categories'].append(category)
+            progress['durations'].append(total_duration)
+            progress['calories'].append(round(total_calories, 1))
+    return progress
+
+def exercise_totals(workouts):
+    """Session count and minutes per exercise across all categories, most
+    minutes first
+
+    Sessions are grouped by exercise ID, so spelling variants of the same
+    exercise share a row.
+    """
+    counts = {}
+    minutes = {}
+    for sessions in workouts.values():
+        for s in sessions:
+            symbol = s.exercise_id
+            counts[symbol] = counts.get(symbol, 0) + 1
+            minutes[symbol] = minutes.get(symbol, 0) + s.duration
+    order = sorted(counts, key=lambda symbol: (-minutes[symbol], symbol))
+    return [{'exercise': symbols.names[symbol], 'count': counts[symbol],
+             'total_time': minutes[symbol]} for symbol in order]
@@ -0,0 +1,148 @@
+"""
+ACEest Fitness - Server-side progress charts
+
+Renders the desktop app's progress charts (minutes per category as a bar
+chart and the category distribution as a pie) with matplotlib's Agg
+backend, for clients too slow to draw them. One figure template is built
+once and redrawn for every chart, and the encoded bytes are cached by
+(member, data version, format, size) so an unchanged chart is never
+rendered twice.
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+except ImportError:  # pragma: no cover - depends on the environment
+    Figure = None
+
+COLOR_PRIMARY = "#4CAF50"
+COLOR_SECONDARY = "#2196F3"
+COLOR_CARD_BG = "#FFFFFF"
+COLOR_TEXT = "#343A40"
+CHART_COLORS = [COLOR_SECONDARY, COLOR_PRIMARY, "#FFC107"]
+
+FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+DPI = 100
+DEFAULT_SIZE = (800, 500)
+MIN_SIZE = (400, 250)
+MAX_SIZE = (1600, 1200)
+CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 256))
+
+
+class ChartsUnavailable(RuntimeError):
+    """matplotlib is not installed"""
+
+
+def clamp_size(width, height):
+    """Clamp a requested size in pixels to the supported range"""
+    return (min(max(width, MIN_SIZE[0]), MAX_SIZE[0]),
+            min(max(height, MIN_SIZE[1]), MAX_SIZE[1]))
+
+
+class ChartRenderer:
+    """Draws progress charts onto a single reusable figure
+
+    matplotlib figures are not thread-safe, so renders are serialized; with
+    the cache in front of it, only changed charts ever wait for the lock.
+    """
+
+    def __init__(self):
+        if Figure is None:
+            raise ChartsUnavailable('matplotlib is not installed')
+        self._lock = threading.Lock()
+        self.figure = Figure(dpi=DPI, facecolor=COLOR_CARD_BG)
+        FigureCanvasAgg(self.figure)
+        self.bar_ax = self.figure.add_subplot(121)
+        self.pie_ax = self.figure.add_subplot(122)
+
+    def _style(self):
+        ax1, ax2 = self.bar_ax, self.pie_ax
+        ax1.set_title("Total Minutes per Category", fontsize=10, color=COLOR_TEXT)
+        ax1.set_ylabel("Total Minutes", fontsize=8, color=COLOR_TEXT)
+        ax1.tick_params(axis='x', labelsize=8, colors=COLOR_TEXT)
+        ax1.tick_params(axis='y', labelsize=8, colors=COLOR_TEXT)
+        ax1.spines['right'].set_visible(False)
+        ax1.spines['top'].set_visible(False)
+        ax1.grid(axis='y', linestyle='-', alpha=0.3)
+        ax1.set_facecolor(COLOR_CARD_BG)
+        ax2.set_title("Workout Distribution (%)", fontsize=10, color=COLOR_TEXT)
+        ax2.set_facecolor(COLOR_CARD_BG)
+
+    def render(self, totals, fmt='png', size=DEFAULT_SIZE):
+        """Render {category: minutes} as PNG or SVG bytes"""
+        categories, values = list(totals), list(totals.values())
+        with self._lock:
+            self.bar_ax.clear()
+            self.pie_ax.clear()
+            self._style()
+            self.figure.set_size_inches(size[0] / DPI, size[1] / DPI)
+            if sum(values) == 0:
+                self.bar_ax.text(0.5, 0.5, "No workout data logged yet.", ha='center',
+                                 va='center', fontsize=10, style='italic', color="#888",
+                                 transform=self.bar_ax.transAxes)
+            else:
+                self.bar_ax.bar(categories, values,
+                                color=[CHART_COLORS[i % len(CHART_COLORS)] for i in range(len(values))])
+                shown = [i for i, v in enumerate(values) if v > 0]
+                self.pie_ax.pie([values[i] for i in shown],
+                                labels=[categories[i] for i in shown],
+                                autopct="%1.1f%%", startangle=90,
+                                colors=[CHART_COLORS[i % len(CHART_COLORS)] for i in shown],
+                                wedgeprops={"edgecolor": "white", 'linewidth': 1},
+                                textprops={'fontsize': 8, 'color': COLOR_TEXT})
+                self.pie_ax.axis('equal')
+            self.figure.tight_layout(pad=2.0)
+            buffer = io.BytesIO()
+            self.figure.savefig(buffer, format=fmt, facecolor=COLOR_CARD_BG)
+        return buffer.getvalue()
+
+
+class ChartCache:
+    """LRU of rendered charts keyed by (member, data version, format, size)
+
+    Bumping a member's data version makes their old entries unreachable;
+    they age out of the LRU instead of being invalidated explicitly.
+    """
+
+    def __init__(self, size=CHART_CACHE_SIZE, renderer_factory=ChartRenderer):
+        self.size = size
+        self.renderer_factory = renderer_factory
+        self._renderer = None
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, member_id, data_version, fmt, size, load_totals):
+        """Chart bytes, rendering them with load_totals() on a miss"""
+        key = (member_id, data_version, fmt, size)
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return chart
+            self.misses += 1
+            if self._renderer is None:
+                self._renderer = self.renderer_factory()
+        chart = self._renderer.render(load_totals(), fmt, size)
+        with self._lock:
+            self._entries[key] = chart
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return chart
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'bytes': sum(len(chart) for chart in self._entries.values()),
+                    'hits': self.hits, 'misses': self.misses}
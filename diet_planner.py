@@ -0,0 +1,149 @@
+"""
+ACEest Fitness - BMR-driven diet-guide engine
+
+Daily calorie and macro targets are derived from the member's stored BMR
+plus their recent workout calories. Meal plans are solved from a small food
+table per rounded calorie target and goal, and memoized in a size-bounded
+LRU, so almost every member's guide is a cache hit.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from itertools import product
+
+Food = namedtuple('Food', 'name kcal protein carbs fat')
+
+# Per serving; protein/carbs/fat in grams
+FOODS = {
+    'Breakfast': (
+        Food('Oatmeal with fruits & nuts', 350, 12, 55, 10),
+        Food('Scrambled eggs with whole wheat toast', 380, 24, 28, 18),
+        Food('Greek yogurt with berries', 220, 20, 25, 4),
+        Food('Protein smoothie', 300, 30, 32, 6),
+        Food('Whole grain cereal with milk', 280, 12, 48, 5),
+    ),
+    'Lunch': (
+        Food('Grilled chicken with rice', 520, 45, 60, 10),
+        Food('Tuna sandwich with salad', 450, 35, 45, 14),
+        Food('Quinoa bowl with vegetables', 480, 16, 70, 14),
+        Food('Lentil soup with bread', 420, 22, 65, 8),
+        Food('Whole wheat pasta with lean meat', 600, 38, 75, 15),
+    ),
+    'Dinner': (
+        Food('Baked fish with vegetables', 400, 40, 20, 16),
+        Food('Chicken stir-fry with brown rice', 550, 42, 62, 13),
+        Food('Lean beef with sweet potato', 580, 45, 50, 20),
+        Food('Vegetable curry with rice', 520, 14, 80, 16),
+        Food('Grilled turkey with quinoa', 500, 45, 45, 13),
+    ),
+    'Snack': (
+        Food('Mixed nuts', 180, 6, 6, 16),
+        Food('Fresh fruit', 100, 1, 25, 0),
+        Food('Protein bar', 200, 20, 22, 6),
+        Food('Vegetable sticks with hummus', 150, 5, 15, 8),
+        Food('Low-fat cheese', 120, 12, 2, 7),
+    ),
+}
+# Share of the daily target for each meal
+MEAL_SHARES = {'Breakfast': 0.25, 'Lunch': 0.35, 'Dinner': 0.30, 'Snack': 0.10}
+
+# (protein, carbs, fat) share of calories per goal
+MACRO_SPLITS = {
+    'Weight Loss': (0.40, 0.30, 0.30),
+    'Muscle Gain': (0.30, 0.50, 0.20),
+    'Maintenance': (0.30, 0.40, 0.30),
+}
+KCAL_PER_GRAM = (4, 4, 9)
+GOAL_ADJUSTMENT = {'Weight Loss': -500, 'Muscle Gain': 300, 'Maintenance': 0}
+# BMR multiplier for daily living without exercise
+SEDENTARY_FACTOR = 1.2
+MIN_DAILY_KCAL = 1200
+# Targets are rounded to this step before solving
+CALORIE_STEP = 50
+PLAN_CACHE_SIZE = 256
+SERVING_STEP = 0.25
+MIN_SERVINGS = 0.5
+
+
+def goal_for_bmi(bmi):
+    """Nutrition goal implied by BMI"""
+    if bmi >= 25:
+        return 'Weight Loss'
+    if bmi < 18.5:
+        return 'Muscle Gain'
+    return 'Maintenance'
+
+
+def daily_targets(bmr, bmi, workout_kcal_per_day=0):
+    """Daily calorie and macro targets from BMR and recent training"""
+    goal = goal_for_bmi(bmi)
+    kcal = max(bmr * SEDENTARY_FACTOR + workout_kcal_per_day + GOAL_ADJUSTMENT[goal],
+               MIN_DAILY_KCAL)
+    protein, carbs, fat = (round(kcal * share / per_gram)
+                           for share, per_gram in zip(MACRO_SPLITS[goal], KCAL_PER_GRAM))
+    return {'goal': goal, 'calories': round(kcal), 'protein_g': protein,
+            'carbs_g': carbs, 'fat_g': fat}
+
+
+def round_target(kcal):
+    """Round a calorie target to the plan cache granularity"""
+    return int(round(kcal / CALORIE_STEP) * CALORIE_STEP)
+
+
+def _servings(food, meal_kcal):
+    """Servings of food closest to meal_kcal, in SERVING_STEP increments"""
+    return max(round(meal_kcal / food.kcal / SERVING_STEP) * SERVING_STEP, MIN_SERVINGS)
+
+
+def _score(portions, target_kcal, split):
+    """How far a set of (food, servings) is from the calorie and macro targets"""
+    grams = [sum(getattr(food, macro) * servings for food, servings in portions)
+             for macro in ('protein', 'carbs', 'fat')]
+    kcal = [g * k for g, k in zip(grams, KCAL_PER_GRAM)]
+    total = sum(kcal)
+    macro_error = sum((k / total - share) ** 2 for k, share in zip(kcal, split))
+    calorie_error = ((sum(food.kcal * servings for food, servings in portions)
+                      - target_kcal) / target_kcal) ** 2
+    return macro_error + calorie_error
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def solve_meal_plan(target_kcal, goal):
+    """Choose one food per meal, sized to its share of target_kcal, so the
+    day best matches the calorie target and the goal's macro split
+
+    Every combination in the food table is scored, which is why solved plans
+    are cached. The result is shared, so callers must treat it as read-only.
+    """
+    split = MACRO_SPLITS[goal]
+    meals = list(MEAL_SHARES)
+    sized = [[(food, _servings(food, target_kcal * MEAL_SHARES[meal])) for food in FOODS[meal]]
+             for meal in meals]
+    best = min(product(*sized),
+               key=lambda portions: (_score(portions, target_kcal, split),
+                                     [food.name for food, _ in portions]))
+
+    plan = {'target_calories': target_kcal, 'goal': goal, 'meals': []}
+    totals = dict.fromkeys(('calories', 'protein_g', 'carbs_g', 'fat_g'), 0)
+    for meal, (food, servings) in zip(meals, best):
+        item = {
+            'meal': meal,
+            'food': food.name,
+            'servings': servings,
+            'calories': round(food.kcal * servings),
+            'protein_g': round(food.protein * servings),
+            'carbs_g': round(food.carbs * servings),
+            'fat_g': round(food.fat * servings),
+        }
+        plan['meals'].append(item)
+        for key in totals:
+            totals[key] += item[key]
+    plan['totals'] = totals
+    return plan
+
+
+def diet_plan_for_member(user, workout_kcal_per_day=0):
+    """Diet guide for a member: personal targets plus the cached meal plan"""
+    targets = daily_targets(user.get('bmr', 1500), user.get('bmi', 22), workout_kcal_per_day)
+    plan = solve_meal_plan(round_target(targets['calories']), targets['goal'])
+    return dict(plan, targets=targets, workout_calories_per_day=round(workout_kcal_per_day, 1))
@@ -0,0 +1,105 @@
+"""
+ACEest Fitness - Exercise catalog
+
+Per-exercise MET values, loaded once at startup from data/exercises.csv (or
+the file named by EXERCISE_CATALOG_PATH), with a sorted-array prefix index
+for autocomplete. Every word start of every name is indexed, so "press"
+finds "Bench Press"; a lookup is one bisect plus a scan of the matches.
+"""
+
+import csv
+import os
+from bisect import bisect_left
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    'data', 'exercises.csv')
+
+
+def normalize_name(name):
+    """Case- and whitespace-insensitive key for an exercise name"""
+    return ' '.join(name.split()).casefold()
+
+
+class Exercise:
+    """A catalog entry"""
+
+    __slots__ = ('name', 'category', 'met', 'key')
+
+    def __init__(self, name, category, met):
+        self.name = name
+        self.category = category
+        self.met = met
+        self.key = normalize_name(name)
+
+    def to_dict(self):
+        return {'name': self.name, 'category': self.category, 'met': self.met}
+
+
+class ExerciseCatalog:
+    """Exercises by normalized name, plus a prefix index over word starts"""
+
+    def __init__(self, exercises=()):
+        self.exercises = []
+        self._positions = {}
+        index = []
+        for name, category, met in exercises:
+            exercise = Exercise(name, category, met)
+            if not exercise.key or exercise.key in self._positions:
+                continue
+            position = len(self.exercises)
+            self.exercises.append(exercise)
+            self._positions[exercise.key] = position
+            offset = 0
+            for word in exercise.key.split(' '):
+                index.append((exercise.key[offset:], position))
+                offset += len(word) + 1
+        index.sort()
+        self._index_keys = [key for key, _ in index]
+        self._index_positions = [position for _, position in index]
+
+    def __len__(self):
+        return len(self.exercises)
+
+    def position_of(self, name):
+        """Position of an exercise in self.exercises, or None if unknown"""
+        if not name:
+            return None
+        return self._positions.get(normalize_name(name))
+
+    def get(self, name):
+        """Catalog entry for an exercise name, or None if unknown"""
+        position = self.position_of(name)
+        return None if position is None else self.exercises[position]
+
+    def met_for(self, name):
+        """MET value for an exercise name, or None if unknown"""
+        exercise = self.get(name)
+        return None if exercise is None else exercise.met
+
+    def suggest(self, query, limit=10):
+        """Exercises with a word starting with query, at most limit of them"""
+        prefix = normalize_name(query)
+        if not prefix or limit <= 0:
+            return []
+        keys, positions = self._index_keys, self._index_positions
+        results, seen = [], set()
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix):
+            position = positions[i]
+            if position not in seen:
+                seen.add(position)
+                results.append(self.exercises[position])
+                if len(results) == limit:
+                    break
+            i += 1
+        return results
+
+
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    """Load a catalog from a CSV file with name, category and met columns"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return ExerciseCatalog((row['name'], row['category'], float(row['met']))
+                               for row in csv.DictReader(f))
+
+
+catalog = load_catalog(os.environ.get('EXERCISE_CATALOG_PATH', DEFAULT_CATALOG_PATH))
@@ -0,0 +1,62 @@
+"""
+ACEest Fitness - Gym-wide exercise symbol table
+
+Members type the same exercise names over and over, with their own casing
+and spacing. Each name is normalized once and dictionary-encoded to a small
+integer ID shared across the gym; sessions store the ID, and grouping by
+exercise is integer grouping. The catalog's exercises take IDs
+0..len(catalog)-1 in catalog order, so a catalog exercise's ID is also its
+catalog position.
+"""
+
+import threading
+
+from exercise_catalog import catalog, normalize_name
+
+
+class ExerciseSymbols:
+    """Normalized exercise name <-> integer ID
+
+    IDs are never reused or removed. Lookups are lock-free; only adding a
+    new name takes the lock.
+    """
+
+    def __init__(self, exercise_catalog=catalog):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self.names = []
+        for exercise in exercise_catalog.exercises:
+            self._ids.setdefault(exercise.key, len(self.names))
+            self.names.append(exercise.name)
+        self.catalog_size = len(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def encode(self, name):
+        """ID for name, adding it on first sight"""
+        key = normalize_name(name)
+        symbol = self._ids.get(key)
+        if symbol is None:
+            with self._lock:
+                symbol = self._ids.get(key)
+                if symbol is None:
+                    symbol = len(self.names)
+                    # The first spelling seen, tidied, is what gets displayed
+                    self.names.append(' '.join(name.split()))
+                    self._ids[key] = symbol
+        return symbol
+
+    def lookup(self, name):
+        """ID for name, or None if it has never been seen"""
+        return self._ids.get(normalize_name(name))
+
+    def name(self, symbol):
+        return self.names[symbol]
+
+    def catalog_position(self, symbol):
+        """Catalog position of the exercise, or None for a custom name"""
+        return symbol if symbol < self.catalog_size else None
+
+
+symbols = ExerciseSymbols()
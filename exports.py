@@ -0,0 +1,24 @@
+"""
+ACEest Fitness - Workout history exports
+
+Job handlers for the background job queue. They take plain payloads built
+by the request, so they can run on a thread or a spawned process.
+"""
+
+import csv
+import io
+
+EXPORT_FIELDS = ('date', 'timestamp', 'category', 'exercise', 'duration', 'calories')
+
+
+def workouts_csv(payload):
+    """CSV of a member's sessions; payload has 'regn_id' and 'sessions'"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(sorted(payload['sessions'], key=lambda s: s['timestamp']))
+    return {
+        'filename': f"workouts-{payload['regn_id']}.csv",
+        'rows': len(payload['sessions']),
+        'csv': buffer.getvalue(),
+    }
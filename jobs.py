@@ -0,0 +1,249 @@
+"""
+ACEest Fitness - In-process background jobs
+
+Work that would otherwise block a request thread (exports, imports,
+notifications) is submitted to a JobQueue and run by a small pool of
+worker threads, either inline or, for CPU-heavy handlers, on a process
+pool. Jobs have priorities, the queue is bounded, failures are retried
+with exponential backoff, and every status change is written to a job
+store so /api/jobs/<id> can report on it.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_EXECUTOR = os.environ.get('JOB_EXECUTOR', 'thread')
+JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 256))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 0.5))
+JOB_HISTORY = int(os.environ.get('JOB_HISTORY', 1000))
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+EXECUTORS = ('thread', 'process')
+
+
+class JobQueueFull(RuntimeError):
+    """Too many jobs are already waiting"""
+
+
+class UnknownJobKind(KeyError):
+    """No handler is registered for the job kind"""
+
+
+class Job:
+    """A submitted job; its public state is mirrored to the job store"""
+
+    __slots__ = ('id', 'kind', 'payload', 'priority', 'member_id', 'status', 'attempts',
+                 'max_attempts', 'result', 'error', 'created', 'updated', 'seq')
+
+    def __init__(self, kind, payload, priority, member_id, max_attempts, seq):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.priority = priority
+        self.member_id = member_id
+        self.status = 'queued'
+        self.attempts = 0
+        self.max_attempts = max_attempts
+        self.result = None
+        self.error = None
+        self.created = self.updated = datetime.now().isoformat()
+        self.seq = seq
+
+    def to_dict(self):
+        record = {'job_id': self.id, 'kind': self.kind, 'status': self.status,
+                  'priority': self.priority, 'member': self.member_id,
+                  'attempts': self.attempts, 'max_attempts': self.max_attempts,
+                  'created': self.created, 'updated': self.updated}
+        if self.status == 'done':
+            record['result'] = self.result
+        elif self.error is not None:
+            record['error'] = self.error
+        return record
+
+
+class JobQueue:
+    """A bounded priority queue of jobs drained by a pool of worker threads
+
+    Handlers are registered per job kind and called with the job's payload;
+    their return value becomes the job's result, so it should be JSON
+    friendly. With executor='process' handlers run on a spawned process
+    pool and must be module-level functions with picklable payloads;
+    handlers registered with in_process=True, which work on this process's
+    state, always run on the worker thread.
+    Lower priority numbers run first; equal priorities run in order.
+    """
+
+    def __init__(self, store=None, workers=JOB_WORKERS, executor=JOB_EXECUTOR,
+                 queue_limit=JOB_QUEUE_LIMIT, max_attempts=JOB_MAX_ATTEMPTS,
+                 backoff=JOB_RETRY_BACKOFF, history=JOB_HISTORY):
+        if executor not in EXECUTORS:
+            raise ValueError(f'executor must be one of {EXECUTORS}')
+        self.store = {} if store is None else store
+        self.workers = workers
+        self.executor = executor
+        self.queue_limit = queue_limit
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.history = history
+        self._handlers = {}
+        self._ready = []    # (priority, seq, job)
+        self._delayed = []  # (run_at, seq, job) waiting out a retry backoff
+        self._running = 0
+        self._finished = deque()
+        self._seq = itertools.count()
+        lock = threading.Lock()
+        self._cond = threading.Condition(lock)     # workers wait for jobs
+        self._drained = threading.Condition(lock)  # join() waits for idle
+        self._threads = []
+        self._pool = None
+        self._closed = False
+
+    def register(self, kind, handler, max_attempts=None, in_process=False):
+        """Run handler(payload) for jobs of this kind"""
+        self._handlers[kind] = (handler, max_attempts or self.max_attempts, in_process)
+
+    def pending(self):
+        """Jobs queued, waiting to retry or running"""
+        with self._cond:
+            return len(self._ready) + len(self._delayed) + self._running
+
+    def submit(self, kind, payload=None, priority=PRIORITY_NORMAL, member_id=None):
+        """Queue a job and return it; raises JobQueueFull when at the limit"""
+        if kind not in self._handlers:
+            raise UnknownJobKind(kind)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('Job queue is shut down')
+            if len(self._ready) + len(self._delayed) + self._running >= self.queue_limit:
+                raise JobQueueFull('Job queue is full, try again shortly')
+            job = Job(kind, payload, priority, member_id, self._handlers[kind][1], next(self._seq))
+            self._save(job)
+            heapq.heappush(self._ready, (priority, job.seq, job))
+            self._start()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id):
+        """Stored record of a job, or None if unknown or expired"""
+        return self.store.get(job_id)
+
+    def _save(self, job):
+        job.updated = datetime.now().isoformat()
+        self.store[job.id] = job.to_dict()
+
+    def _start(self):
+        # Threads start on first use so each gunicorn worker gets its own
+        if self._threads:
+            return
+        if self.executor == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=get_context('spawn'))
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        """Block until a job is due; None once shut down"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, seq, job = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (job.priority, seq, job))
+                if self._ready:
+                    job = heapq.heappop(self._ready)[2]
+                    self._running += 1
+                    return job
+                if self._closed:
+                    return None
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+
+    def _work(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            handler, _, in_process = self._handlers[job.kind]
+            job.status = 'running'
+            job.attempts += 1
+            self._save(job)
+            try:
+                if self._pool is not None and not in_process:
+                    job.result = self._pool.submit(handler, job.payload).result()
+                else:
+                    job.result = handler(job.payload)
+            except Exception as e:
+                job.error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+                self._failed(job)
+            else:
+                job.status = 'done'
+                job.error = None
+                self._finish(job)
+
+    def _failed(self, job):
+        with self._cond:
+            self._running -= 1
+            if job.attempts < job.max_attempts and not self._closed:
+                job.status = 'retrying'
+                self._save(job)
+                run_at = time.monotonic() + self.backoff * 2 ** (job.attempts - 1)
+                heapq.heappush(self._delayed, (run_at, job.seq, job))
+                self._cond.notify()
+                return
+        job.status = 'failed'
+        self._finish(job, running=False)
+
+    def _finish(self, job, running=True):
+        job.payload = None
+        with self._cond:
+            if running:
+                self._running -= 1
+            self._save(job)
+            self._finished.append(job.id)
+            while len(self._finished) > self.history:
+                self.store.pop(self._finished.popleft(), None)
+            self._drained.notify_all()
+
+    def join(self, timeout=None):
+        """Wait until no job is queued or running; True if drained"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._ready or self._delayed or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._drained.wait(remaining)
+            return True
+
+    def shutdown(self, wait=True):
+        """Stop the workers once the ready jobs are done; pending retries are dropped"""
+        with self._cond:
+            self._closed = True
+            dropped = [job for _, _, job in self._delayed]
+            self._delayed.clear()
+            self._cond.notify_all()
+        for job in dropped:
+            job.status = 'failed'
+            self._finish(job, running=False)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+        self._threads = []
@@ -0,0 +1,141 @@
+"""
+ACEest Fitness - Lock-striped member store and the Member record
+
+The member, workout, weight-history and data-version stores are split into
+shards keyed by regn_id, each guarded by its own lock, so threaded workers
+(gunicorn gthread) can serve different members concurrently without racing
+on the same member. All stores built on one LockStripes share its locks:
+holding member_lock(regn_id) makes a change that spans several stores (a
+registration, a new session plus its version bump) atomic for that member.
+"""
+
+import os
+import threading
+
+SHARD_COUNT = int(os.environ.get('MEMBER_STORE_SHARDS', 64))
+
+
+class LockStripes:
+    """A fixed set of re-entrant locks; a key always maps to the same one"""
+
+    def __init__(self, count=SHARD_COUNT):
+        self.count = count
+        self.locks = [threading.RLock() for _ in range(count)]
+
+    def index(self, key):
+        return hash(key) % self.count
+
+    def lock_for(self, key):
+        return self.locks[self.index(key)]
+
+
+class ShardedStore:
+    """A dict-like store partitioned by key over a set of lock stripes
+
+    Single-key operations are atomic: writes take the shard's lock, reads
+    rely on dict lookups being atomic and take none. Whole-store reads
+    (keys, values, items) lock one shard at a time, so they are consistent
+    per shard but not a global snapshot.
+    """
+
+    def __init__(self, stripes):
+        self.stripes = stripes
+        self._shards = [{} for _ in range(stripes.count)]
+
+    def _locate(self, key):
+        index = self.stripes.index(key)
+        return self._shards[index], self.stripes.locks[index]
+
+    def get(self, key, default=None):
+        shard, _ = self._locate(key)
+        return shard.get(key, default)
+
+    def __getitem__(self, key):
+        shard, _ = self._locate(key)
+        return shard[key]
+
+    def __setitem__(self, key, value):
+        shard, lock = self._locate(key)
+        with lock:
+            shard[key] = value
+
+    def __delitem__(self, key):
+        shard, lock = self._locate(key)
+        with lock:
+            del shard[key]
+
+    def __contains__(self, key):
+        shard, _ = self._locate(key)
+        return key in shard
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def insert_if_absent(self, key, value):
+        """Store value unless key exists; True if it was stored"""
+        shard, lock = self._locate(key)
+        with lock:
+            if key in shard:
+                return False
+            shard[key] = value
+            return True
+
+    def pop(self, key, default=None):
+        shard, lock = self._locate(key)
+        with lock:
+            return shard.pop(key, default)
+
+    def _each_shard(self):
+        for shard, lock in zip(self._shards, self.stripes.locks):
+            with lock:
+                yield shard
+
+    def keys(self):
+        return [key for shard in self._each_shard() for key in list(shard)]
+
+    def values(self):
+        return [value for shard in self._each_shard() for value in list(shard.values())]
+
+    def items(self):
+        return [item for shard in self._each_shard() for item in list(shard.items())]
+
+    def clear(self):
+        for shard in self._each_shard():
+            shard.clear()
+
+
+class Member:
+    """Typed, slotted view of a stored member profile
+
+    get() mirrors dict.get so planners and reports written against profile
+    dicts accept a Member unchanged.
+    """
+
+    __slots__ = ('regn_id', 'name', 'age', 'gender', 'height', 'weight', 'bmi', 'bmr',
+                 'registered_date')
+
+    def __init__(self, regn_id, name, age, gender, height, weight, bmi, bmr,
+                 registered_date=None):
+        self.regn_id = regn_id
+        self.name = name
+        self.age = age
+        self.gender = gender
+        self.height = height
+        self.weight = weight
+        self.bmi = bmi
+        self.bmr = bmr
+        self.registered_date = registered_date
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data.get(field) for field in cls.__slots__})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in self.__slots__ else None
+        return default if value is None else value
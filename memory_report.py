@@ -0,0 +1,220 @@
+"""
+ACEest Fitness - Memory accounting
+
+Everything lives in the worker's memory, so when a pod nears its limit the
+question is which structures and which members hold it. Walking every
+object on every report would be too slow to run in production, so the
+stores are sampled instead. MEMORY_SAMPLE_SIZE members get a deep
+measurement, and a sample of their sessions calibrates a per-session cost.
+Every member is then ranked by session count, a len() per category, and
+the heaviest are sized from their own profile and list lengths.
+
+Gym-wide shared objects, such as exercise names and symbol IDs, are
+reported on their own rather than charged to whichever member happens to
+be measured first.
+
+TracemallocSnapshots adds allocation diffs between two points in time, for
+when the estimate says memory grew but not where.
+"""
+
+import os
+import random
+import sys
+import threading
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+MEMORY_SAMPLE_SIZE = int(os.environ.get('MEMORY_SAMPLE_SIZE', 100))
+MEMORY_TOP_MEMBERS = int(os.environ.get('MEMORY_TOP_MEMBERS', 10))
+# Sessions sampled from each category of a sampled member to size a session
+SESSIONS_PER_MEMBER = 20
+# The most frames tracemalloc.start() accepts per traceback
+MAX_TRACEBACK_FRAMES = 65535
+
+# Followed by reference but never counted: they belong to the program, not the data
+_NOT_DATA = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def deep_sizeof(obj, seen=None):
+    """Bytes reachable from obj, counting each object once
+
+    Follows dicts, lists, tuples, sets, deques, instance __dict__s and
+    __slots__. Objects whose ids are already in seen are skipped, and seen
+    is updated, so one set shared across calls never counts anything twice.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _NOT_DATA):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        elif not isinstance(o, (str, bytes, int, float, bool)):
+            attributes = getattr(o, '__dict__', None)
+            if isinstance(attributes, dict):
+                stack.append(attributes)
+            for cls in type(o).__mro__:
+                slots = cls.__dict__.get('__slots__', ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    try:
+                        stack.append(getattr(o, slot))
+                    except AttributeError:
+                        pass
+    return total
+
+
+def process_memory():
+    """Resident and peak memory of this process in bytes, where available"""
+    usage = {}
+    try:
+        with open('/proc/self/statm') as f:
+            usage['rss_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux
+        usage['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass
+    return usage
+
+
+def estimate_store(store, sample_size=MEMORY_SAMPLE_SIZE, seen=None, rng=random):
+    """Entry count and estimated deep size of a store from a random sample"""
+    items = store.items()
+    sample = items if len(items) <= sample_size else rng.sample(items, sample_size)
+    seen = set() if seen is None else seen
+    measured = sum(deep_sizeof(item, seen) for item in sample)
+    estimate = measured if len(sample) == len(items) else measured * len(items) / len(sample)
+    return {'entries': len(items), 'sampled': len(sample), 'estimated_bytes': int(estimate)}
+
+
+def _member_fixed_bytes(member_id, users, workouts, histories, shared):
+    """A member's bytes apart from the session objects themselves"""
+    seen = set(shared)
+    categories = workouts.get(member_id) or {}
+    return (deep_sizeof(users.get(member_id), seen) + deep_sizeof(histories.get(member_id), seen)
+            + sys.getsizeof(categories)
+            + sum(deep_sizeof(category, seen) + sys.getsizeof(sessions)
+                  for category, sessions in categories.items()))
+
+
+def member_report(users, workouts, histories, top=MEMORY_TOP_MEMBERS,
+                  sample_size=MEMORY_SAMPLE_SIZE, shared=frozenset(), rng=random):
+    """Estimated bytes per member and the heaviest members
+
+    A member costs their profile, weight history and category lists (the
+    fixed part, measured on a random sample) plus their sessions. The list
+    lengths of every member are read, and the size of a session is averaged
+    over up to SESSIONS_PER_MEMBER sessions from each sampled member. The
+    heaviest members by session count get their fixed part measured
+    individually. Objects whose ids are in shared are not charged to
+    members.
+    """
+    counts = {}
+    list_bytes = 0
+    for member_id, categories in workouts.items():
+        counts[member_id] = sum(len(s) for s in categories.values())
+        list_bytes += sum(sys.getsizeof(s) for s in categories.values())
+    members = users.keys()
+    sample = members if len(members) <= sample_size else rng.sample(members, sample_size)
+
+    fixed = 0
+    entries = []
+    for member_id in sample:
+        fixed += _member_fixed_bytes(member_id, users, workouts, histories, shared)
+        for sessions in (workouts.get(member_id) or {}).values():
+            picks = min(len(sessions), SESSIONS_PER_MEMBER)
+            entries.extend(sessions[i] for i in rng.sample(range(len(sessions)), picks))
+    fixed_per_member = fixed / len(sample) if sample else 0
+    seen = set(shared)
+    per_session = sum(deep_sizeof(e, seen) for e in entries) / len(entries) if entries else 0
+    # The sampled fixed parts included list storage, which is counted exactly instead
+    sampled_lists = sum(sys.getsizeof(s) for m in sample for s in (workouts.get(m) or {}).values())
+    fixed_without_lists = (fixed - sampled_lists) / len(sample) if sample else 0
+
+    heaviest = []
+    for member_id in sorted(counts, key=counts.get, reverse=True)[:top]:
+        member_bytes = _member_fixed_bytes(member_id, users, workouts, histories, shared)
+        heaviest.append({'regn_id': member_id, 'sessions': counts[member_id],
+                         'bytes': int(member_bytes + per_session * counts[member_id])})
+
+    total_sessions = sum(counts.values())
+    return {
+        'count': len(members),
+        'sampled': len(sample),
+        'sessions': total_sessions,
+        'fixed_bytes_per_member': int(fixed_per_member),
+        'bytes_per_session': round(per_session, 1),
+        'estimated_bytes': int(fixed_without_lists * len(members) + list_bytes
+                               + per_session * total_sessions),
+        'heaviest': heaviest,
+    }
+
+
+class TracemallocSnapshots:
+    """Allocation snapshots and the diff between the last two
+
+    Tracing slows allocation and the snapshots take memory themselves, so
+    it is only on from the first snapshot() until stop().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = None
+        self._latest = None
+        self.taken = 0
+        self.started_here = False
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def snapshot(self, top=20, frames=1):
+        """Take a snapshot; returns the top allocation changes since the last one
+
+        frames only applies when this call starts tracing; the report gives
+        the limit in effect. With more than one frame, changes are grouped
+        by whole traceback rather than by line.
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self.started_here = True
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ))
+            self._previous, self._latest = self._latest, snapshot
+            self.taken += 1
+            limit = tracemalloc.get_traceback_limit()
+            report = {'snapshot': self.taken, 'traced_bytes': tracemalloc.get_traced_memory()[0],
+                      'frames': limit}
+            if self._previous is None:
+                report['diff'] = None
+                return report
+            changes = snapshot.compare_to(self._previous, 'traceback' if limit > 1 else 'lineno')
+            report['diff'] = [{'location': str(stat.traceback),
+                               'traceback': [str(frame) for frame in stat.traceback],
+                               'size_diff_bytes': stat.size_diff,
+                               'size_bytes': stat.size, 'count_diff': stat.count_diff}
+                              for stat in changes[:top]]
+            return report
+
+    def stop(self):
+        """Drop the snapshots and stop tracing if it was started here"""
+        with self._lock:
+            self._previous = self._latest = None
+            self.taken = 0
+            if self.started_here:
+                tracemalloc.stop()
+                self.started_here = False
@@ -0,0 +1,186 @@
+"""
+ACEest Fitness - Nightly gym-wide weekly summaries
+
+Produces every member's weekly summary (the figures /api/workout/summary
+reports, restricted to one week) for management. Members are partitioned
+into fixed chunks of sorted regn_ids and summarized across a process pool:
+
+* each worker receives a read-only copy of the member, workout and
+  weight-history stores when it starts. Workers come from a forkserver (or
+  spawn) context, so they never inherit the serving process's threads or
+  the locks those threads hold;
+* each worker streams its chunk to chunk-NNNNN.ndjson, one member per line,
+  and moves the file into place only once it is complete;
+* the parent records finished chunks in checkpoint.json, so a crashed run
+  resumes where it stopped when restarted with the same output directory.
+
+The stores are in memory, so the job runs inside the serving process as
+the nightly-report background job. Schedule it with a POST to
+/admin/nightly-report. Summaries go to NIGHTLY_REPORT_DIR/<week start>/.
+"""
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+from datetime import timedelta
+
+from calculations import summarize_workouts
+from reports import week_bounds
+from weight_history import entry_calories
+
+NIGHTLY_REPORT_DIR = os.environ.get('NIGHTLY_REPORT_DIR')
+
+CHECKPOINT_FILE = 'checkpoint.json'
+SUMMARY_FILE = 'summary.json'
+DEFAULT_CHUNK_SIZE = 1000
+TOTAL_KEYS = ('members', 'active_members', 'sessions', 'total_time', 'total_calories')
+
+# Read-only inputs for _process_chunk in a pool worker, which receives a
+# copy once through _init_worker. The inline path passes the stores to each
+# call instead, so overlapping runs in one process do not share inputs.
+_inputs = {}
+
+
+def chunk_path(output_dir, index):
+    return os.path.join(output_dir, f'chunk-{index:05d}.ndjson')
+
+
+def _write_json(path, data):
+    """Atomically replace path with data as JSON"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def member_week_summary(regn_id, user, workouts, history, first, last):
+    """A member's summary for sessions dated first..last (ISO, inclusive)"""
+    fallback_weight = user.get('weight', 70)
+    summary = summarize_workouts(
+        workouts, lambda category, entry: entry_calories(history, category, entry, fallback_weight),
+        first, last)
+    summary['regn_id'] = regn_id
+    summary['name'] = user.get('name')
+    return summary
+
+
+def _init_worker(inputs):
+    _inputs.update(inputs)
+
+
+def _process_chunk(task, inputs=None):
+    """Summarize one chunk of members into its NDJSON file
+
+    inputs defaults to the stores this pool worker was started with.
+    """
+    index, member_ids, first, last, output_dir = task
+    inputs = _inputs if inputs is None else inputs
+    users, workouts, histories = inputs['users'], inputs['workouts'], inputs['histories']
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    path = chunk_path(output_dir, index)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for regn_id in member_ids:
+            user = users.get(regn_id)
+            if user is None:
+                continue
+            summary = member_week_summary(regn_id, user, workouts.get(regn_id, {}),
+                                          histories.get(regn_id), first, last)
+            f.write(json.dumps(summary, sort_keys=True) + '\n')
+            totals['members'] += 1
+            totals['active_members'] += summary['session_count'] > 0
+            totals['sessions'] += summary['session_count']
+            totals['total_time'] += summary['total_time']
+            totals['total_calories'] += summary['total_calories']
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + '.tmp', path)
+    return index, totals
+
+
+def _fingerprint(member_ids, first, chunk_size):
+    """Identifies a run, so a checkpoint is only resumed for the same input"""
+    digest = hashlib.sha1(f'{first}|{chunk_size}'.encode())
+    for regn_id in member_ids:
+        digest.update(b'\0' + str(regn_id).encode())
+    return digest.hexdigest()
+
+
+def _load_checkpoint(output_dir, fingerprint):
+    try:
+        with open(os.path.join(output_dir, CHECKPOINT_FILE), encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return checkpoint if checkpoint.get('fingerprint') == fingerprint else None
+
+
+def run_nightly_job(users, workouts, histories, output_dir, week_day, workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Write weekly summaries for every member to output_dir
+
+    week_day is any date in the week to summarize. progress(done, total)
+    is called after each finished chunk. Returns the gym-wide summary,
+    which is also written to summary.json.
+    """
+    week_start, week_end = week_bounds(week_day)
+    first, last = week_start.isoformat(), week_end.isoformat()
+    os.makedirs(output_dir, exist_ok=True)
+
+    member_ids = sorted(users)
+    chunks = [member_ids[i:i + chunk_size] for i in range(0, len(member_ids), chunk_size)]
+    fingerprint = _fingerprint(member_ids, first, chunk_size)
+    checkpoint = _load_checkpoint(output_dir, fingerprint)
+    if checkpoint is None:
+        for stale in glob.glob(os.path.join(output_dir, 'chunk-*.ndjson')):
+            os.remove(stale)
+        checkpoint = {'fingerprint': fingerprint, 'week_start': first, 'chunks': len(chunks),
+                      'completed': {}}
+        _write_json(os.path.join(output_dir, CHECKPOINT_FILE), checkpoint)
+
+    tasks = [(i, chunk, first, last, output_dir) for i, chunk in enumerate(chunks)
+             if str(i) not in checkpoint['completed']]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks) or 1))
+    inputs = {'users': users, 'workouts': workouts, 'histories': histories}
+
+    def record(index, totals):
+        checkpoint['completed'][str(index)] = totals
+        _write_json(os.path.join(output_dir, CHECKPOINT_FILE), checkpoint)
+        if progress is not None:
+            progress(len(checkpoint['completed']), len(chunks))
+
+    if workers == 1:
+        for task in tasks:
+            record(*_process_chunk(task, inputs))
+    else:
+        # Forking a process that has threads running (request workers,
+        # the workout-log committer, the shadow tee) can copy a lock
+        # another thread holds, so workers start from a clean process
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        inputs = {name: dict(store.items()) for name, store in inputs.items()}
+        with multiprocessing.get_context(method).Pool(workers, initializer=_init_worker,
+                                                      initargs=(inputs,)) as pool:
+            for index, totals in pool.imap_unordered(_process_chunk, tasks):
+                record(index, totals)
+
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    for chunk_totals in checkpoint['completed'].values():
+        for key in TOTAL_KEYS:
+            totals[key] += chunk_totals[key]
+    totals['total_calories'] = round(totals['total_calories'], 1)
+    summary = {
+        'week_start': first,
+        'week_end': last,
+        'chunks': [os.path.basename(chunk_path(output_dir, i)) for i in range(len(chunks))],
+        'totals': totals,
+    }
+    _write_json(os.path.join(output_dir, SUMMARY_FILE), summary)
+    return summary
+
+
+def default_week_day(today):
+    """The nightly run summarizes the week containing yesterday"""
+    return today - timedelta(days=1)
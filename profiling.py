@@ -0,0 +1,209 @@
+"""
+ACEest Fitness - Sampled request profiling
+
+ProfilingMiddleware profiles a random PROFILE_SAMPLE_RATE fraction of
+requests, plus any request carrying a valid signed X-Debug-Profile header
+(see sign_debug_token), and keeps the last PROFILE_BUFFER profiles in a
+ring buffer for the admin endpoints to hand out.
+
+PROFILE_MODE picks the profiler:
+- cprofile: deterministic cProfile; downloads as a .prof file for pstats,
+  snakeviz and friends
+- sample: a sampling stack profiler that looks at the request's thread every
+  PROFILE_SAMPLE_INTERVAL_MS; downloads as collapsed stacks for
+  flamegraph.pl or speedscope
+
+When neither a sample rate nor PROFILE_SECRET is configured, the app does
+not install the middleware at all.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import itertools
+import marshal
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SECRET = os.environ.get('PROFILE_SECRET')
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'cprofile')
+PROFILE_BUFFER = int(os.environ.get('PROFILE_BUFFER', 20))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', 1))
+
+DEBUG_HEADER = 'X-Debug-Profile'
+MODES = ('cprofile', 'sample')
+
+
+def profiling_enabled(sample_rate=PROFILE_SAMPLE_RATE, secret=PROFILE_SECRET):
+    return sample_rate > 0 or bool(secret)
+
+
+def sign_debug_token(secret, expires):
+    """X-Debug-Profile value that is valid until the Unix time expires"""
+    expires = int(expires)
+    digest = hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{digest}'
+
+
+def verify_debug_token(secret, token, now=None):
+    expires, _, digest = token.partition('.')
+    if not expires.isdigit() or int(expires) < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(sign_debug_token(secret, expires), token)
+
+
+class RequestProfile:
+    """One profiled request and its profiler output"""
+
+    __slots__ = ('id', 'method', 'path', 'status', 'started', 'duration', 'mode', 'data')
+
+    def __init__(self, id, method, path, status, started, duration, mode, data):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.status = status
+        self.started = started
+        self.duration = duration
+        self.mode = mode
+        self.data = data  # pstats dict for cprofile, Counter of stacks for sample
+
+    @property
+    def formats(self):
+        return ('pstats',) if self.mode == 'cprofile' else ('collapsed',)
+
+    def to_dict(self):
+        return {'id': self.id, 'method': self.method, 'path': self.path, 'status': self.status,
+                'started': self.started, 'duration_ms': round(self.duration * 1000, 3),
+                'mode': self.mode, 'formats': list(self.formats)}
+
+    def pstats_bytes(self):
+        """The profile in the format pstats.Stats loads"""
+        return marshal.dumps(self.data)
+
+    def collapsed(self):
+        """One 'outer;...;inner count' line per distinct stack"""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.data.most_common())
+
+
+class ProfileBuffer:
+    """The most recent profiles, newest last"""
+
+    def __init__(self, capacity=PROFILE_BUFFER):
+        self._lock = threading.Lock()
+        self._profiles = deque(maxlen=capacity)
+        self._ids = itertools.count(1)
+
+    def next_id(self):
+        return next(self._ids)
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles.append(profile)
+
+    def get(self, profile_id):
+        with self._lock:
+            return next((p for p in self._profiles if p.id == profile_id), None)
+
+    def recent(self):
+        """Profiles newest first"""
+        with self._lock:
+            return list(reversed(self._profiles))
+
+
+class StackSampler:
+    """Counts the stacks one thread is seen in, every interval seconds"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+
+class ProfilingMiddleware:
+    """WSGI middleware profiling a sample of requests into a ProfileBuffer
+
+    One request is profiled at a time; others that would have been sampled
+    run unprofiled meanwhile.
+    """
+
+    def __init__(self, wsgi_app, profiles, sample_rate=PROFILE_SAMPLE_RATE, secret=PROFILE_SECRET,
+                 mode=PROFILE_MODE, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        if mode not in MODES:
+            raise ValueError(f'Unknown profile mode: {mode}')
+        self.wsgi_app = wsgi_app
+        self.profiles = profiles
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.mode = mode
+        self.interval = interval_ms / 1000
+        self._busy = threading.Lock()
+
+    def wanted(self, environ):
+        token = environ.get('HTTP_X_DEBUG_PROFILE')
+        if token and self.secret and verify_debug_token(self.secret, token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self.wanted(environ) or not self._busy.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+        try:
+            return self._profile(environ, start_response)
+        finally:
+            self._busy.release()
+
+    def _profile(self, environ, start_response):
+        statuses = []
+        def capture_status(status, headers, exc_info=None):
+            statuses.append(int(status.split(' ', 1)[0]))
+            return start_response(status, headers, exc_info)
+
+        started = time.time()
+        clock = time.perf_counter()
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.wsgi_app(environ, capture_status)
+            finally:
+                profiler.disable()
+            profiler.create_stats()
+            data = profiler.stats
+        else:
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+            try:
+                response = self.wsgi_app(environ, capture_status)
+            finally:
+                data = sampler.stop()
+        self.profiles.add(RequestProfile(
+            self.profiles.next_id(), environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'),
+            statuses[-1] if statuses else None, started, time.perf_counter() - clock,
+            self.mode, data))
+        return response
@@ -0,0 +1,201 @@
+"""
+ACEest Fitness - Weekly PDF reports
+
+The web counterpart of FitnessTrackerApp.export_weekly_report. PDFs are
+rendered by reportlab on a bounded process pool, so its CPU time never
+blocks a request worker, and finished reports are cached by (member, week,
+data version) so an unchanged week is never rendered twice.
+"""
+
+import io
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from xml.sax.saxutils import escape
+
+try:
+    from reportlab.lib import colors as rl_colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:  # pragma: no cover - depends on the environment
+    A4 = None
+
+REPORT_WORKERS = int(os.environ.get('REPORT_WORKERS', 2))
+REPORT_QUEUE_LIMIT = int(os.environ.get('REPORT_QUEUE_LIMIT', 32))
+REPORT_CACHE_SIZE = int(os.environ.get('REPORT_CACHE_SIZE', 128))
+
+
+class ReportsUnavailable(RuntimeError):
+    """reportlab is not installed"""
+
+
+class ReportQueueFull(RuntimeError):
+    """Too many reports are already waiting for the pool"""
+
+
+def week_bounds(day):
+    """(Monday, Sunday) of the ISO week containing day"""
+    monday = day - timedelta(days=day.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def render_weekly_report(data):
+    """Render a weekly report to PDF bytes
+
+    Runs in a pool worker, so data must be plain picklable values: 'user'
+    (the profile), 'week_start', 'week_end' and 'sessions' (dicts with
+    category, exercise, duration, calories and date).
+    """
+    if A4 is None:
+        raise ReportsUnavailable('reportlab is not installed')
+    # Paragraph text is markup, so member-entered values are escaped
+    user = {field: escape(str(value)) for field, value in data['user'].items()}
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title=f"Weekly Fitness Report - {data['user']['name']}")
+
+    story = [
+        Paragraph(f"Weekly Fitness Report - {user['name']}", styles['Title']),
+        Paragraph(f"Week: {escape(data['week_start'])} to {escape(data['week_end'])}", styles['Normal']),
+        Paragraph(f"Regn-ID: {user['regn_id']} | Age: {user['age']} | Gender: {user['gender']}",
+                  styles['Normal']),
+        Paragraph(f"Height: {user['height']} cm | Weight: {user['weight']} kg | "
+                  f"BMI: {data['user']['bmi']:.1f} | BMR: {data['user']['bmr']:.0f} kcal/day",
+                  styles['Normal']),
+        Spacer(1, 12),
+    ]
+
+    table_data = [['Category', 'Exercise', 'Duration(min)', 'Calories(kcal)', 'Date']]
+    for s in data['sessions']:
+        table_data.append([s['category'], s['exercise'], str(s['duration']),
+                           f"{s['calories']:.1f}", s['date']])
+    table_data.append(['Total', '', str(sum(s['duration'] for s in data['sessions'])),
+                       f"{sum(s['calories'] for s in data['sessions']):.1f}", ''])
+    table = Table(table_data, colWidths=[80, 150, 80, 80, 80], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), rl_colors.lightblue),
+        ('GRID', (0, 0), (-1, -1), 0.5, rl_colors.black),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    story.append(table)
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+class ReportJob:
+    """A queued or finished report"""
+
+    __slots__ = ('id', 'key', 'future', 'created')
+
+    def __init__(self, key, future):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.future = future
+        self.created = datetime.now().isoformat()
+
+    @property
+    def member_id(self):
+        return self.key[0]
+
+    @property
+    def status(self):
+        if not self.future.done():
+            return 'running' if self.future.running() else 'queued'
+        return 'failed' if self.future.exception() is not None else 'done'
+
+    def to_dict(self):
+        member_id, week_start, data_version = self.key
+        result = {'job_id': self.id, 'status': self.status, 'member': member_id,
+                  'week_start': week_start, 'data_version': data_version, 'created': self.created}
+        if result['status'] == 'failed':
+            result['error'] = str(self.future.exception())
+        return result
+
+
+class ReportService:
+    """Queue reports onto a process pool and cache the results
+
+    Jobs are cached by (member, week start, data version) in an LRU of
+    cache_size entries; a request for a cached key returns the existing job,
+    whether it is still running or done.
+    """
+
+    def __init__(self, max_workers=REPORT_WORKERS, queue_limit=REPORT_QUEUE_LIMIT,
+                 cache_size=REPORT_CACHE_SIZE, render=render_weekly_report):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.cache_size = cache_size
+        self.render = render
+        self._executor = None
+        self._lock = threading.Lock()
+        self._by_key = OrderedDict()
+        self._by_id = {}
+
+    def _pool(self):
+        # Created on first use so each gunicorn worker gets its own pool after
+        # forking. Spawned children do not inherit the app's threads or locks.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=get_context('spawn'))
+        return self._executor
+
+    def pending(self):
+        """Number of jobs not yet finished"""
+        return sum(1 for job in self._by_id.values() if not job.future.done())
+
+    def request(self, member_id, week_start, data_version, build_data):
+        """Return the job for a report, queueing it if it is not cached
+
+        build_data() is only called on a cache miss.
+        """
+        if A4 is None and self.render is render_weekly_report:
+            raise ReportsUnavailable('reportlab is not installed')
+        key = (member_id, week_start, data_version)
+        with self._lock:
+            job = self._cached(key)
+            if job is not None:
+                return job
+        # Built outside the lock: it walks the member's whole history, and
+        # other members' requests must not wait for it
+        data = build_data()
+        with self._lock:
+            # Another request may have queued the same report meanwhile
+            job = self._cached(key)
+            if job is not None:
+                return job
+            if self.pending() >= self.queue_limit:
+                raise ReportQueueFull('Report queue is full, try again shortly')
+            job = ReportJob(key, self._pool().submit(self.render, data))
+            self._by_key[key] = job
+            self._by_id[job.id] = job
+            while len(self._by_key) > self.cache_size:
+                _, evicted = self._by_key.popitem(last=False)
+                self._by_id.pop(evicted.id, None)
+            return job
+
+    def _cached(self, key):
+        """Usable cached job for key, marked recently used; call with the lock held"""
+        job = self._by_key.get(key)
+        if job is not None and job.status != 'failed':
+            self._by_key.move_to_end(key)
+            return job
+        return None
+
+    def get(self, job_id):
+        """Job by id, or None if unknown or evicted"""
+        return self._by_id.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._by_key), 'pending': self.pending()}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,217 @@
+"""
+ACEest Fitness - Per-route request metrics in Prometheus text format
+
+Every request records its endpoint, method, status and latency. Each thread
+writes to its own shard, so the hot path takes no lock; a scrape sums the
+shards. Latencies go into a fixed-bucket histogram, so p99s can be computed
+by Prometheus per route.
+
+gunicorn runs several worker processes, each with its own counters. With
+PROMETHEUS_MULTIPROC_DIR set, every worker writes a snapshot of its counters
+to that directory at most once per METRICS_FLUSH_INTERVAL seconds, and a
+scrape of any worker merges all the snapshots. Counters of workers that have
+exited are kept so totals never go backwards; their in-flight gauges are
+dropped. Empty the directory before starting gunicorn.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))
+
+# Upper bounds in seconds, as in the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+# Dead threads' shards are folded together once there are this many
+MAX_SHARDS = 64
+
+
+class _Shard:
+    """One thread's counters; only that thread writes to them"""
+
+    __slots__ = ('thread', 'statuses', 'latencies', 'in_flight')
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.statuses = {}   # (endpoint, method, status) -> count
+        self.latencies = {}  # (endpoint, method) -> [per-bucket counts..., +Inf count, sum]
+        self.in_flight = {}  # endpoint -> requests started and not finished
+
+
+class RequestMetrics:
+    """Request counters, latency histograms and in-flight gauges"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, multiprocess_dir=PROMETHEUS_MULTIPROC_DIR,
+                 flush_interval=METRICS_FLUSH_INTERVAL):
+        self.buckets = tuple(buckets)
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._retired = _Shard()
+        self._flush_lock = threading.Lock()
+        self._flushed = 0.0
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                if len(self._shards) >= MAX_SHARDS:
+                    self._retire_dead()
+                self._shards.append(shard)
+            return shard
+
+    def begin(self, endpoint):
+        """Count a request as in flight; returns its start time for finish()"""
+        in_flight = self._shard().in_flight
+        in_flight[endpoint] = in_flight.get(endpoint, 0) + 1
+        return time.perf_counter()
+
+    def finish(self, endpoint, method, status, started):
+        """Record a request begun with begin() on this thread"""
+        now = time.perf_counter()
+        shard = self._shard()
+        shard.in_flight[endpoint] -= 1
+        key = (endpoint, method, status)
+        shard.statuses[key] = shard.statuses.get(key, 0) + 1
+        self._observe(shard, (endpoint, method), now - started)
+        if self.multiprocess_dir and now - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def _observe(self, shard, key, seconds):
+        series = shard.latencies.get(key)
+        if series is None:
+            series = shard.latencies[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def _retire_dead(self):
+        """Fold the shards of exited threads into one; caller holds _lock"""
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                _merge(self._retired, shard.statuses.items(), shard.latencies.items(), ())
+        self._shards = live
+
+    def snapshot(self):
+        """This process's counters, summed over threads"""
+        total = _Shard()
+        with self._lock:
+            self._retire_dead()
+            shards = [self._retired] + self._shards
+        for shard in shards:
+            # dict.copy() is atomic under the GIL, so writers can carry on
+            _merge(total, shard.statuses.copy().items(),
+                   [(k, list(v)) for k, v in shard.latencies.copy().items()],
+                   shard.in_flight.copy().items())
+        return total
+
+    def flush(self):
+        """Write this process's snapshot to the multiprocess directory"""
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._flushed = time.perf_counter()
+            total = self.snapshot()
+            pid = os.getpid()
+            path = os.path.join(self.multiprocess_dir, f'metrics-{pid}.json')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'pid': pid, 'buckets': self.buckets,
+                           'statuses': [list(k) + [v] for k, v in total.statuses.items()],
+                           'latencies': [list(k) + [v] for k, v in total.latencies.items()],
+                           'in_flight': list(total.in_flight.items())}, f)
+            os.replace(path + '.tmp', path)
+        finally:
+            self._flush_lock.release()
+
+    def collect(self):
+        """Counters to expose: this process's, or every worker's in multiprocess mode"""
+        if not self.multiprocess_dir:
+            return self.snapshot()
+        self.flush()
+        total = _Shard()
+        for path in sorted(glob.glob(os.path.join(self.multiprocess_dir, 'metrics-*.json'))):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if tuple(data['buckets']) != self.buckets:
+                continue
+            _merge(total, [(tuple(row[:3]), row[3]) for row in data['statuses']],
+                   [(tuple(row[:2]), row[2]) for row in data['latencies']],
+                   data['in_flight'] if _alive(data['pid']) else ())
+        return total
+
+    def render(self, gauges=()):
+        """Prometheus text exposition, with extra (name, help, value) gauges"""
+        total = self.collect()
+        lines = []
+        for name, help_text, value in gauges:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}']
+
+        lines += ['# HELP http_requests_total Requests by endpoint, method and status',
+                  '# TYPE http_requests_total counter']
+        for (endpoint, method, status), count in sorted(total.statuses.items()):
+            lines.append(f'http_requests_total{{endpoint="{_escape(endpoint)}",'
+                         f'method="{method}",status="{status}"}} {count}')
+
+        lines += ['# HELP http_request_duration_seconds Request latency by endpoint and method',
+                  '# TYPE http_request_duration_seconds histogram']
+        bounds = [repr(float(b)) for b in self.buckets] + ['+Inf']
+        for (endpoint, method), series in sorted(total.latencies.items()):
+            labels = f'endpoint="{_escape(endpoint)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels}}} {series[-1]!r}')
+            lines.append(f'http_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+        lines += ['# HELP http_requests_in_flight Requests being handled, by endpoint',
+                  '# TYPE http_requests_in_flight gauge']
+        for endpoint, count in sorted(total.in_flight.items()):
+            lines.append(f'http_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(into, statuses, latencies, in_flight):
+    for key, count in statuses:
+        into.statuses[key] = into.statuses.get(key, 0) + count
+    for key, series in latencies:
+        current = into.latencies.get(key)
+        if current is None:
+            into.latencies[key] = list(series)
+        else:
+            for i, value in enumerate(series):
+                current[i] += value
+    for endpoint, count in in_flight:
+        into.in_flight[endpoint] = into.in_flight.get(endpoint, 0) + count
+
+
+def _alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
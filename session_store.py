@@ -0,0 +1,249 @@
+"""
+ACEest Fitness - Server-side sessions
+
+Flask's default sessions keep user_id and user_name in a signed cookie, so
+every request HMAC-verifies and deserializes it, and a session cannot be
+revoked before it expires. Here the cookie carries only an opaque random
+session id. The session data lives in a backend: in memory, or in SQLite
+(SESSION_DB_PATH) so every worker sharing the file sees the same sessions
+and revocations. Each worker keeps an LRU of hot sessions, so a cache hit is
+a dict lookup.
+
+Cached sessions are trusted for SESSION_CACHE_TTL seconds; a revocation made
+by another worker takes effect there within that time. Operators end all of
+a member's sessions with DELETE /admin/sessions/<regn_id>. Expired sessions
+are purged from the backend by whichever request saves a session first
+after SESSION_PURGE_INTERVAL seconds.
+
+The memory backend is refused when WEB_CONCURRENCY (gunicorn's worker count)
+is above one: each worker would hold its own sessions and a login would only
+be recognised by the worker that happened to serve it.
+"""
+
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from tracing import span
+
+SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH')
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', 10000))
+SESSION_CACHE_TTL = float(os.environ.get('SESSION_CACHE_TTL', 5))
+SESSION_PURGE_INTERVAL = float(os.environ.get('SESSION_PURGE_INTERVAL', 300))
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session data plus the id it is stored under"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.loaded_user = self.get('user_id')
+
+
+class MemorySessionBackend:
+    """Sessions held in this process only"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # sid -> (data, user_id, expires)
+
+    def get(self, sid):
+        record = self._sessions.get(sid)
+        if record is None or record[2] < time.time():
+            return None
+        return record[0]
+
+    def set(self, sid, data, expires):
+        with self._lock:
+            self._sessions[sid] = (data, data.get('user_id'), expires)
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sessions_for(self, user_id):
+        with self._lock:
+            return [sid for sid, record in self._sessions.items() if record[1] == user_id]
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, record in self._sessions.items() if record[2] < now]:
+                del self._sessions[sid]
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite file shared by every worker that opens it"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with closing(sqlite3.connect(path, isolation_level=None)) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, '
+                               'user_id TEXT, data TEXT NOT NULL, expires REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS sessions_user ON sessions (user_id)')
+
+    @property
+    def _connection(self):
+        # sqlite3 connections belong to the thread that opened them
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, isolation_level=None)
+        return connection
+
+    def get(self, sid):
+        row = self._connection.execute('SELECT data FROM sessions WHERE sid = ? AND expires >= ?',
+                                       (sid, time.time())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, sid, data, expires):
+        self._connection.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)',
+                                 (sid, data.get('user_id'), json.dumps(data), expires))
+
+    def delete(self, sid):
+        self._connection.execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sessions_for(self, user_id):
+        rows = self._connection.execute('SELECT sid FROM sessions WHERE user_id = ?', (user_id,))
+        return [row[0] for row in rows]
+
+    def purge_expired(self):
+        self._connection.execute('DELETE FROM sessions WHERE expires < ?', (time.time(),))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface storing sessions in a backend behind an LRU
+
+    Session data must be JSON serializable when the SQLite backend is used.
+    """
+
+    def __init__(self, backend=None, cache_size=SESSION_CACHE_SIZE, cache_ttl=SESSION_CACHE_TTL,
+                 purge_interval=SESSION_PURGE_INTERVAL):
+        self.backend = backend or MemorySessionBackend()
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + purge_interval
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # sid -> (data, loaded_at)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, sid):
+        with self._lock:
+            record = self._cache.get(sid)
+            if record is not None and time.monotonic() - record[1] < self.cache_ttl:
+                self._cache.move_to_end(sid)
+                self.hits += 1
+                return record[0]
+            self.misses += 1
+        return None
+
+    def _remember(self, sid, data):
+        with self._lock:
+            self._cache[sid] = (data, time.monotonic())
+            self._cache.move_to_end(sid)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _forget(self, sid):
+        with self._lock:
+            self._cache.pop(sid, None)
+
+    def _purge_if_due(self):
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_purge:
+                return
+            self._next_purge = now + self.purge_interval
+        with span('session.purge'):
+            self.backend.purge_expired()
+
+    def load(self, sid):
+        """Session data for sid, or None if unknown, expired or revoked"""
+        data = self._cached(sid)
+        if data is None:
+            data = self.backend.get(sid)
+            if data is not None:
+                self._remember(sid, data)
+        return data
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        with span('session.load'):
+            data = self.load(sid) if sid else None
+        if data is None:
+            return ServerSideSession(sid=secrets.token_urlsafe(24), new=True)
+        # Callers get a copy; the cached dict is shared between requests
+        return ServerSideSession(dict(data), sid=sid)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified and not session.new:
+                self.revoke(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        if not session.modified and not (session.permanent and
+                                         app.config['SESSION_REFRESH_EACH_REQUEST']):
+            return
+        data = dict(session)
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if session.get('user_id') != session.loaded_user and not session.new:
+            # New id whenever the member changes, so a planted id is useless
+            self.revoke(session.sid)
+            session.sid = secrets.token_urlsafe(24)
+        if session.modified:
+            with span('session.save'):
+                self.backend.set(session.sid, data, time.time() + lifetime)
+                self._remember(session.sid, data)
+            self._purge_if_due()
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                            secure=self.get_cookie_secure(app),
+                            samesite=self.get_cookie_samesite(app))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+    def revoke(self, sid):
+        """End one session"""
+        self.backend.delete(sid)
+        self._forget(sid)
+
+    def revoke_member(self, user_id):
+        """End every session belonging to a member; returns how many"""
+        sids = self.backend.sessions_for(user_id)
+        for sid in sids:
+            self.revoke(sid)
+        return len(sids)
+
+
+def create_session_interface():
+    """Session interface configured from the environment"""
+    if SESSION_DB_PATH:
+        backend = SQLiteSessionBackend(SESSION_DB_PATH)
+    elif WEB_CONCURRENCY > 1:
+        raise RuntimeError(f'{WEB_CONCURRENCY} workers cannot share in-memory sessions; '
+                           'set SESSION_DB_PATH')
+    else:
+        backend = MemorySessionBackend()
+    return ServerSideSessionInterface(backend)
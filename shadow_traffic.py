@@ -0,0 +1,346 @@
+"""
+ACEest Fitness - Shadow traffic tee
+
+ShadowMiddleware copies selected requests (SHADOW_PATHS prefixes, a
+SHADOW_SAMPLE_RATE fraction of them) to the shadow deployment at
+SHADOW_BASE_URL, then compares the shadow's response with production's.
+
+Mirroring never delays the primary path. Once production's response has
+been sent, the request and response are put on a bounded queue
+(SHADOW_QUEUE) without waiting. If the queue is full, the copy is dropped
+and counted. SHADOW_WORKERS background threads replay the queue against
+the shadow. With the default of one, the shadow sees requests in
+production's order, so a login arrives before the requests that use it.
+
+The comparison covers:
+- Status codes.
+- JSON bodies, field by field, skipping the fields in
+  SHADOW_IGNORE_FIELDS, which differ between any two runs.
+- Other bodies, byte for byte.
+- Latency, as primary vs shadow percentiles over recent requests.
+
+Mismatches are kept in a ring buffer of SHADOW_DIFF_BUFFER entries for
+/admin/shadow.
+
+The shadow has its own sessions. When production and the shadow both set a
+cookie on the same request (a login), the tee remembers the shadow's value
+and substitutes it in that member's later mirrored requests. The shadow
+therefore sees a logged-in member as long as logins are mirrored too.
+"""
+
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+from werkzeug.http import parse_cookie
+
+from wsgi_proxy import KeepAliveClient, buffer_body, request_headers, request_target
+
+SHADOW_BASE_URL = os.environ.get('SHADOW_BASE_URL')
+SHADOW_PATHS = [p.strip() for p in
+                os.environ.get('SHADOW_PATHS', '/register,/login,/api/workout/').split(',') if p.strip()]
+SHADOW_SAMPLE_RATE = float(os.environ.get('SHADOW_SAMPLE_RATE', 1))
+SHADOW_QUEUE = int(os.environ.get('SHADOW_QUEUE', 1000))
+SHADOW_WORKERS = int(os.environ.get('SHADOW_WORKERS', 1))
+SHADOW_TIMEOUT = float(os.environ.get('SHADOW_TIMEOUT', 5))
+SHADOW_IGNORE_FIELDS = frozenset(f.strip() for f in os.environ.get('SHADOW_IGNORE_FIELDS', 'timestamp')
+                                 .split(',') if f.strip())
+SHADOW_DIFF_BUFFER = int(os.environ.get('SHADOW_DIFF_BUFFER', 100))
+
+SHADOW_HEADER = 'X-Aceest-Shadow'
+# Primary/shadow latency pairs kept for the percentiles
+LATENCY_WINDOW = 1000
+# Production cookie values remembered with the shadow's replacement
+COOKIE_MAP_SIZE = 10000
+MAX_DIFFERENCES = 20
+_MISSING = '<missing>'
+
+
+def differences(primary, shadow, ignore=frozenset(), limit=MAX_DIFFERENCES, path=''):
+    """[{'path', 'primary', 'shadow'}] where two JSON values differ, at most limit"""
+    found = []
+
+    def walk(a, b, where):
+        if len(found) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            for key in sorted(a.keys() | b.keys(), key=str):
+                if key not in ignore:
+                    walk(a.get(key, _MISSING), b.get(key, _MISSING), f'{where}.{key}' if where else key)
+        elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+            for n, (x, y) in enumerate(zip(a, b)):
+                walk(x, y, f'{where}[{n}]')
+        elif a != b:
+            found.append({'path': where or '$', 'primary': a, 'shadow': b})
+
+    walk(primary, shadow, path)
+    return found
+
+
+def _set_cookies(headers):
+    """{name: value} from Set-Cookie headers"""
+    cookies = {}
+    for key, value in headers:
+        if key.lower() == 'set-cookie':
+            name, _, rest = value.partition('=')
+            cookies[name.strip()] = rest.split(';', 1)[0]
+    return cookies
+
+
+def _json_body(headers, body):
+    content_type = next((v for k, v in headers if k.lower() == 'content-type'), '')
+    if 'json' not in content_type:
+        return _MISSING
+    try:
+        return json.loads(body)
+    except ValueError:
+        return _MISSING
+
+
+def _percentile(ordered, q):
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3) if ordered else None
+
+
+class Exchange:
+    """A request production served and its response, waiting to be mirrored"""
+
+    __slots__ = ('method', 'target', 'headers', 'body', 'status', 'response_headers',
+                 'response_body', 'primary_ms')
+
+    def __init__(self, method, target, headers, body, status, response_headers, response_body,
+                 primary_ms):
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+        self.status = status
+        self.response_headers = response_headers
+        self.response_body = response_body
+        self.primary_ms = primary_ms
+
+
+class ShadowTee:
+    """Bounded queue of exchanges replayed against the shadow and compared"""
+
+    def __init__(self, base_url, queue_size=SHADOW_QUEUE, workers=SHADOW_WORKERS,
+                 timeout=SHADOW_TIMEOUT, ignore_fields=SHADOW_IGNORE_FIELDS,
+                 capacity=SHADOW_DIFF_BUFFER):
+        parts = urlsplit(base_url)
+        self.base_url = base_url
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.ignore_fields = frozenset(ignore_fields)
+        self.workers = workers
+        self.mirrored = 0
+        self.dropped = 0
+        self.matched = 0
+        self.mismatched = 0
+        self.failed = 0
+        self.last_error = None
+        self._queue = queue.Queue(queue_size)
+        self._lock = threading.Lock()
+        self._diffs = deque(maxlen=capacity)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._cookies = OrderedDict()
+        self._started = False
+        self._client = KeepAliveClient(self.host, self.port, timeout)
+
+    def submit(self, exchange):
+        """Queue an exchange without blocking; False if it was dropped"""
+        if not self._started:
+            self._start()
+        try:
+            self._queue.put_nowait(exchange)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _start(self):
+        with self._lock:
+            if not self._started:
+                for _ in range(self.workers):
+                    threading.Thread(target=self._run, daemon=True).start()
+                self._started = True
+
+    def flush(self, timeout=5):
+        """Wait until queued exchanges are mirrored, for tests and shutdown"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def _run(self):
+        while True:
+            exchange = self._queue.get()
+            try:
+                self.mirror(exchange)
+            except Exception as e:  # a bad exchange must not stop the worker
+                self.failed += 1
+                self.last_error = f'{type(e).__name__}: {e}'
+            finally:
+                self._queue.task_done()
+
+    def _shadow_cookie_header(self, cookie):
+        """The request's Cookie header with production values swapped for the shadow's"""
+        pairs = []
+        with self._lock:
+            for name, value in parse_cookie(cookie).items(multi=True):
+                pairs.append(f'{name}={self._cookies.get((name, value), value)}')
+        return '; '.join(pairs)
+
+    def _learn_cookies(self, primary_headers, shadow_headers):
+        primary, shadow = _set_cookies(primary_headers), _set_cookies(shadow_headers)
+        with self._lock:
+            for name in primary.keys() & shadow.keys():
+                self._cookies[(name, primary[name])] = shadow[name]
+                self._cookies.move_to_end((name, primary[name]))
+            while len(self._cookies) > COOKIE_MAP_SIZE:
+                self._cookies.popitem(last=False)
+
+    def _send(self, method, target, body, headers):
+        return self._client.request(method, self.prefix + target, body, headers)
+
+    def mirror(self, exchange):
+        """Replay one exchange against the shadow and record how it compared"""
+        headers = dict(exchange.headers)
+        if 'Cookie' in headers:
+            headers['Cookie'] = self._shadow_cookie_header(headers['Cookie'])
+        headers[SHADOW_HEADER] = '1'
+        started = time.perf_counter()
+        try:
+            status, shadow_headers, body = self._send(exchange.method, exchange.target,
+                                                      exchange.body, headers)
+        except (OSError, http.client.HTTPException) as e:
+            self.failed += 1
+            self.last_error = f'{type(e).__name__}: {e}'
+            return None
+        shadow_ms = (time.perf_counter() - started) * 1000
+        self.mirrored += 1
+        self._learn_cookies(exchange.response_headers, shadow_headers)
+
+        found = []
+        if exchange.status != status:
+            found.append({'path': 'status', 'primary': exchange.status, 'shadow': status})
+        primary_json = _json_body(exchange.response_headers, exchange.response_body)
+        shadow_json = _json_body(shadow_headers, body)
+        if primary_json is not _MISSING and shadow_json is not _MISSING:
+            found += differences(primary_json, shadow_json, self.ignore_fields)
+        elif exchange.response_body != body:
+            found.append({'path': 'body', 'primary': f'{len(exchange.response_body)} bytes',
+                          'shadow': f'{len(body)} bytes'})
+
+        with self._lock:
+            self._latencies.append((exchange.primary_ms, shadow_ms))
+            if found:
+                self.mismatched += 1
+                self._diffs.append({
+                    'at': time.time(), 'method': exchange.method, 'target': exchange.target,
+                    'primary_status': exchange.status, 'shadow_status': status,
+                    'primary_ms': round(exchange.primary_ms, 3), 'shadow_ms': round(shadow_ms, 3),
+                    'differences': found[:MAX_DIFFERENCES]})
+            else:
+                self.matched += 1
+        return found
+
+    def recent_diffs(self, limit=None):
+        """Recorded mismatches, newest first"""
+        with self._lock:
+            diffs = list(reversed(self._diffs))
+        return diffs if limit is None else diffs[:limit]
+
+    def stats(self):
+        with self._lock:
+            pairs = list(self._latencies)
+        primary = sorted(p for p, _ in pairs)
+        shadow = sorted(s for _, s in pairs)
+        return {
+            'base_url': self.base_url,
+            'queued': self._queue.qsize(),
+            'mirrored': self.mirrored,
+            'dropped': self.dropped,
+            'matched': self.matched,
+            'mismatched': self.mismatched,
+            'failed': self.failed,
+            'last_error': self.last_error,
+            'latency_ms': {
+                'window': len(pairs),
+                'primary': {'p50': _percentile(primary, 0.5), 'p99': _percentile(primary, 0.99)},
+                'shadow': {'p50': _percentile(shadow, 0.5), 'p99': _percentile(shadow, 0.99)},
+            },
+        }
+
+
+class _TeedBody:
+    """Passes a response body through, then hands the chunks on once it is sent
+
+    Servers call close() after the last chunk is written; exhausting the
+    iterator counts too, for servers that read the body before closing.
+    """
+
+    def __init__(self, body, done):
+        self._body = body
+        self._done = done
+        self._chunks = []
+
+    def __iter__(self):
+        for chunk in self._body:
+            self._chunks.append(chunk)
+            yield chunk
+        self._finish()
+
+    def _finish(self):
+        done, self._done = self._done, None
+        if done is not None:
+            done(b''.join(self._chunks))
+
+    def close(self):
+        try:
+            close = getattr(self._body, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+
+class ShadowMiddleware:
+    """WSGI middleware teeing matching requests to a ShadowTee"""
+
+    def __init__(self, wsgi_app, tee, paths=SHADOW_PATHS, sample_rate=SHADOW_SAMPLE_RATE):
+        self.wsgi_app = wsgi_app
+        self.tee = tee
+        self.paths = tuple(paths)
+        self.sample_rate = sample_rate
+
+    def wanted(self, environ):
+        if environ.get('HTTP_X_ACEEST_SHADOW') or not environ.get('PATH_INFO', '').startswith(self.paths):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self.wanted(environ):
+            return self.wsgi_app(environ, start_response)
+        started = time.perf_counter()
+        body = buffer_body(environ)
+        target = request_target(environ)
+        headers = request_headers(environ)
+        method = environ.get('REQUEST_METHOD')
+        response = []
+
+        def capture(status, response_headers, exc_info=None):
+            response[:] = [int(status.split(' ', 1)[0]), list(response_headers)]
+            return start_response(status, response_headers, exc_info)
+
+        def done(response_body):
+            if response:
+                self.tee.submit(Exchange(method, target, headers, body or None, response[0],
+                                         response[1], response_body,
+                                         (time.perf_counter() - started) * 1000))
+
+        return _TeedBody(self.wsgi_app(environ, capture), done)
@@ -0,0 +1,278 @@
+"""
+ACEest Fitness - Member sharding across replicas
+
+Each replica keeps its members in memory, so every request for a member
+has to reach the same replica. Members are placed on a consistent-hash
+ring of the replicas' host:port addresses (SHARD_PEERS, this replica being
+SHARD_SELF). When replicas are added or removed, only the members on the
+changed part of the ring move.
+
+The ring is laid out the way nginx's `hash ... consistent` upstream
+(ketama) lays out its servers: 160 points per server, crc32 of "host\\0port"
+chained with the previous point. An nginx config from `flask shard-nginx`
+that hashes on the member cookie therefore picks the same replica as the
+ring.
+
+ShardRouter is the shim in front of the app. It finds a request's member
+from the aceest_member cookie, or from the regn_id in a /register or /login
+body. If another replica owns that member, it forwards the request there.
+Traffic the proxy already routed correctly passes straight through, and
+requests with no member are served locally. The owner sets the cookie on a
+successful register or login.
+
+A forwarded request is served where it lands, even if that replica's ring
+disagrees, so that a ring change cannot make requests loop. The hop is
+signed with an HMAC over SHARD_SECRET, shared by the replicas; a hop header
+that does not verify is dropped and the request is routed like any other,
+so a client cannot use it to skip routing.
+
+To scale, start the new replicas, then POST the new peer list to
+/admin/shards on every replica, including any that are leaving. Each
+replica switches to the new ring and hands the members it no longer owns
+to their new owners. Login sessions stay where they were, so a moved
+member logs in again.
+"""
+
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import time
+import zlib
+from bisect import bisect_left
+
+from werkzeug.http import dump_cookie, parse_cookie
+
+from wsgi_proxy import HOP_BY_HOP, buffer_body, request_headers, request_target
+
+SHARD_PEERS = [peer.strip() for peer in os.environ.get('SHARD_PEERS', '').split(',') if peer.strip()]
+SHARD_SELF = os.environ.get('SHARD_SELF', '')
+SHARD_FORWARD_TIMEOUT = float(os.environ.get('SHARD_FORWARD_TIMEOUT', 30))
+SHARD_SECRET = os.environ.get('SHARD_SECRET', '')
+
+MEMBER_COOKIE = 'aceest_member'
+FORWARDED_HEADER = 'X-Aceest-Forwarded-By'
+# Seconds a signed hop stays valid, allowing for clock skew between replicas
+HOP_MAX_AGE = 60
+POINTS_PER_NODE = 160
+# Requests whose JSON body names the member before it has the cookie
+MEMBER_BODY_PATHS = ('/register', '/login')
+
+
+def _node_points(node):
+    host, _, port = node.rpartition(':') if ':' in node else (node, '', '')
+    base = zlib.crc32(port.encode(), zlib.crc32(host.encode() + b'\0'))
+    points, previous = [], 0
+    for _ in range(POINTS_PER_NODE):
+        previous = zlib.crc32(previous.to_bytes(4, 'little'), base)
+        points.append(previous)
+    return points
+
+
+class HashRing:
+    """Consistent-hash ring of host:port nodes"""
+
+    def __init__(self, nodes=()):
+        self.nodes = tuple(dict.fromkeys(nodes))
+        points = sorted((point, n) for n, node in enumerate(self.nodes)
+                        for point in _node_points(node))
+        self._hashes, self._owners = [], []
+        for point, n in points:
+            # nginx keeps one server per point when two collide
+            if not self._hashes or self._hashes[-1] != point:
+                self._hashes.append(point)
+                self._owners.append(self.nodes[n])
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def owner(self, key):
+        """The node owning key, or None on an empty ring"""
+        if not self._hashes:
+            return None
+        index = bisect_left(self._hashes, zlib.crc32(key.encode()))
+        return self._owners[index % len(self._owners)]
+
+
+def moved_keys(old_ring, new_ring, keys):
+    """{key: (old owner, new owner)} for keys whose owner changes"""
+    moves = {}
+    for key in keys:
+        before, after = old_ring.owner(key), new_ring.owner(key)
+        if before != after:
+            moves[key] = (before, after)
+    return moves
+
+
+def send_members(node, lines, admin_token, timeout=SHARD_FORWARD_TIMEOUT):
+    """POST member NDJSON lines to node's import endpoint; raises OSError on failure"""
+    host, _, port = node.rpartition(':')
+    connection = http.client.HTTPConnection(host, int(port), timeout=timeout)
+    try:
+        connection.request('POST', '/admin/shards/import', '\n'.join(lines).encode(),
+                           {'Content-Type': 'application/x-ndjson', 'X-Admin-Token': admin_token})
+        response = connection.getresponse()
+        body = response.read()
+    finally:
+        connection.close()
+    if response.status != 200:
+        raise OSError(f'{node} refused the handoff: {response.status} {body[:200]!r}')
+    return json.loads(body)['members']
+
+
+def nginx_config(nodes, listen=80):
+    """nginx.conf routing each member to the replica the ring assigns
+
+    Requests without the member cookie (register, login, anonymous pages)
+    hash on the request id instead, so they spread across replicas and the
+    shim forwards those for a member.
+    """
+    servers = '\n'.join(f'        server {node};' for node in nodes)
+    return f"""events {{
+    worker_connections 1024;
+}}
+
+http {{
+    map $cookie_{MEMBER_COOKIE} $aceest_shard_key {{
+        ""      $request_id;
+        default $cookie_{MEMBER_COOKIE};
+    }}
+
+    upstream aceest-fitness {{
+        hash $aceest_shard_key consistent;
+{servers}
+    }}
+
+    server {{
+        listen {listen};
+        server_name localhost;
+
+        location / {{
+            proxy_pass http://aceest-fitness;
+            proxy_set_header Host $host;
+            proxy_set_header X-Real-IP $remote_addr;
+            proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+            proxy_set_header X-Forwarded-Proto $scheme;
+        }}
+
+        location /health {{
+            proxy_pass http://aceest-fitness/health;
+            access_log off;
+        }}
+    }}
+}}
+"""
+
+
+def request_member(environ):
+    """(regn_id or None, whether it came from the body) for a request
+
+    Reading a register or login body replaces wsgi.input with a copy so the
+    app can still read it.
+    """
+    cookie_member = parse_cookie(environ.get('HTTP_COOKIE', '')).get(MEMBER_COOKIE) or None
+    # A login names the member it is for, whoever the cookie says was here before
+    if environ.get('REQUEST_METHOD') != 'POST' or environ.get('PATH_INFO') not in MEMBER_BODY_PATHS:
+        return cookie_member, False
+    body = buffer_body(environ)
+    try:
+        member = json.loads(body).get('regn_id')
+    except (ValueError, AttributeError):
+        return cookie_member, False
+    return (member, True) if isinstance(member, str) and member else (cookie_member, False)
+
+
+def sign_hop(secret, node, method, target, timestamp):
+    message = f'{node}\n{timestamp}\n{method}\n{target}'.encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def hop_header(secret, node, method, target, now=None):
+    """FORWARDED_HEADER value for a request node forwards to a peer"""
+    timestamp = int(time.time() if now is None else now)
+    return f'{node} {timestamp} {sign_hop(secret, node, method, target, timestamp)}'
+
+
+def verify_hop(secret, value, method, target, now=None):
+    """Whether a FORWARDED_HEADER value was signed with secret for this request"""
+    try:
+        node, timestamp, signature = value.split(' ')
+        timestamp = int(timestamp)
+    except ValueError:
+        return False
+    if abs((time.time() if now is None else now) - timestamp) > HOP_MAX_AGE:
+        return False
+    return hmac.compare_digest(signature, sign_hop(secret, node, method, target, timestamp))
+
+
+class ShardRouter:
+    """WSGI middleware sending each member's requests to the replica that owns them
+
+    ring can be replaced while serving; requests already forwarded by a
+    peer are always served here, so a disagreement between two replicas'
+    rings during a change cannot loop. secret authenticates those hops.
+    """
+
+    def __init__(self, wsgi_app, ring, self_node, secret, timeout=SHARD_FORWARD_TIMEOUT):
+        if not secret:
+            raise ValueError('Set SHARD_SECRET so replicas can authenticate forwarded requests')
+        self.wsgi_app = wsgi_app
+        self.ring = ring
+        self.self_node = self_node
+        self.secret = secret
+        self.timeout = timeout
+        self.forwarded = 0
+
+    def _from_peer(self, environ):
+        """Whether a peer forwarded this request; the hop header goes no further than here"""
+        value = environ.pop('HTTP_X_ACEEST_FORWARDED_BY', None)
+        if value is None:
+            return False
+        return verify_hop(self.secret, value, environ.get('REQUEST_METHOD', ''), request_target(environ))
+
+    def __call__(self, environ, start_response):
+        from_peer = self._from_peer(environ)
+        member, from_body = request_member(environ)
+        owner = self.ring.owner(member) if member else None
+        if owner is None or owner == self.self_node or from_peer:
+            if not from_body:
+                return self.wsgi_app(environ, start_response)
+            return self.wsgi_app(environ, self._setting_cookie(member, start_response))
+        self.forwarded += 1
+        return self.forward(owner, environ, start_response)
+
+    @staticmethod
+    def _setting_cookie(member, start_response):
+        def start(status, headers, exc_info=None):
+            if status.startswith('200'):
+                headers.append(('Set-Cookie', dump_cookie(MEMBER_COOKIE, member, httponly=True,
+                                                          samesite='Lax', path='/')))
+            return start_response(status, headers, exc_info)
+        return start
+
+    def forward(self, node, environ, start_response):
+        """Relay the request to node and its response back"""
+        path = request_target(environ)
+        headers = request_headers(environ)
+        headers[FORWARDED_HEADER] = hop_header(self.secret, self.self_node, environ['REQUEST_METHOD'], path)
+        body = buffer_body(environ) or None
+
+        host, _, port = node.rpartition(':')
+        connection = http.client.HTTPConnection(host, int(port), timeout=self.timeout)
+        try:
+            connection.request(environ['REQUEST_METHOD'], path, body, headers)
+            response = connection.getresponse()
+            data = response.read()
+        except OSError:
+            message = json.dumps({'success': False, 'message': 'Member shard unavailable'}).encode()
+            start_response('503 Service Unavailable', [('Content-Type', 'application/json'),
+                                                       ('Content-Length', str(len(message)))])
+            return [message]
+        finally:
+            connection.close()
+        relayed = [(key, value) for key, value in response.getheaders()
+                   if key.lower() not in HOP_BY_HOP]
+        relayed.append(('Content-Length', str(len(data))))
+        start_response(f'{response.status} {response.reason}', relayed)
+        return [data]
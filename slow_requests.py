@@ -0,0 +1,79 @@
+"""
+ACEest Fitness - Slow-request log
+
+gunicorn's access log says a request was slow; this says why. A request
+taking SLOW_REQUEST_MS or longer is logged as one JSON line on the
+'aceest.slow_requests' logger with its route, member, the size of the
+member's history, the response size and, when the request was traced, the
+milliseconds spent in each traced stage.
+
+Lines are rate-limited by a token bucket (SLOW_REQUEST_LOG_RATE lines per
+second, bursts of SLOW_REQUEST_LOG_BURST), so a slowdown cannot turn into a
+log storm; the next line written reports how many were suppressed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_LOG_RATE = float(os.environ.get('SLOW_REQUEST_LOG_RATE', 1))
+SLOW_REQUEST_LOG_BURST = int(os.environ.get('SLOW_REQUEST_LOG_BURST', 5))
+
+logger = logging.getLogger('aceest.slow_requests')
+
+
+class RateLimiter:
+    """Token bucket: rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    def allow(self):
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class SlowRequestLog:
+    """Decides which requests are slow and writes rate-limited log lines"""
+
+    def __init__(self, threshold_ms=SLOW_REQUEST_MS, rate=SLOW_REQUEST_LOG_RATE,
+                 burst=SLOW_REQUEST_LOG_BURST, log=logger, clock=time.monotonic):
+        self.threshold_ms = threshold_ms
+        self.log = log
+        self.limiter = RateLimiter(rate, burst, clock)
+        self.logged = 0
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._unreported = 0
+
+    def is_slow(self, duration_ms):
+        return 0 < self.threshold_ms <= duration_ms
+
+    def record(self, fields):
+        """Log fields as one JSON line unless the rate limit is exhausted"""
+        allowed = self.limiter.allow()
+        with self._lock:
+            if not allowed:
+                self.suppressed += 1
+                self._unreported += 1
+                return False
+            unreported, self._unreported = self._unreported, 0
+            self.logged += 1
+        fields = dict(fields, event='slow_request', threshold_ms=self.threshold_ms,
+                      suppressed=unreported)
+        self.log.warning(json.dumps(fields, sort_keys=True, default=str))
+        return True
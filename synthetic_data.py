@@ -0,0 +1,291 @@
+"""
+ACEest Fitness - Seeded synthetic gym data for scale testing
+
+SyntheticGym makes up members with profiles, weight histories and years of
+workout sessions. Visits are spread over opening hours with peaks at class
+times. Each visit is a workout, often with a warm-up and a cool-down,
+using exercises from the catalog weighted by a gym-wide popularity order.
+Activity per member follows a power law: a few members log thousands of
+sessions, most log a few dozen, and some registered and never came back.
+
+Member n depends only on the seed and n, so any range of members can be
+generated on its own. Members can be streamed straight into the stores
+(populate) or written to NDJSON files, across processes (write_ndjson),
+and loaded back later (load_ndjson). One line per member:
+
+    {"profile": {...}, "weights": [["2023-01-05", 71.5], ...],
+     "workouts": {"Warm-up": [["Jumping Jacks", 10, "2023-01-05T18:02:00"], ...], ...}}
+
+Run it with ``flask --app app seed-data --members N --output DIR``, or set
+SYNTHETIC_DATA_PATH (NDJSON file or directory) or SYNTHETIC_MEMBERS to fill
+the app's stores at startup.
+"""
+
+import glob
+import json
+import multiprocessing
+import os
+import random
+from bisect import bisect
+from datetime import date
+from itertools import accumulate
+
+from calculations import calculate_bmi, calculate_bmr
+from exercise_catalog import catalog
+from exercise_symbols import symbols
+from weight_history import WeightHistory
+from workout_entry import EPOCH_ORDINAL, SECONDS_PER_DAY, WorkoutEntry
+
+SYNTHETIC_DATA_PATH = os.environ.get('SYNTHETIC_DATA_PATH')
+SYNTHETIC_MEMBERS = int(os.environ.get('SYNTHETIC_MEMBERS', 0))
+SYNTHETIC_SEED = int(os.environ.get('SYNTHETIC_SEED', 0))
+
+CATEGORIES = ('Warm-up', 'Workout', 'Cool-down')
+FIRST_NAMES = ['Aarav', 'Aisha', 'Ana', 'Ben', 'Carlos', 'Chen', 'Chloe', 'David', 'Elena', 'Emma',
+               'Fatima', 'Hannah', 'Hiro', 'Ines', 'Isaac', 'Jamal', 'Julia', 'Kai', 'Lena', 'Liam',
+               'Maya', 'Mei', 'Noah', 'Olga', 'Omar', 'Priya', 'Rahul', 'Sara', 'Sofia', 'Tom',
+               'Yusuf', 'Zara']
+LAST_NAMES = ['Ahmed', 'Costa', 'Fischer', 'Garcia', 'Ivanova', 'Johnson', 'Kim', 'Kumar', 'Lee',
+              'Lopez', 'Martin', 'Muller', 'Nguyen', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Sato',
+              'Silva', 'Singh', 'Smith', 'Tanaka', 'Wang', 'Williams']
+# Workouts members log that are not in the catalog
+CUSTOM_EXERCISES = ['Spin Class', 'Hot Yoga', 'Kettlebell Flow', 'Bootcamp', 'Pilates Reformer']
+CUSTOM_SHARE = 0.02
+# Visit start times: weight of each 10-minute slot over opening hours,
+# peaking at the morning, lunchtime and evening classes
+OPENS, CLOSES = 6, 22
+CLASS_HOURS = (7, 12.5, 18)
+DORMANT_SHARE = 0.1
+CHURNED_SHARE = 0.3
+
+
+def _slot_weight(hour):
+    return 0.15 + sum(2.0 ** -(((hour - c) / 0.75) ** 2) for c in CLASS_HOURS)
+
+
+class SyntheticGym:
+    """Deterministic generator of members, weights and sessions
+
+    mean_visits is the mean number of visits of an active member and alpha
+    the Pareto shape of the visit counts (smaller is more skewed). Sessions
+    fall between start and start + years.
+    """
+
+    def __init__(self, seed=0, start=date(2022, 1, 1), years=3, mean_visits=40, alpha=1.6,
+                 prefix='SYN'):
+        self.seed = seed
+        self.start = start
+        self.years = years
+        self.mean_visits = mean_visits
+        self.alpha = alpha
+        self.prefix = prefix
+        self.first_day = start.toordinal()
+        self.days = int(365.25 * years)
+        # Pareto scale giving the requested mean
+        self._scale = mean_visits * (alpha - 1) / alpha
+        popularity = random.Random(seed)
+        self._exercises = {}
+        for category in CATEGORIES:
+            ids = [symbols.encode(e.name) for e in catalog.exercises if e.category == category]
+            popularity.shuffle(ids)
+            # Zipf-like: the k-th most popular exercise is picked about 1/k as often
+            self._exercises[category] = (ids, list(accumulate(1 / (k + 1) for k in range(len(ids)))))
+        self._custom = [symbols.encode(name) for name in CUSTOM_EXERCISES]
+        slots = range((CLOSES - OPENS) * 6)
+        self._slot_cumulative = list(accumulate(_slot_weight(OPENS + s / 6) for s in slots))
+
+    def __getstate__(self):
+        # IDs are only meaningful in this process's symbol table; spawned and
+        # forkserver workers start from the catalog alone, so ship the names
+        state = dict(self.__dict__)
+        state['_exercises'] = {category: ([symbols.name(i) for i in ids], cumulative)
+                               for category, (ids, cumulative) in self._exercises.items()}
+        state['_custom'] = [symbols.name(i) for i in self._custom]
+        return state
+
+    def __setstate__(self, state):
+        state['_exercises'] = {category: ([symbols.encode(name) for name in names], cumulative)
+                               for category, (names, cumulative) in state['_exercises'].items()}
+        state['_custom'] = [symbols.encode(name) for name in state['_custom']]
+        self.__dict__.update(state)
+
+    def regn_id(self, index):
+        return f'{self.prefix}{index:08d}'
+
+    def _pick(self, rand, category):
+        if category == 'Workout' and rand() < CUSTOM_SHARE:
+            return self._custom[int(rand() * len(self._custom))]
+        ids, cumulative = self._exercises[category]
+        return ids[bisect(cumulative, rand() * cumulative[-1])]
+
+    def member(self, index):
+        """(profile dict, WeightHistory, sessions by category) for member index"""
+        rng = random.Random((self.seed << 32) | index)
+        regn_id = self.regn_id(index)
+        gender = 'M' if rng.random() < 0.5 else 'F'
+        height = round(rng.gauss(177 if gender == 'M' else 164, 7), 1)
+        weight = round(max(45.0, rng.gauss(82 if gender == 'M' else 67, 12)), 1)
+        age = 16 + int(rng.betavariate(2, 4) * 60)
+
+        registered = self.first_day + int(rng.random() * (self.days - 30))
+        remaining = self.first_day + self.days - registered
+        active_days = remaining
+        if rng.random() < CHURNED_SHARE:
+            active_days = max(1, int(remaining * rng.random()))
+        visits = 0
+        if rng.random() >= DORMANT_SHARE:
+            visits = min(int(self._scale * rng.paretovariate(self.alpha)), 2 * active_days)
+
+        # A weight check-in every month or two while active, drifting slowly
+        registered_date = date.fromordinal(registered)
+        history = WeightHistory(registered_date.isoformat(), weight)
+        day = registered
+        while visits and day + 30 < registered + active_days and len(history.dates) * 8 < visits + 8:
+            day += 30 + int(rng.random() * 45)
+            weight = round(max(40.0, weight + rng.gauss(-0.2, 1.0)), 1)
+            history.record(date.fromordinal(day).isoformat(), weight)
+
+        # As after POST /api/user/weight, the profile has the latest weight
+        profile = {
+            'name': f'{FIRST_NAMES[index % len(FIRST_NAMES)]} '
+                    f'{LAST_NAMES[int(rng.random() * len(LAST_NAMES))]}',
+            'regn_id': regn_id, 'age': age, 'gender': gender, 'height': height, 'weight': weight,
+            'bmi': round(calculate_bmi(weight, height), 2),
+            'bmr': round(calculate_bmr(weight, height, age, gender), 0),
+            'registered_date': f'{registered_date.isoformat()}T{8 + index % 12:02d}:{index % 60:02d}:00',
+        }
+
+        workouts = {category: [] for category in CATEGORIES}
+        # Bound once: this loop makes most of the calls
+        rand, pick, from_id = rng.random, self._pick, WorkoutEntry.from_id
+        warm_ups, main, cool_downs = (workouts[c] for c in CATEGORIES)
+        slots, total_slots = self._slot_cumulative, self._slot_cumulative[-1]
+        base = (registered - EPOCH_ORDINAL) * SECONDS_PER_DAY + OPENS * 3600
+        starts = sorted(base + int(rand() * active_days) * SECONDS_PER_DAY
+                        + bisect(slots, rand() * total_slots) * 600 + int(rand() * 10) * 60
+                        for _ in range(visits))
+        # Members stick to a handful of workout exercises
+        favourites = [pick(rand, 'Workout') for _ in range(3 + int(rand() * 5))]
+        ends = 0
+        for ts in starts:
+            # Sessions are stored oldest first, so visits must not overlap
+            ts = max(ts, ends)
+            if rand() < 0.6:
+                warm_ups.append(from_id(pick(rand, 'Warm-up'), 5 + 5 * int(rand() * 3), ts))
+                ts += 900
+            for _ in range(2 if rand() < 0.35 else 1):
+                duration = 10 + 5 * int((rand() + rand()) * 8)
+                exercise_id = (favourites[int(rand() * len(favourites))]
+                               if rand() < 0.8 else pick(rand, 'Workout'))
+                main.append(from_id(exercise_id, duration, ts))
+                ts += duration * 60
+            if rand() < 0.5:
+                cool_downs.append(from_id(pick(rand, 'Cool-down'), 5 + 5 * int(rand() * 2), ts))
+                ts += 900
+            ends = ts
+        return profile, history, workouts
+
+    def members(self, start, stop):
+        for index in range(start, stop):
+            yield self.member(index)
+
+
+def populate(gym, count, users, workouts, histories, versions=None, start=0):
+    """Generate members start..start+count-1 into the stores; returns totals"""
+    sessions = 0
+    for profile, history, member_workouts in gym.members(start, start + count):
+        regn_id = profile['regn_id']
+        users[regn_id] = profile
+        histories[regn_id] = history
+        workouts[regn_id] = member_workouts
+        if versions is not None:
+            versions[regn_id] = 1
+        sessions += sum(len(s) for s in member_workouts.values())
+    return {'members': count, 'sessions': sessions}
+
+
+def member_line(profile, history, workouts):
+    """One member as an NDJSON line (without the newline)"""
+    return json.dumps({
+        'profile': profile,
+        'weights': [list(segment) for segment in zip(history.dates, history.weights)],
+        'workouts': {category: [[e.exercise, e.duration, e.timestamp] for e in sessions]
+                     for category, sessions in workouts.items()},
+    }, separators=(',', ':'))
+
+
+def _write_part(args):
+    gym, path, start, stop = args
+    sessions = 0
+    partial = path + '.partial'
+    with open(partial, 'w', encoding='utf-8') as f:
+        for profile, history, workouts in gym.members(start, stop):
+            f.write(member_line(profile, history, workouts))
+            f.write('\n')
+            sessions += sum(len(s) for s in workouts.values())
+    os.replace(partial, path)
+    return stop - start, sessions
+
+
+def write_ndjson(gym, count, output_dir, files=1, workers=1):
+    """Write count members to output_dir as members-NNNNN.ndjson files
+
+    Files cover consecutive member ranges and are written by a pool of
+    workers processes when workers > 1. Returns totals.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = max(1, min(files, count))
+    bounds = [count * n // files for n in range(files + 1)]
+    parts = [(gym, os.path.join(output_dir, f'members-{n:05d}.ndjson'), bounds[n], bounds[n + 1])
+             for n in range(files)]
+    if workers > 1 and files > 1:
+        with multiprocessing.Pool(min(workers, files)) as pool:
+            written = pool.map(_write_part, parts)
+    else:
+        written = [_write_part(part) for part in parts]
+    return {'members': sum(m for m, _ in written), 'sessions': sum(s for _, s in written),
+            'files': [path for _, path, _, _ in parts]}
+
+
+def ndjson_paths(path):
+    """An NDJSON file, or the .ndjson files in a directory, in order"""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.ndjson')))
+    return [path]
+
+
+def load_member_lines(lines, users, workouts, histories, versions=None):
+    """Store members from NDJSON lines (see member_line); returns totals"""
+    members = sessions = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        profile = record['profile']
+        regn_id = profile['regn_id']
+        (first_date, first_weight), *rest = record['weights']
+        history = WeightHistory(first_date, first_weight)
+        for effective_date, weight in rest:
+            history.record(effective_date, weight)
+        member_workouts = {
+            category: [WorkoutEntry.from_iso(exercise, duration, timestamp)
+                       for exercise, duration, timestamp in entries]
+            for category, entries in record['workouts'].items()}
+        users[regn_id] = profile
+        histories[regn_id] = history
+        workouts[regn_id] = member_workouts
+        if versions is not None:
+            versions[regn_id] = versions.get(regn_id, 0) + 1
+        members += 1
+        sessions += sum(len(s) for s in member_workouts.values())
+    return {'members': members, 'sessions': sessions}
+
+
+def load_ndjson(path, users, workouts, histories, versions=None):
+    """Load members written by write_ndjson into the stores; returns totals"""
+    totals = {'members': 0, 'sessions': 0}
+    for file_path in ndjson_paths(path):
+        with open(file_path, encoding='utf-8') as f:
+            loaded = load_member_lines(f, users, workouts, histories, versions)
+        totals = {key: totals[key] + loaded[key] for key in totals}
+    return totals
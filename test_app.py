@@ -4,7 +4,13 @@ Unit tests for ACEest Fitness Flask Application
 
 import pytest
 import json
-from app import app, users_data, workouts_data, calculate_bmi, calculate_bmr, calculate_calories
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from app import app, users_data, workouts_data, weight_history, calculate_bmi, calculate_bmr, calculate_calories
 
 @pytest.fixture
 def client():
@@ -17,6 +23,7 @@ def client():
             # Clear test data
             users_data.clear()
             workouts_data.clear()
+            weight_history.clear()
         yield client
 
 @pytest.fixture
@@ -56,6 +63,21 @@ class TestHealthChecks:
         assert 'total_workouts' in data
         assert 'timestamp' in data
 
+    def test_metrics_prometheus(self, client):
+        """Test Prometheus scrapers get per-route counts and latency histograms"""
+        client.get('/health')
+        client.get('/no-such-page')
+        response = client.get('/metrics', headers={
+            'Accept': 'application/openmetrics-text;version=1.0.0;q=0.75,text/plain;version=0.0.4;q=0.5,*/*;q=0.1'})
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert 'http_requests_total{endpoint="health_check",method="GET",status="200"}' in text
+        assert 'http_requests_total{endpoint="unmatched",method="GET",status="404"}' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="health_check",method="GET",le="+Inf"}' in text
+        assert 'http_requests_in_flight{endpoint="metrics"} 1' in text
+        assert 'aceest_members ' in text
+
 class TestCalculations:
     """Test calculation helper functions"""
     
@@ -124,6 +146,23 @@ class TestAuthentication:
         data = json.loads(response.data)
         assert data['success'] is False
     
+    def test_concurrent_duplicate_registration(self, client):
+        """Test racing registrations of one ID have exactly one winner"""
+        user_data = {'name': 'Racer', 'regn_id': 'RACE001', 'age': 30, 'gender': 'F',
+                     'height': 165, 'weight': 60}
+        statuses = []
+        def register():
+            with app.test_client() as racer:
+                statuses.append(racer.post('/register', data=json.dumps(user_data),
+                                           content_type='application/json').status_code)
+        threads = [threading.Thread(target=register) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert sorted(statuses) == [200] + [400] * 7
+    
     def test_register_missing_fields(self, client):
         """Test registration with missing fields"""
         incomplete_data = {
@@ -187,6 +226,88 @@ class TestWorkoutManagement:
         assert data['success'] is True
         assert 'calories' in data
     
+    def test_add_workout_is_logged_durably(self, client, registered_user, tmp_path, monkeypatch):
+        """Test sessions reach the workout log when one is configured"""
+        import app as app_module
+        from workout_log import WorkoutLog
+        log = WorkoutLog(str(tmp_path / 'workouts.db'))
+        monkeypatch.setattr(app_module, 'workout_log', log)
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.post('/api/workout/add',
+                              data=json.dumps({'category': 'Workout', 'exercise': 'Squats',
+                                               'duration': 30}),
+                              content_type='application/json')
+        assert response.status_code == 200
+        response = client.post('/api/workout/add',
+                              data=json.dumps({'category': 'Stretch', 'exercise': 'Squats',
+                                               'duration': 30}),
+                              content_type='application/json')
+        assert response.status_code == 400
+        log.close()
+        
+        sessions = log.sessions(registered_user['regn_id'])
+        assert [(category, entry.exercise) for _, category, entry in sessions] == [('Workout', 'Squats')]
+
+    def test_logged_workouts_survive_restart(self, tmp_path):
+        """Test an app started on an existing workout log serves its sessions"""
+        script = (
+            "import json, app\n"
+            "client = app.app.test_client()\n"
+            "member = {'name': 'R', 'regn_id': 'RESTART1', 'age': 30, 'gender': 'F',"
+            " 'height': 165, 'weight': 60}\n"
+            "client.post('/register', json=member)\n"
+            "if len(__import__('sys').argv) > 1:\n"
+            "    client.post('/api/workout/add', json={'category': 'Workout', 'exercise': 'Squats',"
+            " 'duration': 30})\n"
+            "print(json.dumps(client.get('/api/workout/summary').get_json()))\n"
+            "app.workout_log.close()\n")
+        env = dict(os.environ, WORKOUT_DB_PATH=str(tmp_path / 'workouts.db'))
+        def run(*args):
+            result = subprocess.run([sys.executable, '-c', script, *args], env=env, check=True,
+                                    capture_output=True, text=True, cwd=os.path.dirname(__file__))
+            return json.loads(result.stdout.splitlines()[-1])
+
+        assert run('add')['session_count'] == 1
+        restarted = run()
+        assert restarted['session_count'] == 1
+        assert restarted['categories']['Workout']['sessions'][0]['exercise'] == 'Squats'
+
+    def test_same_stripe_members_share_a_commit(self, client, tmp_path, monkeypatch):
+        """Test a member's wait for the disk does not hold up others on its lock stripe"""
+        import app as app_module
+        from workout_log import WorkoutLog
+        log = WorkoutLog(str(tmp_path / 'workouts.db'), max_delay=0.2)
+        monkeypatch.setattr(app_module, 'workout_log', log)
+        stripe = app_module.member_locks.index('STRIPE0')
+        members = ['STRIPE0'] + [m for m in (f'STRIPE{n}' for n in range(1, 1000))
+                                 if app_module.member_locks.index(m) == stripe][:1]
+        for regn_id in members:
+            client.post('/register', data=json.dumps({'name': regn_id, 'regn_id': regn_id, 'age': 30,
+                                                      'gender': 'F', 'height': 165, 'weight': 60}),
+                        content_type='application/json')
+
+        barrier = threading.Barrier(len(members))
+        statuses = []
+        def add(regn_id):
+            with app.test_client() as member:
+                with member.session_transaction() as sess:
+                    sess['user_id'] = regn_id
+                barrier.wait()
+                statuses.append(member.post('/api/workout/add', data=json.dumps(
+                    {'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                    content_type='application/json').status_code)
+        threads = [threading.Thread(target=add, args=(m,)) for m in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.close()
+
+        assert statuses == [200, 200]
+        assert log.entries == 2 and log.batches == 1
+
     def test_add_workout_invalid_duration(self, client, registered_user):
         """Test adding workout with invalid duration"""
         with client.session_transaction() as sess:
@@ -202,7 +323,32 @@ class TestWorkoutManagement:
                               content_type='application/json')
         
         assert response.status_code == 400
-    
+
+    def test_add_workout_invalid_exercise(self, client, registered_user):
+        """Test non-string and blank exercise names are rejected"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+
+        for exercise in (123, None, '', '   ', ['Squats']):
+            response = client.post('/api/workout/add',
+                                  data=json.dumps({'category': 'Workout', 'exercise': exercise,
+                                                   'duration': 10}),
+                                  content_type='application/json')
+            assert response.status_code == 400
+        assert workouts_data[registered_user['regn_id']]['Workout'] == []
+
+    def test_add_workout_invalid_category(self, client, registered_user):
+        """Test unknown and non-string categories are rejected"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+
+        for category in ('Yoga', ['Workout'], {'name': 'Workout'}, None):
+            response = client.post('/api/workout/add',
+                                  data=json.dumps({'category': category, 'exercise': 'Squats',
+                                                   'duration': 10}),
+                                  content_type='application/json')
+            assert response.status_code == 400
+
     def test_workout_summary(self, client, registered_user):
         """Test workout summary endpoint"""
         with client.session_transaction() as sess:
@@ -224,6 +370,7 @@ class TestWorkoutManagement:
         assert 'total_time' in data
         assert 'total_calories' in data
         assert data['total_time'] == 20
+        assert data['exercises'] == [{'exercise': 'Squats', 'count': 1, 'total_time': 20}]
     
     def test_workout_progress(self, client, registered_user):
         """Test workout progress data endpoint"""
@@ -264,6 +411,18 @@ class TestPages:
         assert response.status_code == 200
         assert b'Workout Plan' in response.data
     
+    def test_workout_plan_api(self, client, registered_user):
+        """Test personalized workout plan API"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.get('/api/workout-plan')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['bucket']['volume_band'] == 'starter'
+        assert len(data['days']) == 7
+        assert data['estimated_weekly_calories'] > 0
+    
     def test_diet_guide_page(self, client, registered_user):
         """Test diet guide page"""
         with client.session_transaction() as sess:
@@ -273,6 +432,23 @@ class TestPages:
         assert response.status_code == 200
         assert b'Diet Guide' in response.data
     
+    def test_diet_plan_api(self, client, registered_user):
+        """Test BMR-driven diet plan API"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Running', 'duration': 70}),
+                   content_type='application/json')
+        
+        response = client.get('/api/diet-plan')
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        workout_per_day = round(calculate_calories('Workout', 70, 70, 'Running') / 7, 1)
+        assert data['workout_calories_per_day'] == workout_per_day
+        assert data['targets']['calories'] == round(1674 * 1.2 + calculate_calories('Workout', 70, 70, 'Running') / 7)
+        assert len(data['meals']) == 4
+    
     def test_404_error(self, client):
         """Test 404 error handler"""
         response = client.get('/nonexistent-page')
@@ -332,5 +508,614 @@ class TestWorkoutCategories:
         data = json.loads(response.data)
         assert data['success'] is True
 
+class TestWeightHistory:
+    """Test weight updates and retroactive calorie derivation"""
+    
+    def test_update_weight(self, client, registered_user):
+        """Test recording a new weight updates the profile"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.post('/api/user/weight',
+                              data=json.dumps({'weight': 65}),
+                              content_type='application/json')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['weight'] == 65
+        assert data['bmi'] == round(calculate_bmi(65, 175), 2)
+        assert data['bmr'] == round(calculate_bmr(65, 175, 25, 'M'), 0)
+        assert len(data['history']) == 1  # same day replaces the registration weight
+    
+    def test_backdated_weight_keeps_current(self, client, registered_user):
+        """Test a back-dated weight extends the timeline without changing today's weight"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        last_month = (date.today() - timedelta(days=30)).isoformat()
+        response = client.post('/api/user/weight',
+                              data=json.dumps({'weight': 80, 'date': last_month}),
+                              content_type='application/json')
+        
+        data = json.loads(response.data)
+        assert data['weight'] == 70
+        assert [h['date'] for h in data['history']] == [last_month, date.today().isoformat()]
+    
+    def test_calories_follow_weight(self, client, registered_user):
+        """Test session calories use the weight in effect on the session date"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        client.post('/api/user/weight',
+                   data=json.dumps({'weight': 80}),
+                   content_type='application/json')
+        
+        response = client.get('/api/workout/summary')
+        data = json.loads(response.data)
+        assert data['total_calories'] == round(calculate_calories('Workout', 30, 80, 'Squats'), 1)
+        assert data['categories']['Workout']['sessions'][0]['calories'] == 210.0
+    
+    def test_update_weight_invalid(self, client, registered_user):
+        """Test invalid weights and future dates are rejected"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        tomorrow = (date.today() + timedelta(days=1)).isoformat()
+        for payload in ({'weight': -5}, {'weight': 70, 'date': tomorrow}, {'date': tomorrow}):
+            response = client.post('/api/user/weight',
+                                  data=json.dumps(payload),
+                                  content_type='application/json')
+            assert response.status_code == 400
+    
+    def test_update_weight_not_finite(self, client, registered_user):
+        """Test nan and inf are rejected and leave the profile usable"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        for weight in ('nan', 'inf', '-inf', 'NaN'):
+            response = client.post('/api/user/weight',
+                                  data=json.dumps({'weight': weight}),
+                                  content_type='application/json')
+            assert response.status_code == 400
+        
+        data = json.loads(client.get('/api/user/weight').data)
+        assert data['weight'] == 70 and len(data['history']) == 1
+        assert client.get('/diet-guide').status_code == 200
+
+class TestWeeklyReports:
+    """Test weekly PDF report jobs"""
+    
+    def wait_for_report(self, client, status_url):
+        """Poll a report job until it finishes"""
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            data = json.loads(client.get(status_url).data)
+            if data['status'] in ('done', 'failed'):
+                return data
+            time.sleep(0.05)
+        raise AssertionError('report did not finish')
+    
+    def test_weekly_report_flow(self, client, registered_user):
+        """Test queueing, polling, downloading and caching a report"""
+        pytest.importorskip('reportlab')
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        
+        response = client.post('/api/reports/weekly')
+        assert response.status_code == 202
+        job = json.loads(response.data)
+        status = self.wait_for_report(client, job['status_url'])
+        assert status['status'] == 'done'
+        
+        response = client.get(status['download_url'])
+        assert response.status_code == 200
+        assert response.mimetype == 'application/pdf'
+        assert response.data.startswith(b'%PDF')
+        
+        # Unchanged data is served from the cache
+        response = client.post('/api/reports/weekly')
+        assert response.status_code == 200
+        assert json.loads(response.data)['job_id'] == job['job_id']
+        
+        # New data invalidates it
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Cool-down', 'exercise': 'Yoga', 'duration': 10}),
+                   content_type='application/json')
+        response = client.post('/api/reports/weekly')
+        assert json.loads(response.data)['job_id'] != job['job_id']
+    
+    def test_report_not_found(self, client, registered_user):
+        """Test unknown report jobs return 404"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        assert client.get('/api/reports/weekly/unknown').status_code == 404
+        assert client.get('/api/reports/weekly/unknown/pdf').status_code == 404
+    
+    def test_report_invalid_week(self, client, registered_user):
+        """Test an invalid week is rejected"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.post('/api/reports/weekly',
+                              data=json.dumps({'week': 'last tuesday'}),
+                              content_type='application/json')
+        assert response.status_code == 400
+
+class TestBackgroundJobs:
+    """Test background job submission and the job status API"""
+    
+    def test_export_job(self, client, registered_user):
+        """Test a workout export runs in the background and reports its result"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        
+        response = client.post('/api/workout/export')
+        assert response.status_code == 202
+        job = json.loads(response.data)
+        assert job['kind'] == 'workout-export'
+        
+        deadline = time.monotonic() + 10
+        while True:
+            status = json.loads(client.get(job['status_url']).data)
+            if status['status'] == 'done' or time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        assert status['status'] == 'done'
+        assert status['result']['rows'] == 1
+        assert 'Squats' in status['result']['csv']
+    
+    def test_job_of_another_member_is_hidden(self, client, registered_user):
+        """Test a member cannot see someone else's job"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        job = json.loads(client.post('/api/workout/export').data)
+        
+        with client.session_transaction() as sess:
+            sess['user_id'] = 'OTHER001'
+        assert client.get(job['status_url']).status_code == 404
+        assert client.get('/api/jobs/unknown').status_code == 404
+
+class TestWorkoutCharts:
+    """Test server-rendered chart images"""
+    
+    def test_chart_png_and_etag(self, client, registered_user):
+        """Test chart rendering, conditional requests and invalidation"""
+        pytest.importorskip('matplotlib')
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.get('/api/workout/chart.png?width=400&height=300')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        etag = response.headers['ETag']
+        
+        response = client.get('/api/workout/chart.png?width=400&height=300',
+                             headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        response = client.get('/api/workout/chart.png?width=400&height=300',
+                             headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+    
+    def test_chart_svg(self, client, registered_user):
+        """Test SVG charts"""
+        pytest.importorskip('matplotlib')
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.get('/api/workout/chart.svg')
+        assert response.status_code == 200
+        assert response.mimetype == 'image/svg+xml'
+    
+    def test_chart_unknown_format(self, client, registered_user):
+        """Test unsupported chart formats return 404"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        assert client.get('/api/workout/chart.gif').status_code == 404
+
+class TestExerciseCatalog:
+    """Test per-exercise MET values and autocomplete"""
+    
+    def test_calories_use_exercise_met(self):
+        """Test catalog exercises override the category MET"""
+        assert calculate_calories('Workout', 30, 70, 'Running') == (9.8 * 3.5 * 70 / 200) * 30
+        assert calculate_calories('Workout', 30, 70, 'running ') == calculate_calories('Workout', 30, 70, 'Running')
+        assert calculate_calories('Workout', 30, 70, 'Unknown Move') == calculate_calories('Workout', 30, 70)
+    
+    def test_add_workout_uses_exercise_met(self, client, registered_user):
+        """Test logged sessions are costed with the exercise MET"""
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        
+        response = client.post('/api/workout/add',
+                              data=json.dumps({'category': 'Cool-down', 'exercise': 'Stretching', 'duration': 20}),
+                              content_type='application/json')
+        
+        data = json.loads(response.data)
+        assert data['calories'] == round(calculate_calories('Cool-down', 20, 70, 'Stretching'), 1)
+    
+    def test_suggest_exercises(self, client):
+        """Test autocomplete matches name and word prefixes"""
+        response = client.get('/api/exercises/suggest?q=PRESS')
+        assert response.status_code == 200
+        names = [s['name'] for s in json.loads(response.data)['suggestions']]
+        assert 'Bench Press' in names
+        assert 'Leg Press' in names
+        
+        response = client.get('/api/exercises/suggest?q=tre&limit=1')
+        data = json.loads(response.data)
+        assert len(data['suggestions']) == 1
+        assert data['suggestions'][0]['name'].startswith('Tre')
+    
+    def test_suggest_empty_query(self, client):
+        """Test an empty query returns no suggestions"""
+        response = client.get('/api/exercises/suggest?q=')
+        assert json.loads(response.data)['suggestions'] == []
+
+class TestAdminProfiling:
+    """Test the admin profile endpoints"""
+    
+    def test_admin_endpoints_need_a_token(self, client, monkeypatch):
+        """Test admin endpoints are hidden without ADMIN_TOKEN and guarded with it"""
+        import app as app_module
+        assert client.get('/admin/profiles').status_code == 404
+        
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        assert client.get('/admin/profiles').status_code == 403
+        response = client.get('/admin/profiles', headers={'X-Admin-Token': 'ops-token'})
+        assert response.status_code == 200
+        assert json.loads(response.data)['enabled'] is False
+    
+    def test_profiled_request_download(self, client, registered_user, monkeypatch):
+        """Test a sampled request can be listed and downloaded"""
+        import app as app_module
+        from profiling import ProfileBuffer, ProfilingMiddleware
+        profiles = ProfileBuffer()
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        monkeypatch.setattr(app_module, 'profiles', profiles)
+        profiler = ProfilingMiddleware(app.wsgi_app, profiles, sample_rate=1.0)
+        monkeypatch.setattr(app_module, 'profiling_middleware', profiler)
+        monkeypatch.setattr(app, 'wsgi_app', profiler)
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.get('/api/workout/summary')
+        
+        admin = {'X-Admin-Token': 'ops-token'}
+        listing = json.loads(client.get('/admin/profiles', headers=admin).data)
+        assert listing['enabled'] is True
+        summary = next(p for p in listing['profiles'] if p['path'] == '/api/workout/summary')
+        assert summary['status'] == 200
+        
+        response = client.get(f"/admin/profiles/{summary['id']}", headers=admin)
+        assert response.status_code == 200
+        assert response.headers['Content-Disposition'].endswith('.prof')
+        response = client.get(f"/admin/profiles/{summary['id']}?format=collapsed", headers=admin)
+        assert response.status_code == 400
+    
+    def test_listing_with_shadowing(self, client, registered_user, monkeypatch):
+        """Test profiling is still reported when shadowing wraps the profiler"""
+        import app as app_module
+        from profiling import ProfileBuffer, ProfilingMiddleware
+        from shadow_traffic import ShadowMiddleware, ShadowTee
+        profiles = ProfileBuffer()
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        monkeypatch.setattr(app_module, 'profiles', profiles)
+        profiler = ProfilingMiddleware(app.wsgi_app, profiles, sample_rate=1.0)
+        monkeypatch.setattr(app_module, 'profiling_middleware', profiler)
+        monkeypatch.setattr(app, 'wsgi_app',
+                            ShadowMiddleware(profiler, ShadowTee('http://127.0.0.1:9'), sample_rate=0))
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.get('/api/workout/summary')
+        
+        listing = json.loads(client.get('/admin/profiles', headers={'X-Admin-Token': 'ops-token'}).data)
+        assert listing['enabled'] is True and listing['sample_rate'] == 1.0
+        assert any(p['path'] == '/api/workout/summary' for p in listing['profiles'])
+
+class TestTracing:
+    """Test request traces at /debug/traces"""
+    
+    def test_summary_trace_shows_stages(self, client, registered_user, monkeypatch):
+        """Test a summary request is traced through its hot sections"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        client.get('/api/workout/summary')
+        client.get('/dashboard')
+        
+        admin = {'X-Admin-Token': 'ops-token'}
+        traces = json.loads(client.get('/debug/traces', headers=admin).data)['traces']
+        dashboard, summary = traces[0], traces[1]
+        assert summary['name'] == 'GET /api/workout/summary'
+        assert summary['attributes']['http.status_code'] == 200
+        names = {s['name'] for s in summary['spans']}
+        assert {'session.load', 'store.workouts', 'store.member', 'aggregate.summary',
+                'aggregate.exercises', 'json.serialize'} <= names
+        assert 'template.render' in {s['name'] for s in dashboard['spans']}
+        
+        response = client.get(f"/debug/traces/{summary['trace_id']}", headers=admin)
+        assert json.loads(response.data)['span_count'] == len(summary['spans'])
+        assert client.get('/debug/traces/0', headers=admin).status_code == 404
+        assert client.get('/debug/traces').status_code == 403
+
+class TestSlowRequestLog:
+    """Test slow requests are logged with their context"""
+    
+    def test_slow_summary_is_logged(self, client, registered_user, monkeypatch, caplog):
+        """Test the log line carries the route, member, history size and stages"""
+        import logging
+        import app as app_module
+        from slow_requests import SlowRequestLog
+        monkeypatch.setattr(app_module, 'slow_request_log', SlowRequestLog(threshold_ms=0.001))
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        caplog.clear()
+        with caplog.at_level(logging.WARNING, logger='aceest.slow_requests'):
+            response = client.get('/api/workout/summary')
+        
+        line = json.loads(caplog.records[-1].getMessage())
+        assert line['route'] == '/api/workout/summary'
+        assert line['status'] == 200
+        assert line['member'] == registered_user['regn_id']
+        assert line['history'] == {'Warm-up': 0, 'Workout': 1, 'Cool-down': 0}
+        assert line['response_bytes'] == len(response.data)
+        assert 'aggregate.summary' in line['stages_ms']
+        assert len(line['trace_id']) == 32
+
+class TestMemoryReport:
+    """Test the admin memory endpoints"""
+    
+    def test_memory_report(self, client, registered_user, monkeypatch):
+        """Test the report covers stores, members and caches"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        for _ in range(3):
+            client.post('/api/workout/add',
+                       data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                       content_type='application/json')
+        
+        response = client.get('/admin/memory?top=1', headers={'X-Admin-Token': 'ops-token'})
+        assert response.status_code == 200
+        report = json.loads(response.data)
+        assert report['members']['heaviest'] == [
+            {'regn_id': 'TEST001', 'sessions': 3, 'bytes': report['members']['heaviest'][0]['bytes']}]
+        assert report['stores']['workouts']['entries'] == 1
+        assert report['shared']['exercise_symbols']['names'] >= 1
+        assert 'entries' in report['caches']['sessions']
+        assert client.get('/admin/memory').status_code == 403
+    
+    def test_memory_snapshots(self, client, monkeypatch):
+        """Test snapshots diff against the previous one until stopped"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        try:
+            first = json.loads(client.post('/admin/memory/snapshot', headers=admin).data)
+            second = json.loads(client.post('/admin/memory/snapshot?top=3', headers=admin).data)
+            assert first['diff'] is None
+            assert second['snapshot'] == 2 and len(second['diff']) <= 3
+        finally:
+            stopped = json.loads(client.delete('/admin/memory/snapshot', headers=admin).data)
+        assert stopped['tracing'] is False
+    
+    def test_memory_rejects_out_of_range_arguments(self, client, monkeypatch):
+        """Test negative or zero sizes are a 400 rather than a failed report"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        for query in ('sample=-1', 'sample=0', 'top=-1'):
+            assert client.get(f'/admin/memory?{query}', headers=admin).status_code == 400
+        for query in ('frames=0', 'frames=65536', 'top=-1'):
+            response = client.post(f'/admin/memory/snapshot?{query}', headers=admin)
+            assert response.status_code == 400
+        assert app_module.memory_snapshots.tracing is False
+
+class TestAdminSessions:
+    """Test revoking a member's sessions"""
+    
+    def test_revoke_member_logs_them_out(self, client, registered_user, monkeypatch):
+        """Test DELETE /admin/sessions/<regn_id> ends the member's sessions"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        assert client.get('/dashboard').status_code == 200
+        
+        response = client.delete('/admin/sessions/TEST001', headers=admin)
+        assert response.status_code == 200
+        # Earlier tests' TEST001 sessions are still in the store, so at least one
+        assert json.loads(response.data)['revoked'] >= 1
+        assert client.get('/dashboard').status_code == 302
+        assert client.delete('/admin/sessions/TEST001').status_code == 403
+
+class TestShardHandoff:
+    """Test members leaving this replica when the ring changes"""
+    
+    def route_here(self, monkeypatch):
+        import app as app_module
+        from sharding import HashRing, ShardRouter
+        router = ShardRouter(app.wsgi_app, HashRing(['here:5000']), 'here:5000', 'shard-secret')
+        monkeypatch.setattr(app_module, 'shard_router', router)
+        return app_module
+    
+    def test_write_during_handoff_is_not_lost(self, client, registered_user, monkeypatch):
+        """Test a write racing the hand-off is refused, not acknowledged and dropped"""
+        from sharding import HashRing
+        app_module = self.route_here(monkeypatch)
+        sent = {}
+        def send(node, lines, admin_token):
+            response = client.post('/api/workout/add',
+                                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                                   content_type='application/json')
+            sent.update(status=response.status_code, lines=lines)
+            return len(lines)
+        monkeypatch.setattr(app_module, 'send_members', send)
+        
+        moved, failed = app_module.hand_off_members(HashRing(['there:5000']))
+        assert moved == {'there:5000': 1} and failed == {}
+        assert sent['status'] == 404
+        assert json.loads(sent['lines'][0])['workouts']['Workout'] == []
+        assert 'TEST001' not in users_data
+    
+    def test_failed_handoff_keeps_members(self, client, registered_user, monkeypatch):
+        """Test members stay here, writable, when their new owner cannot be reached"""
+        from sharding import HashRing
+        app_module = self.route_here(monkeypatch)
+        def send(node, lines, admin_token):
+            raise OSError('connection refused')
+        monkeypatch.setattr(app_module, 'send_members', send)
+        
+        moved, failed = app_module.hand_off_members(HashRing(['there:5000']))
+        assert moved == {} and failed == {'there:5000': 'connection refused'}
+        response = client.post('/api/workout/add',
+                               data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                               content_type='application/json')
+        assert response.status_code == 200
+        assert len(workouts_data['TEST001']['Workout']) == 1
+
+    def test_handoff_moves_logged_sessions(self, client, registered_user, tmp_path, monkeypatch):
+        """Test handed-off sessions leave this replica's log and survive a restart of the new owner"""
+        from sharding import HashRing
+        from workout_log import WorkoutLog
+        app_module = self.route_here(monkeypatch)
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        sender = WorkoutLog(str(tmp_path / 'here.db'))
+        receiver = WorkoutLog(str(tmp_path / 'there.db'))
+        monkeypatch.setattr(app_module, 'workout_log', sender)
+        client.post('/api/workout/add',
+                    data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                    content_type='application/json')
+        def send(node, lines, admin_token):
+            # Play the new owner: same app, its own log
+            monkeypatch.setattr(app_module, 'workout_log', receiver)
+            try:
+                response = client.post('/admin/shards/import', data='\n'.join(lines),
+                                       headers={'X-Admin-Token': admin_token})
+            finally:
+                monkeypatch.setattr(app_module, 'workout_log', sender)
+            assert response.status_code == 200
+            return json.loads(response.data)['members']
+        monkeypatch.setattr(app_module, 'send_members', send)
+        
+        moved, failed = app_module.hand_off_members(HashRing(['there:5000']))
+        assert moved == {'there:5000': 1} and failed == {}
+        sender.close()
+        receiver.close()
+        
+        restarted = {}
+        for name, sessions in (('here.db', 0), ('there.db', 1)):
+            log = WorkoutLog(str(tmp_path / name))
+            assert log.load(restarted) == sessions
+            log.close()
+        assert [e.exercise for e in restarted['TEST001']['Workout']] == ['Squats']
+
+class TestAdminShadow:
+    """Test the shadow traffic report"""
+    
+    def test_shadow_report(self, client, monkeypatch):
+        """Test /admin/shadow reports the tee, or 404 when mirroring is off"""
+        import app as app_module
+        from shadow_traffic import ShadowTee
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        assert client.get('/admin/shadow', headers=admin).status_code == 404
+        
+        monkeypatch.setattr(app_module, 'shadow_tee', ShadowTee('http://127.0.0.1:9'))
+        response = client.get('/admin/shadow?limit=5', headers=admin)
+        assert response.status_code == 200
+        report = json.loads(response.data)
+        assert report['base_url'] == 'http://127.0.0.1:9'
+        assert report['diffs'] == [] and report['dropped'] == 0
+        assert client.get('/admin/shadow?limit=x', headers=admin).status_code == 400
+
+class TestMetricsRecompute:
+    """Test the recompute-metrics job"""
+
+    def test_recompute_restores_figures_and_bumps_versions(self, client, registered_user, monkeypatch):
+        """Test the job rewrites stale BMI/BMR and invalidates cached reports"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        regn_id = registered_user['regn_id']
+        users_data[regn_id]['bmi'] = users_data[regn_id]['bmr'] = 0
+        version = app_module.data_versions.get(regn_id, 0)
+
+        response = client.post('/admin/metrics/recompute', headers=admin)
+        assert response.status_code == 202
+        status_url = json.loads(response.data)['status_url']
+        deadline = time.monotonic() + 10
+        while True:
+            status = json.loads(client.get(status_url, headers=admin).data)
+            if status['status'] == 'done' or time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        assert status['result'] == {'members': 1}
+        assert users_data[regn_id]['bmi'] == round(calculate_bmi(70, 175), 2)
+        assert users_data[regn_id]['bmr'] == round(calculate_bmr(70, 175, 25, 'M'), 0)
+        assert app_module.data_versions[regn_id] == version + 1
+        assert client.get('/admin/jobs/unknown', headers=admin).status_code == 404
+
+class TestNightlyReportJob:
+    """Test the nightly report runs on the serving process's stores"""
+
+    def test_nightly_report_job(self, client, registered_user, monkeypatch, tmp_path):
+        """Test the job summarizes this process's members into NIGHTLY_REPORT_DIR"""
+        import os
+        import app as app_module
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'ops-token')
+        admin = {'X-Admin-Token': 'ops-token'}
+        assert client.post('/admin/nightly-report', headers=admin).status_code == 404
+
+        monkeypatch.setattr(app_module, 'NIGHTLY_REPORT_DIR', str(tmp_path))
+        with client.session_transaction() as sess:
+            sess['user_id'] = registered_user['regn_id']
+        client.post('/api/workout/add',
+                   data=json.dumps({'category': 'Workout', 'exercise': 'Squats', 'duration': 30}),
+                   content_type='application/json')
+        for bad in ({'week': 'yesterday'}, {'workers': 0}, {'chunk_size': 'big'}):
+            response = client.post('/admin/nightly-report', headers=admin,
+                                   data=json.dumps(bad), content_type='application/json')
+            assert response.status_code == 400
+
+        response = client.post('/admin/nightly-report', headers=admin,
+                               data=json.dumps({'week': date.today().isoformat(), 'workers': 2}),
+                               content_type='application/json')
+        assert response.status_code == 202
+        status_url = json.loads(response.data)['status_url']
+        deadline = time.monotonic() + 60
+        while True:
+            status = json.loads(client.get(status_url, headers=admin).data)
+            if status['status'] in ('done', 'failed') or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert status['status'] == 'done', status
+        assert status['result']['members'] == 1 and status['result']['sessions'] == 1
+        assert os.path.dirname(status['result']['output']) == str(tmp_path)
+        assert os.path.exists(os.path.join(status['result']['output'], 'summary.json'))
+
 if __name__ == '__main__':
     pytest.main(['-v', '--cov=app', '--cov-report=html', '--cov-report=term'])
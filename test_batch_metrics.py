@@ -0,0 +1,76 @@
+"""
+Unit tests for the batch health-metrics engine
+"""
+
+import random
+import pytest
+import batch_metrics
+from calculations import calculate_bmi, calculate_bmr
+from weight_history import WeightHistory
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    """Run each test against the NumPy path and the array-module fallback"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(batch_metrics, 'np', None)
+    return request.param
+
+@pytest.fixture
+def columns():
+    """Random member columns, including odd genders"""
+    rng = random.Random(7)
+    rows = batch_metrics.BLOCK_SIZE + 123  # spans more than one block
+    return {
+        'weights': [rng.choice([rng.uniform(35, 160), rng.randint(35, 160)]) for _ in range(rows)],
+        'heights': [rng.uniform(120, 220) for _ in range(rows)],
+        'ages': [rng.randint(10, 95) for _ in range(rows)],
+        'genders': [rng.choice(['M', 'm', 'F', 'f', 'X']) for _ in range(rows)],
+    }
+
+class TestBatchCalculations:
+    """Batch results must be bit-identical to the scalar helpers"""
+    
+    def test_bmi_batch(self, backend, columns):
+        """Test batch BMI matches calculate_bmi"""
+        result = batch_metrics.calculate_bmi_batch(columns['weights'], columns['heights'])
+        expected = [calculate_bmi(w, h) for w, h in zip(columns['weights'], columns['heights'])]
+        assert list(result) == expected
+    
+    def test_bmr_batch(self, backend, columns):
+        """Test batch BMR matches calculate_bmr"""
+        male = batch_metrics.encode_genders(columns['genders'])
+        result = batch_metrics.calculate_bmr_batch(columns['weights'], columns['heights'],
+                                                   columns['ages'], male)
+        expected = [calculate_bmr(*row) for row in zip(columns['weights'], columns['heights'],
+                                                       columns['ages'], columns['genders'])]
+        assert list(result) == expected
+    
+    def test_empty_columns(self, backend):
+        """Test batch functions accept empty input"""
+        assert len(batch_metrics.calculate_bmi_batch([], [])) == 0
+        assert batch_metrics.round_column([], 2) == []
+    
+    def test_round_column_matches_round(self, backend, columns):
+        """Test vectorized rounding matches round(), including values on a half"""
+        values = columns['heights'] + [k / 100 + 0.005 for k in range(1000, 3000)] + [2.5, 3.5, 0.125]
+        for ndigits in (0, 2):
+            assert batch_metrics.round_column(values, ndigits) == [round(v, ndigits) for v in values]
+
+class TestRecomputeAll:
+    """Test the nightly recomputation entry point"""
+    
+    def test_recompute_all_matches_registration(self, backend):
+        """Test recomputed values match what registration would store"""
+        users = {
+            'A1': {'weight': 70.0, 'height': 175.0, 'age': 25, 'gender': 'M'},
+            'B2': {'weight': 60.0, 'height': 165.0, 'age': 30, 'gender': 'F'},
+        }
+        history = WeightHistory('2024-01-01', 70.0)
+        history.calories('Workout', 30, '2024-01-02')
+        
+        assert batch_metrics.recompute_all(users, {'A1': history}) == 2
+        assert users['A1']['bmi'] == round(calculate_bmi(70.0, 175.0), 2)
+        assert users['B2']['bmr'] == round(calculate_bmr(60.0, 165.0, 30, 'F'), 0)
+        assert history._rates == {}
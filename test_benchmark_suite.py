@@ -0,0 +1,63 @@
+"""
+Unit tests for the micro-benchmark suite's baselines and comparison
+"""
+
+import json
+from benchmarks import suite
+
+def results(**medians):
+    return {'machine': suite.machine(),
+            'benchmarks': {name: {'median_s': value, 'min_s': value} for name, value in medians.items()}}
+
+class TestBenchmarkSuite:
+    """Test comparisons, the CLI exit status and history building"""
+
+    def test_compare_flags_regressions(self):
+        """Test cases beyond the tolerance are flagged either way"""
+        baseline = results(a=1.0, b=1.0, c=1.0)
+        current = results(a=1.1, b=1.5, c=0.5, d=2.0)
+        verdicts = {row[0]: row[4] for row in suite.compare(baseline, current, tolerance=0.2)}
+
+        assert verdicts == {'a': 'ok', 'b': 'REGRESSION', 'c': 'faster', 'd': 'new'}
+
+    def test_compare_command_exit_status(self, tmp_path):
+        """Test compare exits non-zero only when something regressed"""
+        baseline, current = tmp_path / 'baseline.json', tmp_path / 'current.json'
+        baseline.write_text(json.dumps(results(a=1.0)))
+        current.write_text(json.dumps(results(a=1.1)))
+        assert suite.main(['compare', '--baseline', str(baseline), '--results', str(current)]) == 0
+
+        current.write_text(json.dumps(results(a=2.0)))
+        assert suite.main(['compare', '--baseline', str(baseline), '--results', str(current)]) == 1
+
+    def test_build_history_mix(self):
+        """Test histories follow the category mix"""
+        workouts, history = suite.build_history(50, 'balanced')
+        assert {c: len(s) for c, s in workouts.items()} == {'Warm-up': 10, 'Workout': 30, 'Cool-down': 10}
+        workouts, _ = suite.build_history(50, 'workout-only')
+        assert len(workouts['Workout']) == 50
+        assert len(history.dates) == 48
+
+    def test_run_a_case(self):
+        """Test a filtered run records timing stats"""
+        run = suite.run(max_sessions=10, name_filter='calculate_bmi', min_time=0, progress=None)
+        stats = run['benchmarks']['calculate_bmi']
+        assert list(run['benchmarks']) == ['calculate_bmi']
+        assert stats['min_s'] <= stats['median_s'] and stats['rounds'] >= 3
+
+    def test_filter_skips_fixtures(self, monkeypatch):
+        """Test filtered-out sizes never build a history or touch the app"""
+        def fail(*args):
+            raise AssertionError('history built for a filtered-out case')
+        monkeypatch.setattr(suite, 'build_history', fail)
+        assert [case[0] for case in suite.cases(1000, name_filter='calculate_bmr')] == ['calculate_bmr']
+
+    def test_route_case_restores_app_state(self):
+        """Test a route case leaves the member store and instrumentation as it found them"""
+        import app as app_module
+        before = (app_module.tracer.sample_rate, app_module.slow_request_log.threshold_ms)
+        run = suite.run(max_sessions=10, name_filter='GET /api/workout/summary[10-balanced]',
+                        min_time=0, progress=None)
+        assert list(run['benchmarks']) == ['GET /api/workout/summary[10-balanced]']
+        assert (app_module.tracer.sample_rate, app_module.slow_request_log.threshold_ms) == before
+        assert 'BENCH' not in app_module.users_data and 'BENCH' not in app_module.workouts_data
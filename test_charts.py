@@ -0,0 +1,63 @@
+"""
+Unit tests for server-side progress charts
+"""
+
+import pytest
+from charts import ChartCache, ChartRenderer, clamp_size
+
+pytest.importorskip('matplotlib')
+
+TOTALS = {'Warm-up': 10, 'Workout': 30, 'Cool-down': 0}
+
+class TestChartRenderer:
+    """Test rendering onto the reusable figure"""
+    
+    def test_render_formats(self):
+        """Test PNG and SVG output"""
+        renderer = ChartRenderer()
+        assert renderer.render(TOTALS, 'png').startswith(b'\x89PNG')
+        assert b'<svg' in renderer.render(TOTALS, 'svg')
+    
+    def test_figure_is_reused(self):
+        """Test repeated renders redraw the same figure and axes"""
+        renderer = ChartRenderer()
+        figure = renderer.figure
+        for totals in (TOTALS, {'Warm-up': 0, 'Workout': 0, 'Cool-down': 0}, TOTALS):
+            renderer.render(totals, 'png', (400, 300))
+        
+        assert renderer.figure is figure
+        assert len(figure.axes) == 2
+        assert len(renderer.bar_ax.patches) == 3
+    
+    def test_clamp_size(self):
+        """Test sizes are clamped to the supported range"""
+        assert clamp_size(10, 99999) == (400, 1200)
+        assert clamp_size(640, 480) == (640, 480)
+
+class TestChartCache:
+    """Test the versioned chart cache"""
+    
+    def test_cache_by_version(self):
+        """Test unchanged charts are served from the cache"""
+        cache = ChartCache(size=8)
+        loads = []
+        def load():
+            loads.append(1)
+            return TOTALS
+        
+        first = cache.get('A', 1, 'png', (400, 300), load)
+        assert cache.get('A', 1, 'png', (400, 300), load) is first
+        cache.get('A', 2, 'png', (400, 300), load)
+        cache.get('A', 2, 'svg', (400, 300), load)
+        
+        assert len(loads) == 3
+        assert (cache.hits, cache.misses) == (1, 3)
+    
+    def test_cache_is_bounded(self):
+        """Test the least recently used chart is evicted"""
+        cache = ChartCache(size=2)
+        for version in range(3):
+            cache.get('A', version, 'png', (400, 250), lambda: TOTALS)
+        
+        cache.get('A', 0, 'png', (400, 250), lambda: TOTALS)
+        assert cache.misses == 4
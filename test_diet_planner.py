@@ -0,0 +1,47 @@
+"""
+Unit tests for the diet-guide engine
+"""
+
+import diet_planner
+from diet_planner import daily_targets, diet_plan_for_member, round_target, solve_meal_plan
+
+class TestDailyTargets:
+    """Test calorie and macro targets"""
+    
+    def test_targets_from_bmr_and_workouts(self):
+        """Test targets add workout calories to the sedentary BMR"""
+        targets = daily_targets(1600, 22, workout_kcal_per_day=200)
+        assert targets['goal'] == 'Maintenance'
+        assert targets['calories'] == round(1600 * diet_planner.SEDENTARY_FACTOR + 200)
+        assert targets['protein_g'] == round(targets['calories'] * 0.30 / 4)
+    
+    def test_goal_adjustments(self):
+        """Test BMI-driven goals and the calorie floor"""
+        assert daily_targets(1600, 27)['goal'] == 'Weight Loss'
+        assert daily_targets(1600, 17)['goal'] == 'Muscle Gain'
+        assert daily_targets(900, 35)['calories'] == diet_planner.MIN_DAILY_KCAL
+    
+    def test_round_target(self):
+        """Test targets are rounded to the cache step"""
+        assert round_target(2024) == 2000
+        assert round_target(2026) == 2050
+
+class TestMealPlans:
+    """Test solved meal plans and their cache"""
+    
+    def test_plan_near_target(self):
+        """Test a solved plan covers every meal and lands near the target"""
+        plan = solve_meal_plan(2200, 'Maintenance')
+        assert [m['meal'] for m in plan['meals']] == list(diet_planner.MEAL_SHARES)
+        assert abs(plan['totals']['calories'] - 2200) <= 2200 * 0.05
+    
+    def test_members_share_cached_plan(self):
+        """Test members with nearby targets hit the same cached plan"""
+        solve_meal_plan.cache_clear()
+        a = diet_plan_for_member({'bmr': 1500, 'bmi': 22}, 10)
+        b = diet_plan_for_member({'bmr': 1510, 'bmi': 23}, 0)
+        
+        assert a['meals'] is b['meals']
+        assert a['targets'] != b['targets']
+        info = solve_meal_plan.cache_info()
+        assert (info.hits, info.misses, info.maxsize) == (1, 1, diet_planner.PLAN_CACHE_SIZE)
@@ -0,0 +1,40 @@
+"""
+Unit tests for the exercise catalog and prefix index
+"""
+
+from exercise_catalog import ExerciseCatalog, load_catalog, normalize_name
+
+class TestExerciseCatalog:
+    """Test catalog lookups and autocomplete"""
+    
+    def test_normalize_name(self):
+        """Test names are case- and whitespace-insensitive"""
+        assert normalize_name('  Bench   PRESS ') == 'bench press'
+    
+    def test_lookup_and_duplicates(self):
+        """Test lookups normalize names and the first duplicate wins"""
+        catalog = ExerciseCatalog([('Running', 'Workout', 9.8), ('running', 'Warm-up', 7.0)])
+        
+        assert len(catalog) == 1
+        assert catalog.met_for(' RUNNING') == 9.8
+        assert catalog.met_for('Swimming') is None
+        assert catalog.met_for(None) is None
+    
+    def test_suggest_word_prefixes(self):
+        """Test suggestions match any word start, without duplicates"""
+        catalog = ExerciseCatalog([('Bench Press', 'Workout', 6.0),
+                                   ('Press Press', 'Workout', 5.0),
+                                   ('Expressive Dance', 'Workout', 4.0)])
+        
+        names = [e.name for e in catalog.suggest('pre')]
+        assert sorted(names) == ['Bench Press', 'Press Press']
+        assert len(catalog.suggest('pre', limit=1)) == 1
+        assert catalog.suggest('   ') == []
+    
+    def test_load_catalog(self, tmp_path):
+        """Test loading a catalog from CSV"""
+        path = tmp_path / 'exercises.csv'
+        path.write_text('name,category,met\nRowing,Workout,7.0\n', encoding='utf-8')
+        
+        catalog = load_catalog(str(path))
+        assert catalog.get('rowing').to_dict() == {'name': 'Rowing', 'category': 'Workout', 'met': 7.0}
@@ -0,0 +1,71 @@
+"""
+Unit tests for the exercise symbol table and integer grouping
+"""
+
+import pickle
+import threading
+from calculations import exercise_totals
+from exercise_catalog import ExerciseCatalog
+from exercise_symbols import ExerciseSymbols
+from workout_entry import WorkoutEntry
+
+class TestExerciseSymbols:
+    """Test encoding, display names and grouping by ID"""
+
+    def test_catalog_ids_are_positions(self):
+        """Test catalog exercises are encoded to their catalog positions"""
+        catalog = ExerciseCatalog([('Running', 'Workout', 9.8), ('Squats', 'Workout', 5.0)])
+        table = ExerciseSymbols(catalog)
+
+        assert table.encode('  SQUATS ') == 1
+        assert table.catalog_position(1) == 1
+        assert table.name(1) == 'Squats'
+
+    def test_variants_share_an_id(self):
+        """Test custom names are normalized and keep their first spelling"""
+        table = ExerciseSymbols(ExerciseCatalog([('Running', 'Workout', 9.8)]))
+
+        first = table.encode('Kettlebell   Swing')
+        assert table.encode('kettlebell swing') == first == 1
+        assert table.name(first) == 'Kettlebell Swing'
+        assert table.catalog_position(first) is None
+        assert table.lookup('Box jumps') is None
+        assert len(table) == 2
+
+    def test_concurrent_encoding(self):
+        """Test racing threads agree on one ID per name"""
+        table = ExerciseSymbols(ExerciseCatalog())
+        barrier = threading.Barrier(8)
+        seen = [None] * 8
+        def encode(n):
+            barrier.wait()
+            seen[n] = [table.encode(f'Drill {k}') for k in range(200)]
+        threads = [threading.Thread(target=encode, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert all(ids == seen[0] for ids in seen)
+        assert sorted(seen[0]) == list(range(200))
+
+    def test_entries_pickle_by_name(self):
+        """Test sessions survive a trip to another process's symbol table"""
+        entry = WorkoutEntry('Sled push', 10, 0)
+        state = pickle.dumps(entry)
+
+        assert b'Sled push' in state
+        assert pickle.loads(state) == entry
+
+    def test_exercise_totals(self):
+        """Test sessions are grouped across categories and spellings"""
+        workouts = {
+            'Warm-up': [WorkoutEntry('jumping jacks', 5, 0)],
+            'Workout': [WorkoutEntry('Squats', 30, 0), WorkoutEntry('squats ', 20, 60),
+                        WorkoutEntry('Jumping  Jacks', 10, 120)],
+        }
+
+        assert exercise_totals(workouts) == [
+            {'exercise': 'Squats', 'count': 2, 'total_time': 50},
+            {'exercise': 'Jumping Jacks', 'count': 2, 'total_time': 15},
+        ]
@@ -0,0 +1,121 @@
+"""
+Unit tests for the background job queue
+"""
+
+import threading
+import pytest
+from exports import workouts_csv
+from jobs import PRIORITY_HIGH, PRIORITY_LOW, JobQueue, JobQueueFull, UnknownJobKind
+
+@pytest.fixture
+def queue():
+    """Single-worker queue with a fast retry backoff"""
+    queue = JobQueue(workers=1, queue_limit=8, max_attempts=3, backoff=0.01)
+    yield queue
+    queue.shutdown()
+
+class TestJobQueue:
+    """Test priorities, bounds, retries and job records"""
+
+    def test_runs_job_and_stores_result(self, queue):
+        """Test a job's result ends up in its stored record"""
+        queue.register('double', lambda payload: payload * 2)
+        job = queue.submit('double', 21, member_id='M1')
+        assert queue.join(timeout=5)
+        record = queue.get(job.id)
+        assert record['status'] == 'done'
+        assert record['result'] == 42
+        assert record['member'] == 'M1'
+        assert record['attempts'] == 1
+
+    def test_unknown_kind(self, queue):
+        """Test submitting a kind without a handler fails fast"""
+        with pytest.raises(UnknownJobKind):
+            queue.submit('missing')
+
+    def test_priorities(self, queue):
+        """Test higher priority jobs run first, equal ones in order"""
+        gate = threading.Event()
+        order = []
+        queue.register('gate', lambda payload: gate.wait(5))
+        queue.register('record', order.append)
+        queue.submit('gate')
+        for name, priority in [('low', PRIORITY_LOW), ('normal-1', 5), ('high', PRIORITY_HIGH),
+                               ('normal-2', 5)]:
+            queue.submit('record', name, priority=priority)
+        gate.set()
+        assert queue.join(timeout=5)
+        assert order == ['high', 'normal-1', 'normal-2', 'low']
+
+    def test_bounded(self, queue):
+        """Test submissions beyond the limit are rejected"""
+        gate = threading.Event()
+        queue.register('gate', lambda payload: gate.wait(5))
+        for _ in range(8):
+            queue.submit('gate')
+        with pytest.raises(JobQueueFull):
+            queue.submit('gate')
+        gate.set()
+        assert queue.join(timeout=5)
+        queue.submit('gate')
+
+    def test_retries_with_backoff(self, queue):
+        """Test a failing job is retried until it succeeds"""
+        calls = []
+        def flaky(payload):
+            calls.append(payload)
+            if len(calls) < 3:
+                raise ConnectionError('storage unavailable')
+            return 'ok'
+        queue.register('flaky', flaky)
+        job = queue.submit('flaky', 'x')
+        assert queue.join(timeout=5)
+        record = queue.get(job.id)
+        assert record['status'] == 'done'
+        assert record['attempts'] == 3
+        assert 'error' not in record
+
+    def test_gives_up_after_max_attempts(self, queue):
+        """Test the last error is kept once attempts run out"""
+        def broken(payload):
+            raise ValueError('bad payload')
+        queue.register('broken', broken, max_attempts=2)
+        job = queue.submit('broken')
+        assert queue.join(timeout=5)
+        record = queue.get(job.id)
+        assert record['status'] == 'failed'
+        assert record['attempts'] == 2
+        assert record['error'] == 'ValueError: bad payload'
+
+    def test_finished_records_are_bounded(self):
+        """Test only the most recent finished jobs are kept"""
+        queue = JobQueue(workers=1, history=3)
+        queue.register('noop', lambda payload: None)
+        jobs = [queue.submit('noop') for _ in range(5)]
+        assert queue.join(timeout=5)
+        queue.shutdown()
+        assert [queue.get(job.id) is not None for job in jobs] == [False, False, True, True, True]
+
+    def test_process_executor(self):
+        """Test handlers can run on a process pool"""
+        queue = JobQueue(workers=1, executor='process')
+        queue.register('export', workouts_csv)
+        job = queue.submit('export', {'regn_id': 'M1', 'sessions': [
+            {'category': 'Workout', 'exercise': 'Squats', 'duration': 30, 'calories': 210.0,
+             'date': '2024-06-25', 'timestamp': '2024-06-25T07:00:00'}]})
+        assert queue.join(timeout=60)
+        queue.shutdown()
+        record = queue.get(job.id)
+        assert record['status'] == 'done'
+        assert record['result']['filename'] == 'workouts-M1.csv'
+        assert record['result']['csv'].splitlines()[1].startswith('2024-06-25,')
+
+    def test_in_process_handlers_skip_the_pool(self):
+        """Test handlers that need this process's state run on the worker thread"""
+        queue = JobQueue(workers=1, executor='process')
+        seen = []
+        queue.register('local', lambda payload: seen.append(payload) or len(seen), in_process=True)
+        job = queue.submit('local', 'state')
+        assert queue.join(timeout=10)
+        queue.shutdown()
+        assert seen == ['state'] and queue.get(job.id)['result'] == 1
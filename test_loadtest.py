@@ -0,0 +1,78 @@
+"""
+Unit tests for the load-test harness
+"""
+
+import threading
+import pytest
+from werkzeug.serving import make_server
+import app as app_module
+from benchmarks import loadtest
+
+class TestLoadTest:
+    """Test traffic planning, replay and the report"""
+
+    def test_plan_is_seeded_and_follows_the_mix(self):
+        """Test plans repeat for a seed and split arrivals by the mix"""
+        curve = loadtest.class_curve([12])
+        first = loadtest.plan(20, 50, loadtest.DEFAULT_MIX, curve, seed=3)
+        second = loadtest.plan(20, 50, loadtest.DEFAULT_MIX, curve, seed=3)
+
+        assert [(c.at, c.label, c.member) for c in first] == [(c.at, c.label, c.member) for c in second]
+        assert [c.at for c in first] == sorted(c.at for c in first)
+        labels = [c.label for c in first]
+        assert labels.count('GET /dashboard') == labels.count('GET /api/workout/summary')
+        assert labels.count('POST /api/workout/add') > labels.count('POST /login')
+
+    def test_workouts_peak_at_class_time(self):
+        """Test class-driven arrivals cluster around the class hour"""
+        # Opening hours 6-22, so 14:00 is the middle of the run
+        calls = loadtest.plan(100, 20, {'workout': 1}, loadtest.class_curve([14]), seed=1)
+        near_class = sum(45 <= c.at < 55 for c in calls)
+        at_opening = sum(0 <= c.at < 10 for c in calls)
+        assert near_class > 3 * at_opening
+
+    def test_cookie_header(self):
+        """Test Set-Cookie values replace cookies of the same name"""
+        cookie = loadtest.cookie_header(['session=abc; HttpOnly; Path=/', 'theme=dark'])
+        assert cookie == 'session=abc; theme=dark'
+        assert loadtest.cookie_header(['session=xyz; Path=/'], cookie) == 'session=xyz; theme=dark'
+
+    def test_in_process_rejects_gevent(self, capsys):
+        """Test models only gunicorn can run are refused without --gunicorn"""
+        with pytest.raises(SystemExit) as exit_info:
+            loadtest.main(['--models', 'sync,gevent'])
+        assert exit_info.value.code == 2
+        assert 'gevent needs --gunicorn' in capsys.readouterr().err
+
+    def test_replay_in_process(self):
+        """Test a short in-process run completes every request without errors"""
+        members = loadtest.Members(prefix='TLT')
+        target = loadtest.AppTarget(app_module.app)
+        loadtest.register_members(target, members, 5)
+        calls = loadtest.plan(0.5, 40, loadtest.DEFAULT_MIX, loadtest.flat_curve, seed=2)
+        records = loadtest.replay(target, members, calls, workers=4)
+        report = loadtest.summarize(records, 0.5)
+
+        assert len(members.registered) >= 5
+        assert report['requests'] == len(calls)
+        assert report['errors'] == 0, report['error_samples']
+        assert report['p50_ms'] <= report['p99_ms'] <= report['max_ms']
+        assert set(report['routes']) <= {c.label for c in calls}
+
+    def test_replay_over_http(self):
+        """Test the HTTP target against a local server keeps sessions"""
+        server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            target = loadtest.HTTPTarget(f'http://127.0.0.1:{server.server_port}')
+            members = loadtest.Members(prefix='TLH')
+            loadtest.register_members(target, members, 2)
+            calls = [loadtest.Call(0, 'dashboard', 'GET', '/api/workout/summary', member=1),
+                     loadtest.Call(0, 'workout', 'POST', '/api/workout/add',
+                                   {'category': 'Workout', 'exercise': 'Squats', 'duration': 30}, 0)]
+            report = loadtest.summarize(loadtest.replay(target, members, calls, workers=2), 0.1)
+        finally:
+            server.shutdown()
+
+        assert report['requests'] == 2 and report['errors'] == 0, report['error_samples']
@@ -0,0 +1,95 @@
+"""
+Unit tests for the lock-striped member store
+"""
+
+import threading
+from member_store import LockStripes, Member, ShardedStore
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    def worker(index):
+        barrier.wait()
+        target(index)
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+class TestShardedStore:
+    """Test dict behaviour, atomic inserts and shared member locks"""
+
+    def test_dict_operations(self):
+        """Test the store behaves like a dict across shards"""
+        store = ShardedStore(LockStripes(4))
+        for i in range(20):
+            store[f'M{i}'] = i
+
+        assert len(store) == 20
+        assert 'M3' in store and 'M99' not in store
+        assert store['M3'] == 3 and store.get('M99', 'x') == 'x'
+        assert sorted(store) == sorted(f'M{i}' for i in range(20))
+        assert sorted(store.values()) == list(range(20))
+        assert dict(store.items())['M7'] == 7
+        assert store.pop('M7') == 7 and 'M7' not in store
+        del store['M8']
+        assert len(store) == 18
+        store.clear()
+        assert len(store) == 0
+
+    def test_insert_if_absent(self):
+        """Test only the first insert for a key wins"""
+        store = ShardedStore(LockStripes(4))
+        assert store.insert_if_absent('M1', 'first')
+        assert not store.insert_if_absent('M1', 'second')
+        assert store['M1'] == 'first'
+
+    def test_concurrent_registration_has_one_winner(self):
+        """Test racing inserts of the same key never both succeed"""
+        store = ShardedStore(LockStripes(8))
+        winners = []
+        run_threads(16, lambda i: store.insert_if_absent('M1', i) and winners.append(i))
+
+        assert len(winners) == 1
+        assert store['M1'] == winners[0]
+
+    def test_member_lock_spans_stores(self):
+        """Test stores on one set of stripes share the member's lock"""
+        stripes = LockStripes(8)
+        users, versions = ShardedStore(stripes), ShardedStore(stripes)
+        users['M1'] = {'sessions': []}
+
+        def add_sessions(index):
+            for n in range(500):
+                with stripes.lock_for('M1'):
+                    users['M1']['sessions'].append((index, n))
+                    versions['M1'] = versions.get('M1', 0) + 1
+        run_threads(8, add_sessions)
+
+        assert len(users['M1']['sessions']) == 4000
+        assert versions['M1'] == 4000
+
+class TestMember:
+    """Test the typed member record"""
+
+    PROFILE = {'name': 'Test User', 'regn_id': 'TEST001', 'age': 25, 'gender': 'M',
+               'height': 175.0, 'weight': 70.0, 'bmi': 22.86, 'bmr': 1674.0,
+               'registered_date': '2024-06-01T09:00:00'}
+
+    def test_round_trip(self):
+        """Test a stored profile converts to a Member and back unchanged"""
+        member = Member.from_dict(self.PROFILE)
+        assert member.name == 'Test User' and member.weight == 70.0
+        assert member.to_dict() == self.PROFILE
+
+    def test_get_mirrors_dict(self):
+        """Test get() behaves like dict.get for profile consumers"""
+        member = Member.from_dict(dict(self.PROFILE, bmi=None))
+        assert member.get('weight', 70) == 70.0
+        assert member.get('bmi', 22) == 22
+        assert member.get('unknown', 'x') == 'x'
+
+    def test_slotted(self):
+        """Test members carry no per-instance dict"""
+        member = Member.from_dict(self.PROFILE)
+        assert not hasattr(member, '__dict__')
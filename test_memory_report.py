@@ -0,0 +1,89 @@
+"""
+Unit tests for memory accounting
+"""
+
+import random
+import sys
+from member_store import LockStripes, ShardedStore
+from memory_report import TracemallocSnapshots, deep_sizeof, estimate_store, member_report
+from weight_history import WeightHistory
+from workout_entry import WorkoutEntry
+
+def gym(members, sessions_for):
+    stripes = LockStripes(4)
+    users, workouts, histories = ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes)
+    for n in range(members):
+        member_id = f'M{n:04d}'
+        users[member_id] = {'name': f'Member {n}', 'weight': 70.0}
+        histories[member_id] = WeightHistory('2024-01-01', 70.0)
+        workouts[member_id] = {'Warm-up': [], 'Cool-down': [],
+                               'Workout': [WorkoutEntry('Squats', 30, k * 60)
+                                           for k in range(sessions_for(n))]}
+    return users, workouts, histories
+
+class TestMemoryReport:
+    """Test deep sizing, sampled estimates and snapshot diffs"""
+
+    def test_deep_sizeof_counts_shared_objects_once(self):
+        """Test containers, slots and shared references are handled"""
+        name = 'x' * 1000
+        assert deep_sizeof([name, name]) == sys.getsizeof([name, name]) + sys.getsizeof(name)
+
+        entry = WorkoutEntry('Squats', 30, 10 ** 9)
+        assert deep_sizeof(entry) > sys.getsizeof(entry)
+        seen = set()
+        deep_sizeof(name, seen)
+        assert deep_sizeof([name], seen) == sys.getsizeof([name])
+
+    def test_store_estimate_from_a_sample(self):
+        """Test a sampled estimate is close for uniform entries"""
+        users, _, _ = gym(400, lambda n: 0)
+        exact = estimate_store(users, sample_size=1000)
+        sampled = estimate_store(users, sample_size=50, rng=random.Random(1))
+
+        assert exact['sampled'] == exact['entries'] == 400
+        assert sampled['sampled'] == 50
+        assert abs(sampled['estimated_bytes'] - exact['estimated_bytes']) < 0.1 * exact['estimated_bytes']
+
+    def test_heaviest_members(self):
+        """Test members are ranked by sessions and measured exactly"""
+        users, workouts, histories = gym(200, lambda n: 500 if n == 7 else n % 5)
+        report = member_report(users, workouts, histories, top=3, sample_size=50,
+                               rng=random.Random(2))
+
+        assert report['count'] == 200 and report['sampled'] == 50
+        heaviest = report['heaviest'][0]
+        assert heaviest['regn_id'] == 'M0007' and heaviest['sessions'] == 500
+        assert heaviest['bytes'] > report['heaviest'][1]['bytes']
+        assert 40 <= report['bytes_per_session'] <= 200
+        assert report['estimated_bytes'] > heaviest['bytes']
+
+    def test_snapshot_diff(self):
+        """Test the second snapshot reports what was allocated in between"""
+        snapshots = TracemallocSnapshots()
+        try:
+            assert snapshots.snapshot()['diff'] is None
+            kept = [bytearray(1000) for _ in range(2000)]
+            diff = snapshots.snapshot(top=5)['diff']
+            assert any('test_memory_report.py' in row['location'] and row['size_diff_bytes'] > 1000000
+                       for row in diff)
+            del kept
+        finally:
+            snapshots.stop()
+        assert not snapshots.tracing
+
+    def test_snapshot_frames(self):
+        """Test frames > 1 reports whole tracebacks and the limit in effect"""
+        def allocate():
+            return [bytearray(1000) for _ in range(2000)]
+        snapshots = TracemallocSnapshots()
+        try:
+            assert snapshots.snapshot(frames=5)['frames'] == 5
+            kept = allocate()
+            report = snapshots.snapshot(top=5, frames=1)
+            assert report['frames'] == 5  # already tracing with 5
+            row = next(row for row in report['diff'] if row['size_diff_bytes'] > 1000000)
+            assert len(row['traceback']) > 1
+            del kept
+        finally:
+            snapshots.stop()
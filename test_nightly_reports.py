@@ -0,0 +1,124 @@
+"""
+Unit tests for the nightly gym-wide report job
+"""
+
+import json
+import os
+from datetime import date
+import pytest
+import nightly_reports
+from nightly_reports import CHECKPOINT_FILE, SUMMARY_FILE, chunk_path, run_nightly_job
+from weight_history import WeightHistory
+from workout_entry import WorkoutEntry
+
+WEEK_DAY = date(2024, 6, 27)
+
+def make_member(regn_id, weight=70.0):
+    return {'regn_id': regn_id, 'name': f'Member {regn_id}', 'weight': weight}
+
+def session(exercise, duration, day):
+    return WorkoutEntry.from_iso(exercise, duration, f'{day}T07:00:00')
+
+@pytest.fixture
+def stores():
+    """Ten members, each with one session this week and one the week before"""
+    users, workouts, histories = {}, {}, {}
+    for i in range(10):
+        regn_id = f'M{i:03d}'
+        users[regn_id] = make_member(regn_id)
+        workouts[regn_id] = {
+            'Warm-up': [],
+            'Workout': [session('Running', 30, '2024-06-17'), session('Running', 30, '2024-06-25')],
+            'Cool-down': [],
+        }
+        histories[regn_id] = WeightHistory('2024-06-01', 70.0)
+    return users, workouts, histories
+
+def read_chunks(output_dir, count):
+    lines = []
+    for index in range(count):
+        with open(chunk_path(output_dir, index), encoding='utf-8') as f:
+            lines.extend(json.loads(line) for line in f)
+    return lines
+
+class TestNightlyJob:
+    """Test chunked summaries, totals and resuming"""
+
+    def test_writes_member_summaries_for_the_week(self, stores, tmp_path):
+        """Test every member gets one line covering only the requested week"""
+        summary = run_nightly_job(*stores, str(tmp_path), WEEK_DAY, workers=1, chunk_size=4)
+        assert summary['week_start'] == '2024-06-24'
+        assert summary['week_end'] == '2024-06-30'
+        assert len(summary['chunks']) == 3
+        members = read_chunks(str(tmp_path), 3)
+        assert [m['regn_id'] for m in members] == sorted(stores[0])
+        assert all(m['session_count'] == 1 and m['total_time'] == 30 for m in members)
+        assert summary['totals']['members'] == 10
+        assert summary['totals']['sessions'] == 10
+        assert summary['totals']['total_calories'] == round(sum(m['total_calories'] for m in members), 1)
+        with open(os.path.join(tmp_path, SUMMARY_FILE), encoding='utf-8') as f:
+            assert json.load(f) == summary
+
+    def test_pool_matches_single_process(self, stores, tmp_path):
+        """Test the pool produces the same output as running inline"""
+        inline = run_nightly_job(*stores, str(tmp_path / 'inline'), WEEK_DAY, workers=1, chunk_size=3)
+        pooled = run_nightly_job(*stores, str(tmp_path / 'pool'), WEEK_DAY, workers=2, chunk_size=3)
+        assert pooled['totals'] == inline['totals']
+        assert read_chunks(str(tmp_path / 'pool'), 4) == read_chunks(str(tmp_path / 'inline'), 4)
+
+    def test_resumes_from_checkpoint(self, stores, tmp_path, monkeypatch):
+        """Test a crashed run only redoes the chunks it had not finished"""
+        original = nightly_reports._process_chunk
+        def crash_on_third(task, inputs=None):
+            if task[0] == 2:
+                raise RuntimeError('worker died')
+            return original(task, inputs)
+        monkeypatch.setattr(nightly_reports, '_process_chunk', crash_on_third)
+        with pytest.raises(RuntimeError):
+            run_nightly_job(*stores, str(tmp_path), WEEK_DAY, workers=1, chunk_size=4)
+        with open(os.path.join(tmp_path, CHECKPOINT_FILE), encoding='utf-8') as f:
+            assert sorted(json.load(f)['completed']) == ['0', '1']
+
+        processed = []
+        def record(task, inputs=None):
+            processed.append(task[0])
+            return original(task, inputs)
+        monkeypatch.setattr(nightly_reports, '_process_chunk', record)
+        summary = run_nightly_job(*stores, str(tmp_path), WEEK_DAY, workers=1, chunk_size=4)
+        assert processed == [2]
+        assert summary['totals']['members'] == 10
+
+    def test_overlapping_inline_runs(self, stores, tmp_path):
+        """Test a run finishing while another is part way through leaves it its inputs"""
+        finished = []
+        def run_other_week(done, total):
+            if done == 1:
+                finished.append(run_nightly_job(*stores, str(tmp_path / 'other'), date(2024, 6, 18),
+                                                workers=1, chunk_size=4))
+        summary = run_nightly_job(*stores, str(tmp_path / 'this'), WEEK_DAY, workers=1, chunk_size=4,
+                                  progress=run_other_week)
+        assert summary['totals']['members'] == finished[0]['totals']['members'] == 10
+
+    def test_different_input_starts_over(self, stores, tmp_path):
+        """Test a checkpoint for another week or member set is not reused"""
+        run_nightly_job(*stores, str(tmp_path), WEEK_DAY, workers=1, chunk_size=4)
+        users, workouts, histories = stores
+        for regn_id in list(users)[:7]:
+            del users[regn_id]
+        summary = run_nightly_job(users, workouts, histories, str(tmp_path), WEEK_DAY,
+                                  workers=1, chunk_size=4)
+        assert summary['totals']['members'] == 3
+        assert not os.path.exists(chunk_path(str(tmp_path), 1))
+
+        summary = run_nightly_job(users, workouts, histories, str(tmp_path), date(2024, 6, 18),
+                                  workers=1, chunk_size=4)
+        assert summary['week_start'] == '2024-06-17'
+        assert summary['totals']['sessions'] == 3
+
+    def test_uses_weight_in_effect(self, stores, tmp_path):
+        """Test calories follow the weight history, not the current weight"""
+        users, workouts, histories = stores
+        histories['M000'].record('2024-06-25', 100.0)
+        run_nightly_job(users, workouts, histories, str(tmp_path), WEEK_DAY, workers=1, chunk_size=10)
+        members = {m['regn_id']: m for m in read_chunks(str(tmp_path), 1)}
+        assert members['M000']['total_calories'] > members['M001']['total_calories']
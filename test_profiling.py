@@ -0,0 +1,88 @@
+"""
+Unit tests for sampled request profiling
+"""
+
+import pstats
+import time
+import pytest
+from profiling import ProfileBuffer, ProfilingMiddleware, sign_debug_token, verify_debug_token
+
+def busy_work():
+    total = 0
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+def wsgi_app(environ, start_response):
+    busy_work()
+    start_response('201 Created', [('Content-Type', 'text/plain')])
+    return [b'ok']
+
+def call(app, headers=None):
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/workout/summary'}
+    environ.update(headers or {})
+    statuses = []
+    body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    return statuses[0], b''.join(body)
+
+class TestProfiling:
+    """Test sampling, signed tokens and profile output"""
+
+    def test_cprofile_output_loads_in_pstats(self, tmp_path):
+        """Test a cProfile profile downloads in the .prof format"""
+        profiles = ProfileBuffer()
+        app = ProfilingMiddleware(wsgi_app, profiles, sample_rate=1.0, mode='cprofile')
+
+        assert call(app) == ('201 Created', b'ok')
+        profile = profiles.recent()[0]
+        assert profile.to_dict()['status'] == 201
+        assert profile.to_dict()['path'] == '/api/workout/summary'
+        path = tmp_path / 'profile.prof'
+        path.write_bytes(profile.pstats_bytes())
+        names = {func[2] for func in pstats.Stats(str(path)).stats}
+        assert 'busy_work' in names
+
+    def test_sampled_stacks_are_collapsed(self):
+        """Test the sampling profiler produces flamegraph lines"""
+        profiles = ProfileBuffer()
+        app = ProfilingMiddleware(wsgi_app, profiles, sample_rate=1.0, mode='sample', interval_ms=1)
+        call(app)
+
+        lines = profiles.recent()[0].collapsed().splitlines()
+        assert lines
+        assert any('test_profiling.py:busy_work' in line for line in lines)
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) >= 1 and ';' in stack
+
+    def test_signed_header_forces_a_profile(self):
+        """Test only requests with a valid, unexpired token are profiled"""
+        profiles = ProfileBuffer()
+        app = ProfilingMiddleware(wsgi_app, profiles, sample_rate=0, secret='s3cret')
+        call(app)
+        call(app, {'HTTP_X_DEBUG_PROFILE': sign_debug_token('other', time.time() + 60)})
+        call(app, {'HTTP_X_DEBUG_PROFILE': sign_debug_token('s3cret', time.time() - 1)})
+        assert profiles.recent() == []
+
+        call(app, {'HTTP_X_DEBUG_PROFILE': sign_debug_token('s3cret', time.time() + 60)})
+        assert len(profiles.recent()) == 1
+
+    def test_verify_rejects_garbage(self):
+        """Test malformed tokens are rejected"""
+        assert not verify_debug_token('s3cret', 'not-a-token')
+        assert not verify_debug_token('s3cret', '')
+
+    def test_ring_buffer_keeps_the_newest(self):
+        """Test only the last N profiles are kept"""
+        profiles = ProfileBuffer(capacity=2)
+        app = ProfilingMiddleware(lambda e, s: (s('200 OK', []), [b''])[1], profiles, sample_rate=1.0)
+        for _ in range(3):
+            call(app)
+
+        assert [p.id for p in profiles.recent()] == [3, 2]
+        assert profiles.get(1) is None
+
+    def test_unknown_mode(self):
+        """Test a misconfigured mode fails at startup"""
+        with pytest.raises(ValueError):
+            ProfilingMiddleware(wsgi_app, ProfileBuffer(), mode='perf')
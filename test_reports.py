@@ -0,0 +1,93 @@
+"""
+Unit tests for weekly PDF reports
+"""
+
+import threading
+from datetime import date
+import pytest
+from reports import ReportQueueFull, ReportService, render_weekly_report, week_bounds
+
+pytest.importorskip('reportlab')
+
+REPORT_DATA = {
+    'user': {'name': 'Test User', 'regn_id': 'TEST001', 'age': 25, 'gender': 'M',
+             'height': 175.0, 'weight': 70.0, 'bmi': 22.86, 'bmr': 1674.0},
+    'week_start': '2024-06-24',
+    'week_end': '2024-06-30',
+    'sessions': [{'category': 'Workout', 'exercise': 'Squats', 'duration': 30,
+                  'calories': 183.8, 'date': '2024-06-25'}],
+}
+
+@pytest.fixture
+def service():
+    """Report service with a single pool worker"""
+    service = ReportService(max_workers=1, queue_limit=4, cache_size=2)
+    yield service
+    service.shutdown()
+
+class TestWeeklyReports:
+    """Test report rendering, queueing and caching"""
+    
+    def test_week_bounds(self):
+        """Test weeks run Monday to Sunday"""
+        assert week_bounds(date(2024, 6, 27)) == (date(2024, 6, 24), date(2024, 6, 30))
+        assert week_bounds(date(2024, 6, 24)) == (date(2024, 6, 24), date(2024, 6, 30))
+    
+    def test_render_weekly_report(self):
+        """Test rendering produces a PDF"""
+        assert render_weekly_report(REPORT_DATA).startswith(b'%PDF')
+    
+    def test_markup_in_profile_is_escaped(self):
+        """Test names with markup characters render as text"""
+        for name in ('<b', 'A & B', '</para>'):
+            data = dict(REPORT_DATA, user=dict(REPORT_DATA['user'], name=name, regn_id=name))
+            assert render_weekly_report(data).startswith(b'%PDF')
+    
+    def test_request_runs_on_pool_and_caches(self, service):
+        """Test a report renders in the pool and the same key reuses the job"""
+        calls = []
+        def build():
+            calls.append(1)
+            return REPORT_DATA
+        
+        job = service.request('TEST001', '2024-06-24', 1, build)
+        assert job.future.result(timeout=60).startswith(b'%PDF')
+        assert job.status == 'done'
+        assert service.request('TEST001', '2024-06-24', 1, build) is job
+        assert len(calls) == 1
+        
+        newer = service.request('TEST001', '2024-06-24', 2, build)
+        assert newer is not job
+        assert service.get(job.id) is job
+    
+    def test_cache_is_bounded(self, service):
+        """Test the least recently used report is evicted"""
+        first = service.request('A', '2024-06-24', 0, lambda: REPORT_DATA)
+        service.request('B', '2024-06-24', 0, lambda: REPORT_DATA)
+        service.request('C', '2024-06-24', 0, lambda: REPORT_DATA)
+        
+        assert service.get(first.id) is None
+    
+    def test_queue_limit(self):
+        """Test requests beyond the queue limit are rejected"""
+        service = ReportService(max_workers=1, queue_limit=0)
+        with pytest.raises(ReportQueueFull):
+            service.request('TEST001', '2024-06-24', 0, lambda: REPORT_DATA)
+    
+    def test_building_data_does_not_block_other_members(self, service):
+        """Test a slow build for one member leaves other members' requests free"""
+        started, release = threading.Event(), threading.Event()
+        def slow_build():
+            started.set()
+            release.wait(10)
+            return REPORT_DATA
+        slow = threading.Thread(target=service.request, args=('A', '2024-06-24', 0, slow_build))
+        slow.start()
+        assert started.wait(10)
+        other = threading.Thread(target=service.request, args=('B', '2024-06-24', 0, lambda: REPORT_DATA))
+        other.start()
+        other.join(5)
+        blocked = other.is_alive()
+        release.set()
+        slow.join(10)
+        assert not blocked
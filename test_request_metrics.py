@@ -0,0 +1,71 @@
+"""
+Unit tests for per-route request metrics
+"""
+
+import json
+import os
+import threading
+from request_metrics import RequestMetrics
+
+def record(metrics, endpoint, status=200, seconds=0.02, method='GET'):
+    started = metrics.begin(endpoint)
+    metrics.finish(endpoint, method, status, started - seconds)
+
+class TestRequestMetrics:
+    """Test counters, histograms, gauges and multiprocess merging"""
+
+    def test_histogram_and_status_counts(self):
+        """Test latencies land in cumulative buckets and statuses are split"""
+        metrics = RequestMetrics(buckets=(0.01, 0.1), multiprocess_dir=None)
+        record(metrics, 'index', seconds=0.005)
+        record(metrics, 'index', seconds=0.05)
+        record(metrics, 'index', status=404, seconds=0.5)
+
+        text = metrics.render()
+        assert 'http_requests_total{endpoint="index",method="GET",status="200"} 2' in text
+        assert 'http_requests_total{endpoint="index",method="GET",status="404"} 1' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="index",method="GET",le="0.01"} 1' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="index",method="GET",le="0.1"} 2' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="index",method="GET",le="+Inf"} 3' in text
+        assert 'http_request_duration_seconds_count{endpoint="index",method="GET"} 3' in text
+        assert 'http_requests_in_flight{endpoint="index"} 0' in text
+
+    def test_in_flight_gauge(self):
+        """Test begun requests count as in flight until finished"""
+        metrics = RequestMetrics(multiprocess_dir=None)
+        started = metrics.begin('summary')
+
+        assert metrics.snapshot().in_flight == {'summary': 1}
+        metrics.finish('summary', 'GET', 200, started)
+        assert metrics.snapshot().in_flight == {'summary': 0}
+
+    def test_threads_are_summed(self):
+        """Test every thread's shard is counted, including exited threads"""
+        metrics = RequestMetrics(multiprocess_dir=None)
+        def work():
+            for _ in range(100):
+                record(metrics, 'add_workout', method='POST')
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        total = metrics.snapshot()
+        assert total.statuses == {('add_workout', 'POST', 200): 800}
+        assert sum(total.latencies[('add_workout', 'POST')][:-1]) == 800
+
+    def test_multiprocess_merge(self, tmp_path):
+        """Test a scrape merges every worker's snapshot, dropping dead workers' gauges"""
+        metrics = RequestMetrics(multiprocess_dir=str(tmp_path))
+        record(metrics, 'index')
+        dead = {'pid': 2 ** 22 + 1, 'buckets': list(metrics.buckets),
+                'statuses': [['index', 'GET', 200, 4]],
+                'latencies': [['index', 'GET', [4] + [0] * len(metrics.buckets) + [0.004]]],
+                'in_flight': [['index', 3]]}
+        (tmp_path / 'metrics-dead.json').write_text(json.dumps(dead))
+
+        total = metrics.collect()
+        assert total.statuses == {('index', 'GET', 200): 5}
+        assert total.in_flight == {'index': 0}
+        assert os.path.exists(tmp_path / f'metrics-{os.getpid()}.json')
@@ -0,0 +1,148 @@
+"""
+Unit tests for server-side sessions
+"""
+
+import time
+import pytest
+from flask import Flask, session
+import session_store
+from session_store import MemorySessionBackend, SQLiteSessionBackend, ServerSideSessionInterface
+
+def make_app(interface):
+    """Minimal app that logs members in and out"""
+    app = Flask(__name__)
+    app.session_interface = interface
+
+    @app.route('/login/<user_id>')
+    def login(user_id):
+        session['user_id'] = user_id
+        return 'ok'
+
+    @app.route('/whoami')
+    def whoami():
+        return session.get('user_id', 'guest')
+
+    @app.route('/logout')
+    def logout():
+        session.clear()
+        return 'bye'
+
+    return app
+
+def session_cookie(client):
+    cookie = client.get_cookie('session')
+    return cookie.value if cookie else None
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    """Each test runs against both backends"""
+    if request.param == 'memory':
+        return MemorySessionBackend()
+    return SQLiteSessionBackend(str(tmp_path / 'sessions.db'))
+
+class TestServerSideSessions:
+    """Test opaque cookies, caching and revocation"""
+
+    def test_cookie_is_opaque(self, backend):
+        """Test the cookie carries an id, not the session data"""
+        client = make_app(ServerSideSessionInterface(backend)).test_client()
+        assert client.get('/whoami').text == 'guest'
+        assert session_cookie(client) is None  # empty sessions are not stored
+
+        client.get('/login/M001')
+        sid = session_cookie(client)
+        assert 'M001' not in sid and len(sid) >= 32
+        assert client.get('/whoami').text == 'M001'
+        assert backend.get(sid) == {'user_id': 'M001'}
+
+    def test_hits_are_served_from_cache(self, backend):
+        """Test repeated requests do not reach the backend"""
+        interface = ServerSideSessionInterface(backend)
+        client = make_app(interface).test_client()
+        client.get('/login/M001')
+        for _ in range(5):
+            client.get('/whoami')
+        assert interface.hits == 5
+
+    def test_logout_revokes(self, backend):
+        """Test a logged out session id cannot be replayed"""
+        client = make_app(ServerSideSessionInterface(backend)).test_client()
+        client.get('/login/M001')
+        sid = session_cookie(client)
+        client.get('/logout')
+        assert backend.get(sid) is None
+
+        client.set_cookie('session', sid)
+        assert client.get('/whoami').text == 'guest'
+
+    def test_id_rotates_when_member_changes(self, backend):
+        """Test logging in as someone else issues a new session id"""
+        client = make_app(ServerSideSessionInterface(backend)).test_client()
+        client.get('/login/M001')
+        first = session_cookie(client)
+        client.get('/login/M002')
+        assert session_cookie(client) != first
+        assert backend.get(first) is None
+
+    def test_revoke_member_across_workers(self, tmp_path):
+        """Test revoking on one worker reaches another once its cache expires"""
+        path = str(tmp_path / 'sessions.db')
+        worker_a = ServerSideSessionInterface(SQLiteSessionBackend(path), cache_ttl=0)
+        worker_b = ServerSideSessionInterface(SQLiteSessionBackend(path), cache_ttl=0)
+        client = make_app(worker_a).test_client()
+        client.get('/login/M001')
+        sid = session_cookie(client)
+
+        other = make_app(worker_b).test_client()
+        other.set_cookie('session', sid)
+        assert other.get('/whoami').text == 'M001'
+        assert worker_a.revoke_member('M001') == 1
+        assert other.get('/whoami').text == 'guest'
+
+    def test_cache_is_bounded(self):
+        """Test the least recently used session leaves the cache"""
+        interface = ServerSideSessionInterface(MemorySessionBackend(), cache_size=2)
+        app = make_app(interface)
+        for user in ('M1', 'M2', 'M3'):
+            app.test_client().get(f'/login/{user}')
+        assert len(interface._cache) == 2
+
+
+class TestExpiry:
+    """Test expired sessions leave the backend"""
+
+    def test_saves_purge_expired_sessions(self, backend):
+        """Test a save after the purge interval removes expired sessions"""
+        backend.set('stale', {'user_id': 'M000'}, time.time() - 1)
+        interface = ServerSideSessionInterface(backend, purge_interval=3600)
+        make_app(interface).test_client().get('/login/M001')
+        assert backend.sessions_for('M000') == ['stale']  # not due yet
+
+        interface._next_purge = 0
+        make_app(interface).test_client().get('/login/M002')
+        assert backend.sessions_for('M000') == []
+        assert len(backend.sessions_for('M002')) == 1
+
+class TestCreateSessionInterface:
+    """Test the backend chosen from the environment"""
+
+    def test_memory_backend_for_one_worker(self, monkeypatch):
+        """Test a single worker keeps sessions in memory"""
+        monkeypatch.setattr(session_store, 'SESSION_DB_PATH', None)
+        monkeypatch.setattr(session_store, 'WEB_CONCURRENCY', 1)
+        interface = session_store.create_session_interface()
+        assert isinstance(interface.backend, MemorySessionBackend)
+
+    def test_memory_backend_refused_for_several_workers(self, monkeypatch):
+        """Test several workers without SESSION_DB_PATH fail at startup"""
+        monkeypatch.setattr(session_store, 'SESSION_DB_PATH', None)
+        monkeypatch.setattr(session_store, 'WEB_CONCURRENCY', 4)
+        with pytest.raises(RuntimeError, match='SESSION_DB_PATH'):
+            session_store.create_session_interface()
+
+    def test_sqlite_backend_for_several_workers(self, monkeypatch, tmp_path):
+        """Test several workers share the SQLite file"""
+        monkeypatch.setattr(session_store, 'SESSION_DB_PATH', str(tmp_path / 'sessions.db'))
+        monkeypatch.setattr(session_store, 'WEB_CONCURRENCY', 4)
+        interface = session_store.create_session_interface()
+        assert isinstance(interface.backend, SQLiteSessionBackend)
@@ -0,0 +1,118 @@
+"""
+Unit tests for the shadow traffic tee, against a local stand-in shadow
+"""
+
+import json
+import threading
+import time
+import pytest
+from werkzeug.serving import make_server
+from werkzeug.test import Client
+from werkzeug.wrappers import Request, Response
+from shadow_traffic import ShadowMiddleware, ShadowTee, differences
+
+def production(environ, start_response):
+    """A stand-in production app"""
+    request = Request(environ)
+    if request.path == '/login':
+        response = Response(json.dumps({'success': True}), content_type='application/json')
+        response.set_cookie('session', 'prod-' + request.get_json()['regn_id'])
+    elif request.path == '/api/workout/summary':
+        response = Response(json.dumps({'session_count': 1, 'timestamp': 'prod'}),
+                            content_type='application/json')
+    else:
+        response = Response(b'plain', content_type='text/plain')
+    return response(environ, start_response)
+
+class StandInShadow:
+    """A shadow server recording what it receives"""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.seen = []
+        self.server = make_server('127.0.0.1', 0, self.wsgi, threaded=True)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def wsgi(self, environ, start_response):
+        request = Request(environ)
+        self.seen.append((request.method, request.full_path.rstrip('?'), request.cookies.get('session'),
+                          request.headers.get('X-Aceest-Shadow'), request.get_data()))
+        time.sleep(self.delay)
+        if request.path == '/login':
+            response = Response(json.dumps({'success': True}), content_type='application/json')
+            response.set_cookie('session', 'shadow-' + request.get_json()['regn_id'])
+        elif request.path == '/api/workout/summary':
+            response = Response(json.dumps({'session_count': 2, 'timestamp': 'shadow'}),
+                                content_type='application/json')
+        else:
+            response = Response(b'plain', content_type='text/plain')
+        return response(environ, start_response)
+
+@pytest.fixture
+def shadow():
+    stand_in = StandInShadow()
+    yield stand_in
+    stand_in.server.shutdown()
+
+def request(client, *args, **kwargs):
+    response = client.open(*args, **kwargs)
+    response.close()
+    return response
+
+class TestShadowTraffic:
+    """Test mirroring, comparison, cookie translation and dropping"""
+
+    def test_differences(self):
+        """Test nested JSON differences are reported by path, skipping ignored fields"""
+        found = differences({'a': {'b': [1, 2]}, 'c': 1, 't': 1}, {'a': {'b': [1, 3]}, 'd': 2, 't': 2},
+                            ignore={'t'})
+        assert found == [{'path': 'a.b[1]', 'primary': 2, 'shadow': 3},
+                         {'path': 'c', 'primary': 1, 'shadow': '<missing>'},
+                         {'path': 'd', 'primary': '<missing>', 'shadow': 2}]
+
+    def test_mirrors_selected_requests_and_records_diffs(self, shadow):
+        """Test matching paths are replayed, compared and mismatches kept"""
+        tee = ShadowTee(shadow.url)
+        client = Client(ShadowMiddleware(production, tee, paths=('/login', '/api/workout/')))
+        request(client, '/login', method='POST', json={'regn_id': 'M1'})
+        request(client, '/api/workout/summary?week=1', headers={'Cookie': 'session=prod-M1'})
+        request(client, '/api/workout/export', method='POST', data=b'x')
+        request(client, '/health')
+        tee.flush()
+
+        assert [(method, path) for method, path, *_ in shadow.seen] == [
+            ('POST', '/login'), ('GET', '/api/workout/summary?week=1'), ('POST', '/api/workout/export')]
+        # The shadow got its own session cookie back, and the body was forwarded
+        assert shadow.seen[1][2] == 'shadow-M1'
+        assert shadow.seen[2][3] == '1' and shadow.seen[2][4] == b'x'
+        stats = tee.stats()
+        assert (stats['mirrored'], stats['matched'], stats['mismatched'], stats['dropped']) == (3, 2, 1, 0)
+        assert stats['latency_ms']['window'] == 3
+        diff, = tee.recent_diffs()
+        assert diff['target'] == '/api/workout/summary?week=1'
+        assert diff['differences'] == [{'path': 'session_count', 'primary': 1, 'shadow': 2}]
+
+    def test_full_queue_drops_without_slowing_production(self):
+        """Test a slow shadow fills the queue and copies are dropped, not waited on"""
+        slow = StandInShadow(delay=0.3)
+        try:
+            tee = ShadowTee(slow.url, queue_size=2)
+            client = Client(ShadowMiddleware(production, tee))
+            started = time.perf_counter()
+            for _ in range(20):
+                request(client, '/api/workout/summary')
+            elapsed = time.perf_counter() - started
+        finally:
+            slow.server.shutdown()
+
+        assert elapsed < 0.3
+        assert tee.dropped >= 15
+
+    def test_unreachable_shadow_counts_failures(self):
+        """Test a shadow that cannot be reached is counted, not raised"""
+        tee = ShadowTee('http://127.0.0.1:9', timeout=0.5)
+        client = Client(ShadowMiddleware(production, tee))
+        assert request(client, '/api/workout/summary').status_code == 200
+        tee.flush()
+        assert tee.failed == 1 and tee.mirrored == 0 and tee.last_error
@@ -0,0 +1,201 @@
+"""
+Unit tests for member sharding, including a ring of local app processes
+"""
+
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from collections import Counter
+import pytest
+from sharding import HashRing, ShardRouter, hop_header, moved_keys, nginx_config, request_member
+
+SERVE = ("import os, app; from werkzeug.serving import run_simple; "
+         "run_simple('127.0.0.1', int(os.environ['PORT']), app.app, threaded=True)")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def call(node, method, path, body=None, cookie=None, headers=None):
+    host, port = node.rsplit(':', 1)
+    connection = http.client.HTTPConnection(host, int(port), timeout=10)
+    try:
+        headers = dict(headers or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        if cookie:
+            headers['Cookie'] = cookie
+        connection.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = connection.getresponse()
+        data = response.read()
+        cookies = [c.split(';', 1)[0] for c in response.headers.get_all('Set-Cookie') or []]
+        return response.status, json.loads(data) if data.startswith(b'{') else None, cookies
+    finally:
+        connection.close()
+
+def start_node(node, peers):
+    env = dict(os.environ, PORT=node.rsplit(':', 1)[1], SHARD_PEERS=','.join(peers),
+               SHARD_SELF=node, SHARD_SECRET='shard-secret', ADMIN_TOKEN='ops-token')
+    process = subprocess.Popen([sys.executable, '-c', SERVE], env=env, cwd=os.path.dirname(__file__),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if call(node, 'GET', '/health')[0] == 200:
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{node} did not start')
+
+class TestHashRing:
+    """Test placement, balance and movement on the ring"""
+
+    def test_placement_matches_ketama_points(self):
+        """Test points are crc32 of host, NUL, port and the previous point"""
+        ring = HashRing(['10.0.0.1:5000'])
+        base = zlib.crc32(b'10.0.0.1\x005000')
+        first = zlib.crc32((0).to_bytes(4, 'little'), base)
+        assert first in ring._hashes and len(ring._hashes) == 160
+        assert HashRing([]).owner('M1') is None
+
+    def test_balance_and_minimal_movement(self):
+        """Test members spread evenly and scaling moves only the changed share"""
+        nodes = [f'aceest-fitness-{n}.aceest-fitness:5000' for n in range(3)]
+        keys = [f'M{n:05d}' for n in range(30000)]
+        ring = HashRing(nodes)
+        shares = Counter(ring.owner(k) for k in keys)
+        assert set(shares) == set(nodes)
+        assert max(shares.values()) < 1.3 * min(shares.values())
+
+        grown = HashRing(nodes + ['aceest-fitness-3.aceest-fitness:5000'])
+        moves = moved_keys(ring, grown, keys)
+        assert {after for _, after in moves.values()} == {'aceest-fitness-3.aceest-fitness:5000'}
+        assert 0.15 * len(keys) < len(moves) < 0.35 * len(keys)
+
+        shrunk = HashRing(nodes[:2])
+        moves = moved_keys(ring, shrunk, keys)
+        assert {before for before, _ in moves.values()} == {nodes[2]}
+        assert len(moves) == shares[nodes[2]]
+
+    def test_request_member(self):
+        """Test the member comes from a login body first, then the cookie"""
+        body = json.dumps({'regn_id': 'M2'}).encode()
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/login', 'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body), 'HTTP_COOKIE': 'aceest_member=M1'}
+        assert request_member(environ) == ('M2', True)
+        assert environ['wsgi.input'].read() == body
+        assert request_member({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/dashboard',
+                               'HTTP_COOKIE': 'aceest_member=M1'}) == ('M1', False)
+        assert request_member({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/'}) == (None, False)
+
+    def test_nginx_config(self):
+        """Test the generated upstream hashes on the member cookie over every replica"""
+        config = nginx_config(['a:5000', 'b:5000'])
+        assert 'hash $aceest_shard_key consistent;' in config
+        assert 'server a:5000;' in config and 'server b:5000;' in config
+
+class TestShardRouter:
+    """Test which requests the router serves locally"""
+
+    def router(self):
+        served, forwarded = [], []
+        def local(environ, start_response):
+            served.append(environ.get('HTTP_X_ACEEST_FORWARDED_BY'))
+            start_response('200 OK', [])
+            return [b'here']
+        router = ShardRouter(local, HashRing(['a:5000', 'b:5000']), 'a:5000', 'shard-secret')
+        router.forward = lambda node, environ, start_response: forwarded.append(node) or [b'there']
+        member = next(f'M{n}' for n in range(100) if router.ring.owner(f'M{n}') == 'b:5000')
+        return router, member, served, forwarded
+
+    def environ(self, member, hop=None):
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/workout/summary', 'QUERY_STRING': '',
+                   'HTTP_COOKIE': f'aceest_member={member}', 'wsgi.input': io.BytesIO()}
+        if hop is not None:
+            environ['HTTP_X_ACEEST_FORWARDED_BY'] = hop
+        return environ
+
+    def test_signed_hop_is_served_here(self):
+        """Test a request a peer forwarded is served even if this ring disagrees"""
+        router, member, served, forwarded = self.router()
+        hop = hop_header('shard-secret', 'b:5000', 'GET', '/api/workout/summary')
+        router(self.environ(member, hop), lambda status, headers: None)
+        assert served == [None] and forwarded == []
+
+    def test_forged_hop_is_routed(self):
+        """Test a client's hop header cannot make a replica serve another's member"""
+        router, member, served, forwarded = self.router()
+        for hop in ('b:5000', hop_header('wrong-secret', 'b:5000', 'GET', '/api/workout/summary'),
+                    hop_header('shard-secret', 'b:5000', 'POST', '/api/workout/add'),
+                    hop_header('shard-secret', 'b:5000', 'GET', '/api/workout/summary', now=time.time() - 600)):
+            router(self.environ(member, hop), lambda status, headers: None)
+        assert served == [] and forwarded == ['b:5000'] * 4
+
+    def test_secret_is_required(self):
+        """Test sharding cannot be enabled without a secret to sign hops"""
+        with pytest.raises(ValueError, match='SHARD_SECRET'):
+            ShardRouter(None, HashRing(['a:5000']), 'a:5000', '')
+
+class TestShardedReplicas:
+    """Test member routing across separate app processes"""
+
+    @pytest.fixture
+    def cluster(self):
+        processes = []
+        nodes = [f'127.0.0.1:{free_port()}' for _ in range(4)]
+        def start(node, peers):
+            processes.append(start_node(node, peers))
+        yield nodes, start
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    def test_members_follow_the_ring(self, cluster):
+        """Test any replica serves any member and scaling out hands members off"""
+        nodes, start = cluster
+        peers = nodes[:3]
+        for node in peers:
+            start(node, peers)
+        members = [f'SH{n:03d}' for n in range(24)]
+        for n, regn_id in enumerate(members):
+            status, _, cookies = call(peers[n % 3], 'POST', '/register', {
+                'name': 'Member', 'regn_id': regn_id, 'age': 30, 'gender': 'F',
+                'height': 165, 'weight': 60})
+            assert status == 200 and any(c.startswith('aceest_member=') for c in cookies)
+            cookie = '; '.join(cookies)
+            status, _, _ = call(peers[(n + 1) % 3], 'POST', '/api/workout/add',
+                                {'category': 'Workout', 'exercise': 'Squats', 'duration': 30}, cookie)
+            assert status == 200
+            status, summary, _ = call(peers[(n + 2) % 3], 'GET', '/api/workout/summary', cookie=cookie)
+            assert status == 200 and summary['session_count'] == 1
+
+        admin = {'X-Admin-Token': 'ops-token'}
+        views = [call(node, 'GET', '/admin/shards', headers=admin)[1] for node in peers]
+        assert sum(view['members'] for view in views) == len(members)
+        assert all(view['misplaced'] == 0 for view in views)
+        assert sum(view['forwarded'] for view in views) > 0
+
+        start(nodes[3], nodes)
+        handed_off = 0
+        for node in peers:
+            status, view, _ = call(node, 'POST', '/admin/shards', {'peers': nodes}, headers=admin)
+            assert status == 200 and view['handoff']['failed'] == {}
+            handed_off += sum(view['handoff']['moved'].values())
+        expected = moved_keys(HashRing(peers), HashRing(nodes), members)
+        assert handed_off == len(expected) > 0
+        assert call(nodes[3], 'GET', '/admin/shards', headers=admin)[1]['members'] == len(expected)
+
+        for n, regn_id in enumerate(members):
+            status, _, cookies = call(nodes[n % 4], 'POST', '/login', {'regn_id': regn_id})
+            assert status == 200
+            status, summary, _ = call(nodes[(n + 1) % 4], 'GET', '/api/workout/summary',
+                                      cookie='; '.join(cookies))
+            assert status == 200 and summary['session_count'] == 1
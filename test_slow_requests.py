@@ -0,0 +1,48 @@
+"""
+Unit tests for the slow-request log
+"""
+
+import json
+import logging
+from slow_requests import RateLimiter, SlowRequestLog
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+class TestSlowRequestLog:
+    """Test the threshold, rate limiting and the logged line"""
+
+    def test_threshold(self):
+        """Test requests at or over the threshold are slow, and 0 disables"""
+        log = SlowRequestLog(threshold_ms=500)
+        assert log.is_slow(500) and not log.is_slow(499.9)
+        assert not SlowRequestLog(threshold_ms=0).is_slow(10000)
+
+    def test_token_bucket(self):
+        """Test bursts are capped and tokens refill over time"""
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=3, clock=clock)
+        assert [limiter.allow() for _ in range(4)] == [True, True, True, False]
+        clock.now = 0.5
+        assert limiter.allow() and not limiter.allow()
+        clock.now = 100
+        assert sum(limiter.allow() for _ in range(10)) == 3
+
+    def test_suppressed_lines_are_reported(self, caplog):
+        """Test the next line written counts the lines dropped before it"""
+        clock = FakeClock()
+        log = SlowRequestLog(threshold_ms=100, rate=1, burst=1, clock=clock)
+        with caplog.at_level(logging.WARNING, logger='aceest.slow_requests'):
+            for n in range(4):
+                log.record({'route': '/api/workout/summary', 'n': n})
+            clock.now = 1
+            log.record({'route': '/api/workout/summary', 'n': 4})
+
+        lines = [json.loads(r.getMessage()) for r in caplog.records]
+        assert [line['n'] for line in lines] == [0, 4]
+        assert lines[0]['suppressed'] == 0 and lines[1]['suppressed'] == 3
+        assert lines[1]['event'] == 'slow_request' and lines[1]['threshold_ms'] == 100
+        assert (log.logged, log.suppressed) == (2, 3)
@@ -0,0 +1,95 @@
+"""
+Unit tests for the synthetic data generator
+"""
+
+import multiprocessing
+from datetime import date
+from exercise_catalog import catalog
+from member_store import LockStripes, ShardedStore
+import synthetic_data
+from synthetic_data import CUSTOM_EXERCISES, SyntheticGym, load_ndjson, populate, write_ndjson
+from workout_entry import day_number
+
+def stores():
+    stripes = LockStripes(4)
+    return ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes), ShardedStore(stripes)
+
+def snapshot(member):
+    profile, history, workouts = member
+    return (profile, history.timeline(),
+            {category: [e.to_dict() for e in sessions] for category, sessions in workouts.items()})
+
+class TestSyntheticData:
+    """Test determinism, distributions and the NDJSON round trip"""
+
+    def test_members_depend_only_on_seed_and_index(self):
+        """Test a member is the same whichever range generates it"""
+        gym = SyntheticGym(seed=7)
+        assert snapshot(gym.member(42)) == snapshot(list(gym.members(40, 43))[2])
+        assert snapshot(SyntheticGym(seed=7).member(42)) == snapshot(gym.member(42))
+        assert snapshot(SyntheticGym(seed=8).member(42)) != snapshot(gym.member(42))
+
+    def test_sessions_are_realistic(self):
+        """Test sessions are ordered, in range, in opening hours and mostly from the catalog"""
+        gym = SyntheticGym(seed=1, start=date(2022, 1, 1), years=2)
+        first, last = day_number('2022-01-01'), day_number('2024-01-01')
+        custom = 0
+        for profile, history, workouts in gym.members(0, 200):
+            registered = day_number(profile['registered_date'][:10])
+            assert profile['weight'] == history.current_weight
+            for category, sessions in workouts.items():
+                assert [e.ts for e in sessions] == sorted(e.ts for e in sessions)
+                for entry in sessions:
+                    assert registered <= entry.day and first <= entry.day <= last + 1
+                    assert 5 <= entry.duration <= 90
+                    if category == 'Warm-up':
+                        # Warm-ups start a visit, so they fall in opening hours
+                        assert 6 <= entry.ts // 3600 % 24 < 22
+                    known = catalog.get(entry.exercise)
+                    if known is None:
+                        custom += 1
+                    else:
+                        assert known.category == category
+        assert custom > 0
+
+    def test_activity_follows_a_power_law(self):
+        """Test a few members hold much of the activity and some never came back"""
+        users, workouts, histories, _ = stores()
+        totals = populate(SyntheticGym(seed=2), 2000, users, workouts, histories)
+        counts = sorted((sum(len(s) for s in w.values()) for w in workouts.values()), reverse=True)
+
+        assert totals == {'members': 2000, 'sessions': sum(counts)}
+        assert sum(counts[:20]) > 0.1 * totals['sessions']
+        assert counts[0] > 20 * counts[len(counts) // 2]
+        assert counts.count(0) >= 100
+
+    def test_ndjson_round_trip(self, tmp_path):
+        """Test files written by several workers load back to the generated members"""
+        gym = SyntheticGym(seed=3)
+        written = write_ndjson(gym, 30, str(tmp_path), files=3, workers=2)
+        users, workouts, histories, versions = stores()
+        loaded = load_ndjson(str(tmp_path), users, workouts, histories, versions)
+
+        assert len(written['files']) == 3
+        assert loaded == {'members': 30, 'sessions': written['sessions']}
+        assert versions.get(gym.regn_id(0)) == 1
+        for index in (0, 17, 29):
+            regn_id = gym.regn_id(index)
+            assert (snapshot((users[regn_id], histories[regn_id], workouts[regn_id]))
+                    == snapshot(gym.member(index)))
+
+    def test_spawned_workers_write_custom_exercises(self, tmp_path, monkeypatch):
+        """Test workers that do not inherit the symbol table still name custom exercises"""
+        gym = SyntheticGym(seed=3)
+        monkeypatch.setattr(synthetic_data.multiprocessing, 'Pool',
+                            multiprocessing.get_context('spawn').Pool)
+        write_ndjson(gym, 60, str(tmp_path), files=2, workers=2)
+        users, workouts, histories, _ = stores()
+        load_ndjson(str(tmp_path), users, workouts, histories)
+
+        logged = {e.exercise for sessions in workouts.values() for e in sessions['Workout']}
+        assert logged & set(CUSTOM_EXERCISES)
+        for index in range(60):
+            regn_id = gym.regn_id(index)
+            assert (snapshot((users[regn_id], histories[regn_id], workouts[regn_id]))
+                    == snapshot(gym.member(index)))
@@ -0,0 +1,95 @@
+"""
+Unit tests for request tracing
+"""
+
+import json
+import pytest
+from tracing import Tracer, TracingMiddleware, current_trace, span
+
+def handler(environ, start_response):
+    with span('store.workouts', member='M1'):
+        with span('aggregate.summary'):
+            pass
+    with span('json.serialize'):
+        pass
+    start_response('200 OK', [])
+    return [b'{}']
+
+def call(app):
+    app({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/workout/summary'}, lambda *args: None)
+
+class TestTracing:
+    """Test span nesting, the ring buffer and OTLP export"""
+
+    def test_spans_nest_under_the_request(self):
+        """Test spans record their parents and the request status"""
+        tracer = Tracer(sample_rate=1.0, export_path=None)
+        call(TracingMiddleware(handler, tracer))
+
+        trace = tracer.recent()[0]
+        names = [s['name'] for s in trace.to_dict()['spans']]
+        assert names == ['GET /api/workout/summary', 'store.workouts', 'aggregate.summary',
+                         'json.serialize']
+        root, store, aggregate, _ = trace.spans
+        assert aggregate.parent is store and store.parent is root
+        assert root.attributes['http.status_code'] == 200
+        assert store.attributes == {'member': 'M1'}
+        assert set(trace.stage_totals()) == {'store.workouts', 'aggregate.summary', 'json.serialize'}
+        assert current_trace() is None
+
+    def test_span_outside_a_trace_is_a_no_op(self):
+        """Test instrumented code runs normally without a trace"""
+        with span('store.member') as s:
+            s.set('ignored', True)
+        assert current_trace() is None
+
+    def test_errors_are_recorded(self):
+        """Test a span that raises is marked with the exception type"""
+        def failing(environ, start_response):
+            with span('store.append'):
+                raise KeyError('Stretch')
+        tracer = Tracer(sample_rate=1.0, export_path=None)
+        with pytest.raises(KeyError):
+            call(TracingMiddleware(failing, tracer))
+
+        assert tracer.recent()[0].spans[1].attributes == {'error': 'KeyError'}
+
+    def test_ring_buffer_and_filters(self):
+        """Test only the newest traces are kept and can be filtered"""
+        tracer = Tracer(sample_rate=1.0, capacity=3, export_path=None)
+        app = TracingMiddleware(handler, tracer)
+        for _ in range(5):
+            call(app)
+
+        assert len(tracer.recent()) == 3
+        assert len(tracer.recent(limit=1)) == 1
+        assert tracer.recent(min_ms=60000) == []
+        trace_id = tracer.recent()[0].to_dict()['trace_id']
+        assert tracer.get(trace_id) is tracer.recent()[0]
+
+    def test_unsampled_requests_are_not_traced(self):
+        """Test a zero sample rate records nothing"""
+        tracer = Tracer(sample_rate=0, export_path=None)
+        call(TracingMiddleware(handler, tracer))
+        assert tracer.recent() == []
+
+    def test_otlp_export(self, tmp_path):
+        """Test traces are appended to the export file as OTLP/JSON lines"""
+        path = tmp_path / 'traces.jsonl'
+        tracer = Tracer(sample_rate=1.0, export_path=str(path))
+        app = TracingMiddleware(handler, tracer)
+        call(app)
+        call(app)
+        tracer.flush()
+
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2 and tracer.exported == 2
+        resource_spans = json.loads(lines[0])['resourceSpans'][0]
+        assert resource_spans['resource']['attributes'][0] == {
+            'key': 'service.name', 'value': {'stringValue': 'aceest-fitness'}}
+        spans = resource_spans['scopeSpans'][0]['spans']
+        root, store = spans[0], spans[1]
+        assert len(root['traceId']) == 32 and len(root['spanId']) == 16
+        assert 'parentSpanId' not in root and store['parentSpanId'] == root['spanId']
+        assert int(root['startTimeUnixNano']) <= int(store['startTimeUnixNano'])
+        assert {'key': 'http.status_code', 'value': {'intValue': '200'}} in root['attributes']
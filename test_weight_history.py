@@ -0,0 +1,80 @@
+"""
+Unit tests for member weight history
+"""
+
+import sys
+import threading
+from calculations import calculate_calories
+from weight_history import WeightHistory
+
+class TestWeightHistory:
+    """Test the weight timeline and memoized calorie rates"""
+    
+    def test_segment_lookup(self):
+        """Test the weight in effect on a given day"""
+        history = WeightHistory('2024-01-01', 80.0)
+        history.record('2024-03-01', 75.0)
+        history.record('2024-02-01', 78.0)  # back-dated insert
+        
+        assert history.weight_on('2023-12-31') == 80.0  # before first record
+        assert history.weight_on('2024-01-31') == 80.0
+        assert history.weight_on('2024-02-01') == 78.0
+        assert history.weight_on('2024-06-01') == 75.0
+        assert history.current_weight == 75.0
+    
+    def test_same_date_replaces(self):
+        """Test a second record on the same date replaces the first"""
+        history = WeightHistory('2024-01-01', 80.0)
+        history.record('2024-01-01', 82.0)
+        
+        assert history.timeline() == [{'date': '2024-01-01', 'weight': 82.0}]
+    
+    def test_calories_match_scalar(self):
+        """Test derived calories are identical to calculate_calories"""
+        history = WeightHistory('2024-01-01', 71.3)
+        history.record('2024-02-01', 68.9)
+        
+        for category in ('Warm-up', 'Workout', 'Cool-down', 'Other'):
+            for duration in (1, 17, 45):
+                assert history.calories(category, duration, '2024-01-15') == \
+                    calculate_calories(category, duration, 71.3)
+                assert history.calories(category, duration, '2024-02-15') == \
+                    calculate_calories(category, duration, 68.9)
+    
+    def test_rates_memoized_per_segment(self):
+        """Test rates are cached per (segment, category) and dropped on replace"""
+        history = WeightHistory('2024-01-01', 80.0)
+        for day in ('2024-01-02', '2024-01-03', '2024-01-04'):
+            history.calories('Workout', 30, day)
+        assert len(history._rates) == 1
+        
+        history.record('2024-01-01', 70.0)
+        assert history._rates == {}
+        assert history.calories('Workout', 30, '2024-01-02') == calculate_calories('Workout', 30, 70.0)
+    
+    def test_readers_during_writes(self):
+        """Test calories can be read on other threads while weights are recorded"""
+        history = WeightHistory('2024-01-01', 80.0)
+        errors, done = [], threading.Event()
+        def read():
+            try:
+                while not done.is_set():
+                    for day in range(1, 29):
+                        history.calories('Workout', 30, f'2024-02-{day:02d}')
+            except Exception as e:  # pragma: no cover - only on a race
+                errors.append(e)
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for reader in readers:
+                reader.start()
+            for n in range(20000):
+                history.record(f'2024-02-{n % 28 + 1:02d}', 70.0 + n % 7)
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+            sys.setswitchinterval(interval)
+        assert errors == []
+        assert history.weight_on('2024-02-28') == history.weights[-1]
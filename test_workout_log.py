@@ -0,0 +1,98 @@
+"""
+Unit tests for the durable workout log
+"""
+
+import threading
+import pytest
+from workout_entry import WorkoutEntry
+from workout_log import WorkoutLog, WorkoutLogError
+
+def entry(n):
+    return WorkoutEntry.from_iso('Squats', n, f'2024-06-25T07:00:{n:02d}')
+
+@pytest.fixture
+def log(tmp_path):
+    """Group-commit log with a generous batching window"""
+    log = WorkoutLog(str(tmp_path / 'workouts.db'), max_batch=64, max_delay=0.05)
+    yield log
+    log.close()
+
+class TestWorkoutLog:
+    """Test durable appends, batching and reads"""
+
+    def test_append_and_read_back(self, log):
+        """Test appended sessions are returned oldest first"""
+        log.append('M1', 'Workout', entry(1))
+        log.append('M2', 'Warm-up', entry(2))
+        log.append('M1', 'Cool-down', entry(3))
+
+        assert log.sessions('M1') == [('M1', 'Workout', entry(1)), ('M1', 'Cool-down', entry(3))]
+        assert len(log.sessions()) == 3
+
+    def test_concurrent_appends_share_commits(self, log):
+        """Test concurrent callers are batched into fewer transactions"""
+        barrier = threading.Barrier(32)
+        def append(n):
+            barrier.wait()
+            log.append(f'M{n}', 'Workout', entry(n))
+        threads = [threading.Thread(target=append, args=(n,)) for n in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert log.entries == 32
+        assert log.batches < 32
+        assert len(log.sessions()) == 32
+
+    def test_without_group_commit(self, tmp_path):
+        """Test every append commits on its own when batching is off"""
+        log = WorkoutLog(str(tmp_path / 'workouts.db'), group_commit=False)
+        for n in range(3):
+            log.append('M1', 'Workout', entry(n))
+        log.close()
+
+        assert log.batches == 3
+        reopened = WorkoutLog(str(tmp_path / 'workouts.db'))
+        assert len(reopened.sessions('M1')) == 3
+        reopened.close()
+
+    def test_failed_commit_is_reported(self, log):
+        """Test every caller in a failed batch gets an error"""
+        log._connection.execute('DROP TABLE workouts')
+        with pytest.raises(WorkoutLogError):
+            log.append('M1', 'Workout', entry(1))
+
+    def test_closed_log_rejects_appends(self, log):
+        """Test appending after close fails"""
+        log.close()
+        with pytest.raises(WorkoutLogError):
+            log.append('M1', 'Workout', entry(1))
+
+    def test_committer_survives_unexpected_errors(self, log, monkeypatch):
+        """Test a batch failing with any exception fails its callers and later appends still commit"""
+        original = log._commit
+        def fail_once(rows):
+            monkeypatch.setattr(log, '_commit', original)
+            raise RuntimeError('disk on fire')
+        monkeypatch.setattr(log, '_commit', fail_once)
+        with pytest.raises(WorkoutLogError):
+            log.append('M1', 'Workout', entry(1))
+
+        log.submit('M1', 'Workout', entry(2)).result(timeout=5)
+        assert log.sessions('M1') == [('M1', 'Workout', entry(2))]
+
+    def test_load_restores_sessions_after_reopening(self, tmp_path):
+        """Test a reopened log loads its sessions after those already in memory"""
+        path = str(tmp_path / 'workouts.db')
+        log = WorkoutLog(path)
+        log.append('M1', 'Workout', entry(1))
+        log.append('M2', 'Cool-down', entry(2))
+        log.close()
+
+        reopened = WorkoutLog(path)
+        workouts = {'M1': {'Warm-up': [], 'Workout': [entry(0)], 'Cool-down': []}}
+        assert reopened.load(workouts) == 2
+        reopened.close()
+        assert workouts['M1']['Workout'] == [entry(0), entry(1)]
+        assert workouts['M2'] == {'Warm-up': [], 'Workout': [], 'Cool-down': [entry(2)]}
@@ -0,0 +1,85 @@
+"""
+Unit tests for the personalized workout-plan generator
+"""
+
+from datetime import date, datetime, time, timedelta
+import workout_planner
+from exercise_catalog import catalog
+from workout_entry import WorkoutEntry
+from workout_planner import plan_for_bucket, plan_for_member, profile_bucket, recent_minutes
+
+TODAY = date(2024, 6, 30)
+
+def sessions(*days_ago_and_minutes):
+    """Chronological session list from (days ago, minutes) pairs"""
+    return [WorkoutEntry.at('Running', m, datetime.combine(TODAY - timedelta(days=d), time(7)))
+            for d, m in sorted(days_ago_and_minutes, reverse=True)]
+
+class TestProfileBucket:
+    """Test mapping members to coarse profile buckets"""
+    
+    def test_recent_minutes_window(self):
+        """Test only sessions inside the window are counted"""
+        workouts = {'Workout': sessions((40, 100), (27, 30), (0, 20)), 'Cool-down': sessions((2, 5))}
+        assert recent_minutes(workouts, TODAY) == 55
+    
+    def test_bucket_boundaries(self):
+        """Test BMI, age and volume bands"""
+        user = {'bmi': 24.9, 'age': 29, 'gender': 'F'}
+        assert profile_bucket(user, {}, TODAY) == ('normal', 'under-30', 'starter')
+        
+        user = {'bmi': 25.0, 'age': 60}
+        workouts = {'Workout': sessions(*[(d, 45) for d in range(0, 28, 2)])}  # 157.5 min/week
+        assert profile_bucket(user, workouts, TODAY) == ('overweight', '60+', 'intermediate')
+
+class TestPlanCache:
+    """Test plans are shared per bucket"""
+    
+    def test_members_in_bucket_share_plan(self):
+        """Test members in the same bucket get the same cached plan"""
+        workout_planner.plan_for_bucket.cache_clear()
+        a = plan_for_member({'bmi': 21.0, 'age': 25, 'weight': 60}, {}, TODAY)
+        b = plan_for_member({'bmi': 23.5, 'age': 28, 'weight': 80}, {}, TODAY)
+        
+        assert a['days'] is b['days']
+        assert a['estimated_weekly_calories'] < b['estimated_weekly_calories']
+        assert plan_for_bucket.cache_info().misses == 1
+    
+    def test_crossing_boundary_changes_plan(self):
+        """Test a member who trains more moves to a different plan"""
+        user = {'bmi': 22.0, 'age': 35}
+        before = plan_for_member(user, {}, TODAY)
+        after = plan_for_member(user, {'Workout': sessions(*[(d, 60) for d in range(28)])}, TODAY)
+        
+        assert before['level'] == 'Starter'
+        assert after['level'] == 'Advanced'
+        assert after['days_per_week'] > before['days_per_week']
+
+class TestPlanContent:
+    """Test generated plan content"""
+    
+    def test_plan_exercises_are_in_catalog(self):
+        """Test every planned exercise has a catalog MET value"""
+        names = set(workout_planner.WARM_UPS + workout_planner.COOL_DOWNS
+                    + workout_planner.LOW_IMPACT_FALLBACK)
+        for exercises in workout_planner.FOCUS_EXERCISES.values():
+            names.update(exercises)
+        assert [n for n in names if catalog.get(n) is None] == []
+    
+    def test_low_impact_plan(self):
+        """Test older or obese members get capped, low-impact plans"""
+        plan = plan_for_bucket(workout_planner.ProfileBucket('obese', '45-59', 'advanced'))
+        
+        assert plan['level'] == 'Intermediate'
+        for day in plan['days']:
+            for session in day['sessions']:
+                assert catalog.met_for(session['exercise']) <= workout_planner.LOW_IMPACT_MAX_MET
+    
+    def test_session_minutes_add_up(self):
+        """Test each training day fills the session length"""
+        for volume in workout_planner.LEVELS:
+            plan = plan_for_bucket(workout_planner.ProfileBucket('normal', '30-44', volume))
+            training = [d for d in plan['days'] if d['sessions']]
+            assert len(training) == plan['days_per_week']
+            for day in training:
+                assert sum(s['duration'] for s in day['sessions']) == plan['session_minutes']
@@ -0,0 +1,37 @@
+"""
+Unit tests for the helpers that pass requests on to another server
+"""
+
+import io
+import threading
+from werkzeug.serving import make_server
+from wsgi_proxy import KeepAliveClient, buffer_body, request_headers, request_target
+
+class TestWsgiProxy:
+    """Test rebuilding requests from the environ and keep-alive reconnects"""
+
+    def test_request_is_rebuilt_from_environ(self):
+        """Test the target, end-to-end headers and body are kept and hop-by-hop headers dropped"""
+        environ = {'SCRIPT_NAME': '', 'PATH_INFO': '/api/workout/summary', 'QUERY_STRING': 'week=1',
+                   'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': '2', 'wsgi.input': io.BytesIO(b'{}'),
+                   'HTTP_COOKIE': 'session=abc', 'HTTP_CONNECTION': 'keep-alive', 'HTTP_HOST': 'here'}
+        assert request_target(environ) == '/api/workout/summary?week=1'
+        assert request_headers(environ) == {'Cookie': 'session=abc', 'Content-Type': 'application/json'}
+        assert buffer_body(environ) == b'{}'
+        assert environ['wsgi.input'].read() == b'{}'
+
+    def test_client_requests_after_server_closes(self):
+        """Test requests keep succeeding when the server closes the connection after each"""
+        def app(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain'), ('Connection', 'close')])
+            return [b'ok']
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = KeepAliveClient('127.0.0.1', server.server_port, timeout=5)
+            for _ in range(3):
+                status, _, body = client.request('GET', '/')
+                assert (status, body) == (200, b'ok')
+        finally:
+            server.shutdown()
@@ -0,0 +1,293 @@
+"""
+ACEest Fitness - Lightweight request tracing
+
+TracingMiddleware opens a trace for a TRACE_SAMPLE_RATE fraction of
+requests, and code on the request path marks its hot sections with
+`with span('store.workouts'):`. Spans nest through a context variable, so
+helpers need no tracer argument, and span() outside a trace is a no-op.
+
+Finished traces go into a ring buffer of the last TRACE_BUFFER traces,
+served at /debug/traces. With TRACE_EXPORT_PATH set, each trace is also
+appended to that file as one line of OTLP/JSON (an
+ExportTraceServiceRequest) by a background writer, which an OpenTelemetry
+collector's filelog receiver or otel-cli can pick up. When the writer falls
+behind, traces are dropped from the export rather than slowing requests.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 1))
+TRACE_BUFFER = int(os.environ.get('TRACE_BUFFER', 200))
+TRACE_EXPORT_PATH = os.environ.get('TRACE_EXPORT_PATH')
+TRACE_EXPORT_QUEUE = int(os.environ.get('TRACE_EXPORT_QUEUE', 1000))
+
+SERVICE_NAME = 'aceest-fitness'
+
+# (trace, innermost open span); spans only point at their parent, so a
+# finished trace holds no reference cycles
+_current = ContextVar('current_span', default=None)
+
+
+class Span:
+    """A timed section of a trace; times are perf_counter nanoseconds"""
+
+    __slots__ = ('name', 'span_id', 'parent', 'start', 'end', 'attributes')
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.span_id = random.getrandbits(64)
+        self.parent = parent
+        self.attributes = attributes
+        self.end = None
+        self.start = time.perf_counter_ns()
+
+    @property
+    def duration_ms(self):
+        end = self.end if self.end is not None else time.perf_counter_ns()
+        return (end - self.start) / 1e6
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def to_dict(self, trace):
+        return {'name': self.name, 'span_id': f'{self.span_id:016x}',
+                'parent_id': f'{self.parent.span_id:016x}' if self.parent else None,
+                'offset_ms': round((self.start - trace.root.start) / 1e6, 3),
+                'duration_ms': round(self.duration_ms, 3), 'attributes': self.attributes}
+
+    def to_otlp(self, trace):
+        offset = trace.epoch_ns - trace.root.start
+        span = {'traceId': f'{trace.trace_id:032x}', 'spanId': f'{self.span_id:016x}',
+                'name': self.name, 'kind': 2 if self.parent is None else 1,
+                'startTimeUnixNano': str(self.start + offset),
+                'endTimeUnixNano': str((self.end or self.start) + offset),
+                'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items()]}
+        if self.parent is not None:
+            span['parentSpanId'] = f'{self.parent.span_id:016x}'
+        return span
+
+
+class Trace:
+    """The spans of one request, in start order"""
+
+    __slots__ = ('trace_id', 'epoch_ns', 'root', 'spans')
+
+    def __init__(self, name, attributes):
+        self.trace_id = random.getrandbits(128)
+        self.epoch_ns = time.time_ns()
+        self.spans = []
+        self.root = Span(name, None, attributes)
+        self.spans.append(self.root)
+
+    @property
+    def duration_ms(self):
+        return self.root.duration_ms
+
+    def stage_totals(self):
+        """Milliseconds spent in each span name below the root, summed"""
+        totals = {}
+        for span in self.spans[1:]:
+            totals[span.name] = totals.get(span.name, 0) + span.duration_ms
+        return {name: round(ms, 3) for name, ms in totals.items()}
+
+    def to_dict(self, with_spans=True):
+        data = {'trace_id': f'{self.trace_id:032x}', 'name': self.root.name,
+                'started': self.epoch_ns / 1e9, 'duration_ms': round(self.duration_ms, 3),
+                'attributes': self.root.attributes, 'span_count': len(self.spans)}
+        if with_spans:
+            data['spans'] = [span.to_dict(self) for span in self.spans]
+        return data
+
+    def to_otlp(self):
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attribute('service.name', SERVICE_NAME)]},
+            'scopeSpans': [{'scope': {'name': __name__},
+                            'spans': [span.to_otlp(self) for span in self.spans]}],
+        }]}
+
+
+class _NoSpan:
+    """Stand-in yielded by span() outside a trace"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, key, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _SpanContext:
+    __slots__ = ('name', 'attributes', 'span')
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.span = start_span(self.name, **self.attributes)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.span.set('error', exc_type.__name__)
+        end_span(self.span)
+        return False
+
+
+def span(name, **attributes):
+    """Context manager timing a section of the current trace"""
+    if _current.get() is None:
+        return _NO_SPAN
+    return _SpanContext(name, attributes)
+
+
+def start_span(name, **attributes):
+    """Open a child of the current span; pair with end_span()"""
+    current = _current.get()
+    if current is None:
+        return _NO_SPAN
+    trace, parent = current
+    child = Span(name, parent, attributes)
+    trace.spans.append(child)
+    _current.set((trace, child))
+    return child
+
+
+def end_span(child):
+    if child is _NO_SPAN:
+        return
+    child.end = time.perf_counter_ns()
+    current = _current.get()
+    if current is not None:
+        _current.set((current[0], child.parent))
+
+
+def current_trace():
+    """The trace of the request being handled, or None"""
+    current = _current.get()
+    return None if current is None else current[0]
+
+
+class Tracer:
+    """Samples traces and keeps the most recent ones"""
+
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE, capacity=TRACE_BUFFER,
+                 export_path=TRACE_EXPORT_PATH, export_queue=TRACE_EXPORT_QUEUE):
+        self.sample_rate = sample_rate
+        self.export_path = export_path
+        self.exported = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._traces = deque(maxlen=capacity)
+        self._export = None
+        if export_path:
+            self._export = queue.Queue(export_queue)
+            threading.Thread(target=self._write_exports, daemon=True).start()
+
+    def start_trace(self, name, **attributes):
+        """Open a trace rooted at name, or None if this one is not sampled"""
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return None
+        trace = Trace(name, attributes)
+        _current.set((trace, trace.root))
+        return trace
+
+    def end_trace(self, trace):
+        trace.root.end = time.perf_counter_ns()
+        _current.set(None)
+        with self._lock:
+            self._traces.append(trace)
+        if self._export is not None:
+            try:
+                self._export.put_nowait(trace)
+            except queue.Full:
+                self.dropped += 1
+
+    def recent(self, limit=None, min_ms=0):
+        """Finished traces newest first, optionally only the slow ones"""
+        with self._lock:
+            traces = list(reversed(self._traces))
+        traces = [t for t in traces if t.duration_ms >= min_ms]
+        return traces if limit is None else traces[:limit]
+
+    def get(self, trace_id):
+        with self._lock:
+            return next((t for t in self._traces if f'{t.trace_id:032x}' == trace_id), None)
+
+    def flush(self, timeout=5):
+        """Wait until queued exports are written, for tests and shutdown"""
+        if self._export is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._export.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def _write_exports(self):
+        while True:
+            batch = [self._export.get()]
+            while True:
+                try:
+                    batch.append(self._export.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with open(self.export_path, 'a', encoding='utf-8') as f:
+                    for trace in batch:
+                        f.write(json.dumps(trace.to_otlp(), separators=(',', ':')) + '\n')
+                self.exported += len(batch)
+            except OSError:
+                self.dropped += len(batch)
+            for _ in batch:
+                self._export.task_done()
+
+
+class TracingMiddleware:
+    """WSGI middleware opening a trace around each sampled request"""
+
+    def __init__(self, wsgi_app, tracer):
+        self.wsgi_app = wsgi_app
+        self.tracer = tracer
+
+    def __call__(self, environ, start_response):
+        method = environ.get('REQUEST_METHOD')
+        trace = self.tracer.start_trace(f"{method} {environ.get('PATH_INFO')}",
+                                        **{'http.method': method,
+                                           'http.target': environ.get('PATH_INFO')})
+        if trace is None:
+            return self.wsgi_app(environ, start_response)
+
+        def capture_status(status, headers, exc_info=None):
+            trace.root.set('http.status_code', int(status.split(' ', 1)[0]))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, capture_status)
+        finally:
+            self.tracer.end_trace(trace)
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
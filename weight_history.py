@@ -0,0 +1,119 @@
+"""
+ACEest Fitness - Member weight history
+
+A member's weight is kept as a timeline of segments, each starting on an
+effective date. Session calories are derived from the weight in effect on
+the session's date instead of being frozen at insert time, so recording a
+new (or back-dated) weight is an O(log n) insert rather than a rewrite of
+the member's workout history.
+"""
+
+from bisect import bisect_right
+
+from calculations import calculate_calories
+from exercise_catalog import catalog
+from exercise_symbols import symbols
+
+
+class WeightHistory:
+    """Timeline of a member's weight, ordered by effective date
+
+    Dates are ISO strings (YYYY-MM-DD), which sort chronologically. The
+    calories-per-minute rate is memoized per (weight segment, category,
+    catalog exercise); exercises not in the catalog share their category's
+    entry.
+    """
+
+    __slots__ = ('_segments', '_rates')
+
+    def __init__(self, effective_date, weight_kg):
+        # (dates, weights), replaced whole and never changed in place, so a
+        # reader holding one snapshot sees matching dates and weights while
+        # record() runs on another thread
+        self._segments = ([effective_date], [weight_kg])
+        self._rates = {}
+
+    @property
+    def dates(self):
+        return self._segments[0]
+
+    @property
+    def weights(self):
+        return self._segments[1]
+
+    @property
+    def current_weight(self):
+        """Weight of the most recent segment"""
+        return self._segments[1][-1]
+
+    def record(self, effective_date, weight_kg):
+        """Record a weight from effective_date onwards
+
+        A second record on the same date replaces the first. Writers for
+        one member must be serialized (the app holds the member lock);
+        readers need no lock.
+        """
+        dates, weights = (list(column) for column in self._segments)
+        index = bisect_right(dates, effective_date)
+        if index and dates[index - 1] == effective_date:
+            replaced = weights[index - 1]
+            weights[index - 1] = weight_kg
+            self._segments = (dates, weights)
+            self._forget(effective_date, replaced)
+        else:
+            dates.insert(index, effective_date)
+            weights.insert(index, weight_kg)
+            self._segments = (dates, weights)
+
+    def segment_on(self, day):
+        """Return the (effective date, weight) segment in effect on day
+
+        Days before the first record fall into the first segment.
+        """
+        dates, weights = self._segments
+        index = max(bisect_right(dates, day) - 1, 0)
+        return dates[index], weights[index]
+
+    def weight_on(self, day):
+        """Weight in effect on day"""
+        return self.segment_on(day)[1]
+
+    def calories(self, category, duration_min, day, exercise=None):
+        """Calories for a session, using the weight in effect on day"""
+        return self.calories_at(category, duration_min, day, catalog.position_of(exercise))
+
+    def calories_at(self, category, duration_min, day, position=None):
+        """calories() for an exercise already resolved to its catalog position"""
+        key = self.segment_on(day) + (category, position)
+        rate = self._rates.get(key)
+        if rate is None:
+            # (met * 3.5 * w / 200) * 1 is exact, so rate * duration is
+            # bit-identical to calculate_calories(category, duration, w).
+            known = None if position is None else catalog.exercises[position].name
+            rate = self._rates[key] = calculate_calories(category, 1, key[1], known)
+        return rate * duration_min
+
+    def clear_cache(self):
+        """Drop memoized rates, e.g. after a MET-table change"""
+        self._rates.clear()
+
+    def timeline(self):
+        """List of {'date', 'weight'} records, oldest first"""
+        dates, weights = self._segments
+        return [{'date': d, 'weight': w} for d, w in zip(dates, weights)]
+
+    def _forget(self, effective_date, weight_kg):
+        """Drop memoized rates for a segment that has been replaced"""
+        # Readers add rates while this runs, so walk a copy of the keys
+        for key in [k for k in list(self._rates) if k[0] == effective_date and k[1] == weight_kg]:
+            self._rates.pop(key, None)
+
+
+def entry_calories(history, category, entry, fallback_weight=70):
+    """Rounded calories for a stored session, using the weight in effect on
+    its date, or fallback_weight for a member without a history"""
+    if history is None:
+        return round(calculate_calories(category, entry.duration, fallback_weight,
+                                        entry.exercise), 1)
+    return round(history.calories_at(category, entry.duration, entry.date,
+                                     symbols.catalog_position(entry.exercise_id)), 1)
@@ -0,0 +1,98 @@
+"""
+ACEest Fitness - Compact workout session records
+
+A session used to be a dict of exercise, duration and two ISO strings
+(timestamp and date) that say the same thing twice. WorkoutEntry keeps the
+exercise's ID in the gym-wide symbol table, the duration and the start time
+as whole seconds since 1970-01-01 in the same naive local time the strings
+used. The session date is derived from the seconds, and the exercise name
+and ISO strings are only produced when a session is serialized.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from exercise_symbols import symbols
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+SECONDS_PER_DAY = 86400
+
+
+@lru_cache(maxsize=4096)
+def iso_day(day):
+    """ISO date for a proleptic Gregorian ordinal; shared per day"""
+    return date.fromordinal(day).isoformat()
+
+
+def day_number(iso_date):
+    """Ordinal of an ISO date, for comparing against WorkoutEntry.day"""
+    return date.fromisoformat(iso_date).toordinal()
+
+
+class WorkoutEntry:
+    """One logged session"""
+
+    __slots__ = ('exercise_id', 'duration', 'ts')
+
+    def __init__(self, exercise, duration, ts):
+        self.exercise_id = symbols.encode(exercise)
+        self.duration = duration
+        self.ts = ts
+
+    @classmethod
+    def at(cls, exercise, duration, when):
+        """Session started at the naive datetime when (to the second)"""
+        return cls(exercise, duration, (when - EPOCH) // timedelta(seconds=1))
+
+    @classmethod
+    def from_iso(cls, exercise, duration, timestamp):
+        return cls.at(exercise, duration, datetime.fromisoformat(timestamp))
+
+    @classmethod
+    def from_id(cls, exercise_id, duration, ts):
+        """Session for an exercise already encoded in the symbol table"""
+        entry = cls.__new__(cls)
+        entry.exercise_id = exercise_id
+        entry.duration = duration
+        entry.ts = ts
+        return entry
+
+    @property
+    def exercise(self):
+        """Display name of the exercise"""
+        return symbols.names[self.exercise_id]
+
+    @property
+    def day(self):
+        """Session date as an ordinal"""
+        return self.ts // SECONDS_PER_DAY + EPOCH_ORDINAL
+
+    @property
+    def date(self):
+        """Session date as an ISO string"""
+        return iso_day(self.day)
+
+    @property
+    def timestamp(self):
+        """Start time as an ISO string"""
+        return (EPOCH + timedelta(seconds=self.ts)).isoformat()
+
+    def to_dict(self):
+        return {'exercise': self.exercise, 'duration': self.duration,
+                'timestamp': self.timestamp, 'date': self.date}
+
+    def __eq__(self, other):
+        if not isinstance(other, WorkoutEntry):
+            return NotImplemented
+        return ((self.exercise_id, self.duration, self.ts)
+                == (other.exercise_id, other.duration, other.ts))
+
+    __hash__ = None
+
+    def __reduce__(self):
+        # IDs are only meaningful in this process's symbol table
+        return WorkoutEntry, (self.exercise, self.duration, self.ts)
+
+    def __repr__(self):
+        return f'WorkoutEntry({self.exercise!r}, {self.duration!r}, {self.timestamp!r})'
@@ -0,0 +1,216 @@
+"""
+ACEest Fitness - Durable workout log with group commit
+
+Workout sessions are appended to a SQLite database (WAL mode, synchronous
+FULL) before add_workout acknowledges them. Committing each insert on its
+own caps throughput at the disk's fsync rate, so concurrent appends are
+queued and a single committer thread writes everything that queued up
+while the previous transaction was syncing as one transaction, of at most
+GROUP_COMMIT_MAX_BATCH entries. GROUP_COMMIT_DELAY_MS optionally holds a
+batch open a little longer to collect more. Every caller blocks until the
+transaction holding its entry is on disk.
+
+Enabled by setting WORKOUT_DB_PATH. The app loads the logged sessions back
+into memory when it starts. Members handed to another replica leave with
+their sessions: the receiver logs them in one transaction before accepting
+the members, and the sender then deletes its rows, queued behind any of the
+member's sessions still waiting to commit.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import closing
+from itertools import groupby
+from operator import itemgetter
+
+from workout_entry import WorkoutEntry
+
+WORKOUT_DB_PATH = os.environ.get('WORKOUT_DB_PATH')
+GROUP_COMMIT = os.environ.get('GROUP_COMMIT', '1') != '0'
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get('GROUP_COMMIT_MAX_BATCH', 256))
+GROUP_COMMIT_DELAY_MS = float(os.environ.get('GROUP_COMMIT_DELAY_MS', 0))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY,
+    regn_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    date TEXT NOT NULL
+)
+"""
+INSERT = ("INSERT INTO workouts (regn_id, category, exercise, duration, timestamp, date) "
+          "VALUES (?, ?, ?, ?, ?, ?)")
+DELETE_MEMBER = "DELETE FROM workouts WHERE regn_id = ?"
+
+
+class WorkoutLogError(RuntimeError):
+    """An entry could not be made durable"""
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=FULL')
+    connection.execute(SCHEMA)
+    return connection
+
+
+def _row(regn_id, category, entry):
+    return (regn_id, category, entry.exercise, entry.duration, entry.timestamp, entry.date)
+
+
+class WorkoutLog:
+    """Append-only store of workout sessions
+
+    append() returns once the entry is durable. With group_commit (the
+    default) entries from concurrent callers share transactions; without it
+    every append is its own transaction, which is what batching is measured
+    against.
+    """
+
+    def __init__(self, path, group_commit=GROUP_COMMIT, max_batch=GROUP_COMMIT_MAX_BATCH,
+                 max_delay=GROUP_COMMIT_DELAY_MS / 1000):
+        self.path = path
+        self.group_commit = group_commit
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._connection = _connect(path)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._pending = []  # ([(sql, params), ...] committed together, future)
+        self._closed = False
+        self._committer = None
+        self.batches = 0
+        self.entries = 0
+
+    def append(self, regn_id, category, entry):
+        """Write a session and wait until it is on disk"""
+        self.submit(regn_id, category, entry).result()
+
+    def submit(self, regn_id, category, entry):
+        """Queue a session; the returned future completes once it is on disk
+
+        Entries are written in the order they are submitted, so a caller
+        can fix its order under a lock and wait for the disk after
+        releasing it. The future raises WorkoutLogError if the write failed.
+        """
+        return self._submit([(INSERT, _row(regn_id, category, entry))])
+
+    def submit_members(self, workouts):
+        """Queue every session of some members ({regn_id: {category: [entries]}})
+
+        They are committed in one transaction, so either all are logged or
+        the future raises WorkoutLogError and none are.
+        """
+        return self._submit([(INSERT, _row(regn_id, category, entry))
+                             for regn_id, member in workouts.items()
+                             for category, entries in member.items() for entry in entries])
+
+    def submit_removal(self, regn_ids):
+        """Queue deleting members' sessions, after everything already queued for them"""
+        return self._submit([(DELETE_MEMBER, (regn_id,)) for regn_id in regn_ids])
+
+    def _submit(self, statements):
+        future = Future()
+        if not self.group_commit:
+            with self._lock:
+                if self._closed:
+                    raise WorkoutLogError('Workout log is closed')
+                try:
+                    self._commit(statements)
+                except sqlite3.Error as e:
+                    raise WorkoutLogError(f'Could not save workout: {e}') from e
+            future.set_result(None)
+            return future
+        with self._cond:
+            if self._closed:
+                raise WorkoutLogError('Workout log is closed')
+            if self._committer is None:
+                # Started on first use so each gunicorn worker gets its own
+                self._committer = threading.Thread(target=self._run, name='workout-log-committer',
+                                                   daemon=True)
+                self._committer.start()
+            self._pending.append((statements, future))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def _commit(self, statements):
+        self._connection.execute('BEGIN')
+        try:
+            for sql, run in groupby(statements, key=itemgetter(0)):
+                self._connection.executemany(sql, [params for _, params in run])
+        except BaseException:
+            self._connection.execute('ROLLBACK')
+            raise
+        self._connection.execute('COMMIT')
+        self.batches += 1
+        self.entries += sum(sql is INSERT for sql, _ in statements)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Give concurrent requests a moment to join the batch
+                deadline = time.monotonic() + self.max_delay
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            try:
+                self._commit([statement for statements, _ in batch for statement in statements])
+            except Exception as e:  # fail this batch, keep committing the next
+                for _, future in batch:
+                    future.set_exception(WorkoutLogError(f'Could not save workout: {e}'))
+            else:
+                for _, future in batch:
+                    future.set_result(None)
+
+    def sessions(self, regn_id=None):
+        """Logged sessions as (regn_id, category, WorkoutEntry), oldest first"""
+        query = 'SELECT regn_id, category, exercise, duration, timestamp FROM workouts'
+        params = ()
+        if regn_id is not None:
+            query += ' WHERE regn_id = ?'
+            params = (regn_id,)
+        # Own connection: the committer's may be mid-transaction
+        with closing(sqlite3.connect(self.path)) as connection:
+            rows = connection.execute(query + ' ORDER BY id', params).fetchall()
+        return [(member, category, WorkoutEntry.from_iso(exercise, duration, timestamp))
+                for member, category, exercise, duration, timestamp in rows]
+
+    def load(self, workouts):
+        """Add every logged session to workouts ({regn_id: {category: [entries]}})
+
+        Sessions go after any the member already has. Returns the number loaded.
+        """
+        loaded = 0
+        for regn_id, category, entry in self.sessions():
+            member = workouts.get(regn_id)
+            if member is None:
+                member = workouts[regn_id] = {'Warm-up': [], 'Workout': [], 'Cool-down': []}
+            member.setdefault(category, []).append(entry)
+            loaded += 1
+        return loaded
+
+    def close(self):
+        """Flush waiting entries and close the database"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._committer is not None:
+            self._committer.join()
+        with self._lock:
+            self._connection.close()
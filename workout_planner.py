@@ -0,0 +1,171 @@
+"""
+ACEest Fitness - Personalized workout-plan generator
+
+Members are mapped to a coarse profile bucket (BMI class, age band and
+recent training volume), and weekly plans are generated per bucket and
+cached, so every member in a bucket shares one precomputed plan. A member
+whose inputs cross a bucket boundary simply resolves to a different cached
+plan; nothing has to be evicted.
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+
+from calculations import calculate_calories
+from exercise_catalog import catalog
+
+# Gender is not part of the bucket: exercise selection does not depend on it,
+# and splitting on it would only triple the number of identical cached plans.
+ProfileBucket = namedtuple('ProfileBucket', 'bmi_class age_band volume_band')
+
+BMI_CLASSES = ((18.5, 'underweight'), (25, 'normal'), (30, 'overweight'), (float('inf'), 'obese'))
+AGE_BANDS = ((30, 'under-30'), (45, '30-44'), (60, '45-59'), (float('inf'), '60+'))
+# Average weekly training minutes over VOLUME_WINDOW_DAYS
+VOLUME_BANDS = ((30, 'starter'), (90, 'beginner'), (180, 'intermediate'), (float('inf'), 'advanced'))
+VOLUME_WINDOW_DAYS = 28
+
+LEVELS = ('starter', 'beginner', 'intermediate', 'advanced')
+LEVEL_SETTINGS = {
+    'starter': {'session_minutes': 30, 'focus': ['Full Body', 'Cardio', 'Core & Flexibility']},
+    'beginner': {'session_minutes': 40, 'focus': ['Full Body', 'Cardio', 'Core & Flexibility']},
+    'intermediate': {'session_minutes': 50,
+                     'focus': ['Upper Body', 'Lower Body', 'Cardio', 'Core & Abs', 'Full Body']},
+    'advanced': {'session_minutes': 60,
+                 'focus': ['Chest & Triceps', 'Back & Biceps', 'Legs', 'Shoulders',
+                           'Core & HIIT', 'Full Body']},
+}
+FOCUS_EXERCISES = {
+    'Full Body': ['Burpees', 'Squats', 'Push-ups', 'Kettlebell Swings', 'Circuit Training'],
+    'Cardio': ['Running', 'Cycling', 'Rowing Machine', 'Elliptical Trainer', 'Swimming'],
+    'Core & Flexibility': ['Plank', 'Pilates', 'Crunches', 'Tai Chi'],
+    'Upper Body': ['Push-ups', 'Bench Press', 'Pull-ups', 'Overhead Press', 'Dips'],
+    'Lower Body': ['Squats', 'Lunges', 'Deadlifts', 'Leg Press', 'Box Jumps'],
+    'Core & Abs': ['Plank', 'Crunches', 'Mountain Climbers'],
+    'Chest & Triceps': ['Bench Press', 'Push-ups', 'Dips', 'Tricep Extensions'],
+    'Back & Biceps': ['Pull-ups', 'Lat Pulldown', 'Deadlifts', 'Bicep Curls'],
+    'Legs': ['Squats', 'Leg Press', 'Lunges', 'Box Jumps'],
+    'Shoulders': ['Overhead Press', 'Battle Ropes', 'Push-ups'],
+    'Core & HIIT': ['HIIT', 'Mountain Climbers', 'Plank', 'Burpees'],
+}
+WARM_UPS = ['Brisk Walking', 'Jumping Jacks', 'Dynamic Stretching', 'High Knees', 'Light Cycling']
+COOL_DOWNS = ['Stretching', 'Foam Rolling', 'Yoga', 'Hamstring Stretch', 'Breathing Exercises']
+LOW_IMPACT_FALLBACK = ['Elliptical Trainer', 'Stationary Bike', 'Swimming']
+# Exercises above this MET are left out of low-impact plans
+LOW_IMPACT_MAX_MET = 7.0
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+# Training days per week, spread across WEEKDAYS
+SCHEDULES = {
+    3: (0, 2, 4),
+    4: (0, 1, 3, 4),
+    5: (0, 1, 2, 4, 5),
+    6: (0, 1, 2, 3, 4, 5),
+}
+
+
+def _band(value, bands):
+    for upper, label in bands:
+        if value < upper:
+            return label
+    return bands[-1][1]
+
+
+def recent_minutes(workouts, today=None, days=VOLUME_WINDOW_DAYS):
+    """Total training minutes in the last `days` days
+
+    Sessions are appended in chronological order, so each category is
+    scanned from the newest entry back to the start of the window.
+    """
+    cutoff = ((today or date.today()) - timedelta(days=days - 1)).toordinal()
+    total = 0
+    for sessions in workouts.values():
+        for entry in reversed(sessions):
+            if entry.day < cutoff:
+                break
+            total += entry.duration
+    return total
+
+
+def profile_bucket(user, workouts, today=None):
+    """Map a member profile and workout history to its ProfileBucket"""
+    weekly_minutes = recent_minutes(workouts, today) * 7 / VOLUME_WINDOW_DAYS
+    return ProfileBucket(
+        bmi_class=_band(user.get('bmi', 22), BMI_CLASSES),
+        age_band=_band(user.get('age', 30), AGE_BANDS),
+        volume_band=_band(weekly_minutes, VOLUME_BANDS),
+    )
+
+
+def _pick(names, index, count, low_impact):
+    """Rotate through names for `count` distinct picks, skipping high-impact
+    ones (and topping up from LOW_IMPACT_FALLBACK) if required"""
+    if low_impact:
+        names = [n for n in names if (catalog.met_for(n) or 0) <= LOW_IMPACT_MAX_MET]
+        names += [n for n in LOW_IMPACT_FALLBACK if n not in names]
+    return [names[(index + k) % len(names)] for k in range(min(count, len(names)))]
+
+
+@lru_cache(maxsize=512)
+def plan_for_bucket(bucket):
+    """Generate the weekly plan shared by every member in a bucket
+
+    The result is cached and shared, so callers must treat it as read-only.
+    """
+    # The plan matches the member's current volume; age and weight cap it.
+    level = LEVELS.index(bucket.volume_band)
+    low_impact = bucket.bmi_class == 'obese' or bucket.age_band == '60+'
+    if low_impact:
+        level = min(level, LEVELS.index('intermediate'))
+    name = LEVELS[level]
+    settings = LEVEL_SETTINGS[name]
+    focus = settings['focus']
+    training_days = SCHEDULES[max(3, min(len(focus), 6))]
+    edge_minutes = 10 if settings['session_minutes'] >= 40 else 5
+    main_minutes = settings['session_minutes'] - 2 * edge_minutes
+
+    days = []
+    for i, weekday in enumerate(WEEKDAYS):
+        if i not in training_days:
+            days.append({'day': weekday, 'focus': 'Rest', 'sessions': []})
+            continue
+        n = training_days.index(i)
+        day_focus = focus[n % len(focus)]
+        main = _pick(FOCUS_EXERCISES[day_focus], n, 2, low_impact)
+        sessions = [{'category': 'Warm-up', 'exercise': _pick(WARM_UPS, n, 1, low_impact)[0],
+                     'duration': edge_minutes}]
+        for k, exercise in enumerate(main):
+            share = main_minutes // len(main) + (k < main_minutes % len(main))
+            sessions.append({'category': 'Workout', 'exercise': exercise, 'duration': share})
+        sessions.append({'category': 'Cool-down', 'exercise': _pick(COOL_DOWNS, n, 1, False)[0],
+                         'duration': edge_minutes})
+        days.append({'day': weekday, 'focus': day_focus, 'sessions': sessions})
+
+    notes = []
+    if low_impact:
+        notes.append('Low-impact variations: keep joints comfortable and build up gradually.')
+    if bucket.bmi_class == 'underweight':
+        notes.append('Prioritise strength work and pair training with a calorie surplus.')
+    if bucket.bmi_class in ('overweight', 'obese'):
+        notes.append('Add daily walks on rest days to increase weekly activity.')
+
+    return {
+        'bucket': bucket._asdict(),
+        'level': name.title(),
+        'days_per_week': len(training_days),
+        'session_minutes': settings['session_minutes'],
+        'weekly_minutes': len(training_days) * settings['session_minutes'],
+        'days': days,
+        'notes': notes,
+    }
+
+
+def estimate_weekly_calories(plan, weight_kg):
+    """Calories a member of the given weight would burn following plan"""
+    return round(sum(calculate_calories(s['category'], s['duration'], weight_kg, s['exercise'])
+                     for day in plan['days'] for s in day['sessions']), 1)
+
+
+def plan_for_member(user, workouts, today=None):
+    """Weekly plan for a member: the cached bucket plan plus personal figures"""
+    plan = plan_for_bucket(profile_bucket(user, workouts, today))
+    return dict(plan, estimated_weekly_calories=estimate_weekly_calories(plan, user.get('weight', 70)))
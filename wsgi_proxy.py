@@ -0,0 +1,77 @@
+"""
+ACEest Fitness - Passing requests on to another server
+
+Shared by the middlewares that send a request somewhere else (ShardRouter
+forwarding to the owning replica, ShadowMiddleware mirroring to the shadow)
+and by the load test's HTTP target: rebuilding the request from the WSGI
+environ, and a per-thread keep-alive connection that reconnects once when
+the server has closed it while idle.
+"""
+
+import http.client
+import io
+import threading
+
+# Headers describing one connection, not the request; never passed on
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te',
+              'trailers', 'transfer-encoding', 'upgrade', 'content-length', 'host'}
+
+
+def request_target(environ):
+    """Path and query string of a request, as passed on"""
+    path = environ.get('SCRIPT_NAME', '') + environ.get('PATH_INFO', '')
+    if environ.get('QUERY_STRING'):
+        path += '?' + environ['QUERY_STRING']
+    return path
+
+
+def request_headers(environ):
+    """The request's end-to-end headers, including Content-Type"""
+    headers = {key[5:].replace('_', '-').title(): value for key, value in environ.items()
+               if key.startswith('HTTP_') and key[5:].replace('_', '-').lower() not in HOP_BY_HOP}
+    if environ.get('CONTENT_TYPE'):
+        headers['Content-Type'] = environ['CONTENT_TYPE']
+    return headers
+
+
+def buffer_body(environ):
+    """Read the request body, leaving a copy in wsgi.input for the app"""
+    try:
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    body = environ['wsgi.input'].read(length) if length > 0 else b''
+    environ['wsgi.input'] = io.BytesIO(body)
+    return body
+
+
+class KeepAliveClient:
+    """One keep-alive HTTP connection per thread to host:port"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, [(header, value)], body); raises OSError or HTTPException"""
+        for attempt in (1, 2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, path, body, headers or {})
+                response = connection.getresponse()
+                return response.status, response.getheaders(), response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; reconnect once
+                connection.close()
+                self._local.connection = None
+                if attempt == 2:
+                    raise
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                raise